@@ -0,0 +1,218 @@
+"""Concurrency benchmark: the WSGI path (gunicorn sync workers) against the ASGI path (uvicorn).
+
+Usage (from the project root, next to manage.py; needs gunicorn and uvicorn installed):
+
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py --workers 2 --concurrency 32 --db-delay-ms 20 --output bench-async.json
+
+Both servers run the same code against the same database with the same number of worker
+processes. gunicorn serves `farmsetu_weather.wsgi` with its default sync workers, which
+handle one request at a time each. uvicorn serves `farmsetu_weather.asgi` with
+`API_ASYNC=1`, so the record list, record filter and stats endpoints run as async views
+(see `metdata.async_views`). Each endpoint is requested `--requests` times from
+`--concurrency` client threads, and p50/p99 latency and throughput are reported per
+server.
+
+`--db-delay-ms` adds that much latency to every SQL query (via `bench_settings.py`), to
+stand in for a remote or loaded PostgreSQL server. That is where the ASGI path is meant
+to help: sync workers sit idle while they wait, whereas the event loop keeps accepting
+requests. Against a local SQLite file with no delay, expect little difference, or the
+WSGI path ahead.
+
+By default the database is a fresh SQLite file in a temporary directory, filled by
+importing synthetic MetOffice files (`synthetic.py`). `--database-url` points both servers
+at another database instead. That database is migrated and imported into, so only use
+a disposable one. The response cache is off, so every request reaches the database.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import http.client
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from synthetic import DATASET_PATH, serve, write_tree
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+
+# (name, path); {p}/{q} and {r}/{s} are the first two parameters and regions.
+ENDPOINTS: List[Tuple[str, str]] = [
+    ("records_page", "/api/records/?page=5"),
+    ("records_cursor", "/api/records/?cursor=start&page_size=100"),
+    ("filter_dataset", "/api/records/filter/?parameter={p}&region={r}"),
+    ("filter_range", "/api/records/filter/?parameter={p},{q}&region={r},{s}&year_min=1950&year_max=1959"),
+    ("stats", "/api/stats/?parameter={p}&region={r}"),
+    ("stats_decades", "/api/stats/?parameter={p}&region={r}&column=ann&by=decade"),
+]
+
+SERVERS = {
+    "wsgi": lambda port, workers: [
+        sys.executable, "-m", "gunicorn", "farmsetu_weather.wsgi:application",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning",
+    ],
+    "asgi": lambda port, workers: [
+        sys.executable, "-m", "uvicorn", "farmsetu_weather.asgi:application",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ],
+}
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[max(math.ceil(share * len(sorted_values)) - 1, 0)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(port: int, path: str, timeout: float = 60) -> Tuple[int, bytes]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path, headers={"Host": "localhost"})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def manage(env: Dict[str, str], *args: str) -> None:
+    subprocess.run(
+        [sys.executable, "manage.py", *args], cwd=PROJECT_ROOT, env=env, check=True, stdout=subprocess.DEVNULL
+    )
+
+
+@contextlib.contextmanager
+def server(kind: str, env: Dict[str, str], workers: int) -> Iterator[int]:
+    """Run one server in the background until it answers; yield its port."""
+    port = free_port()
+    process = subprocess.Popen(SERVERS[kind](port, workers), cwd=PROJECT_ROOT, env=env)
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{kind} server exited with status {process.returncode}.")
+            with contextlib.suppress(OSError):
+                if get(port, "/api/datasets/", timeout=5)[0] == 200:
+                    break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{kind} server did not start within 60 seconds.")
+            time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def bench_server(port: int, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    names = {"p": args.parameters[0], "q": args.parameters[-1], "r": args.regions[0], "s": args.regions[-1]}
+    results: Dict[str, Dict[str, float]] = {}
+    for name, template in ENDPOINTS:
+        path = template.format(**names)
+        status, _ = get(port, path)
+        if status != 200:
+            raise RuntimeError(f"{name}: {path} returned {status}.")
+
+        def timed(_: int) -> float:
+            start = time.perf_counter()
+            status, _ = get(port, path)
+            if status != 200:
+                raise RuntimeError(f"{name}: {path} returned {status}.")
+            return time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = sorted(pool.map(timed, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "req_per_sec": args.requests / elapsed,
+        }
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="farmsetu-bench-async-"))
+    write_tree(workdir / "metoffice", args.parameters, args.regions, years=args.years, seed=args.seed)
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([str(PROJECT_ROOT), str(BENCH_DIR)]),
+        "DJANGO_SETTINGS_MODULE": "bench_settings",
+        "DATABASE_URL": args.database_url or f"sqlite:///{workdir / 'bench.sqlite3'}",
+        "DEBUG": "0",
+        "ALLOWED_HOSTS": "*",
+        "SECURE_SSL_REDIRECT": "0",
+        "API_CACHE_TIMEOUT": "0",
+        "DATASET_STORE_PATH": "",
+        "BENCH_DB_DELAY_MS": "0",
+    }
+    results: dict = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "options": {key: value for key, value in vars(args).items() if key not in ("output", "database_url")},
+        }
+    }
+    try:
+        manage(env, "migrate", "--no-input")
+        with serve(workdir / "metoffice") as base_url:
+            template = f"{base_url}/{DATASET_PATH}"
+            urls = [template.format(parameter=p, region=r) for p in args.parameters for r in args.regions]
+            manage(env, "import_metoffice", *urls)
+        env["BENCH_DB_DELAY_MS"] = str(args.db_delay_ms)
+
+        print(
+            f"workers={args.workers} concurrency={args.concurrency} requests={args.requests} "
+            f"db_delay_ms={args.db_delay_ms}"
+        )
+        print(f"{'endpoint':<16}{'server':>7}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+        for kind in ("wsgi", "asgi"):
+            with server(kind, {**env, "API_ASYNC": "1" if kind == "asgi" else "0"}, args.workers) as port:
+                results[kind] = bench_server(port, args)
+        for name, _ in ENDPOINTS:
+            for kind in ("wsgi", "asgi"):
+                row = results[kind][name]
+                print(f"{name:<16}{kind:>7}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['req_per_sec']:>9.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parameters", default="Tmax,Tmin", help="Comma-separated synthetic parameters.")
+    parser.add_argument("--regions", default="UK,England,Wales,Scotland", help="Comma-separated synthetic regions.")
+    parser.add_argument("--years", type=int, default=140, help="Years per dataset (default: 140).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data (default: 0).")
+    parser.add_argument("--workers", type=int, default=2, help="Server worker processes (default: 2).")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint (default: 200).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads (default: 16).")
+    parser.add_argument("--db-delay-ms", type=float, default=0, help="Latency added to every query (default: 0).")
+    parser.add_argument("--database-url", help="Disposable database to use instead of a temporary SQLite file.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file.")
+    args = parser.parse_args()
+    args.parameters = [p for p in args.parameters.split(",") if p]
+    args.regions = [r for r in args.regions.split(",") if r]
+
+    results = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
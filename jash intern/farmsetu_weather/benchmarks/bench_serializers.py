@@ -0,0 +1,97 @@
+"""Benchmark the record list serialisation paths: DataRecordSerializer versus the fast path.
+
+Usage (from the project root, next to manage.py, against an imported database):
+
+    python benchmarks/bench_serializers.py --rows 5000 --repeat 5
+
+Two measurements, each checked for byte-identical JSON before timing:
+
+    rows       serialise + render `--rows` records directly (model instances and
+               DataRecordSerializer versus `values_list` and `record_rows_to_dicts`)
+    endpoints  full requests to the list and filter endpoints through the test client,
+               with API_FAST_RECORDS off and on (response cache disabled)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "farmsetu_weather.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import Client, override_settings  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from metdata.models import DataRecord  # noqa: E402
+from metdata.serializers import DataRecordSerializer, record_rows_to_dicts  # noqa: E402
+
+ENDPOINTS = [
+    "/api/records/?page=2",
+    "/api/records/?page=3&ordering=-value,year",
+    "/api/records/filter/?parameter=Tmax&region=UK",
+    "/api/records/filter/?region=UK&column=ann",
+]
+
+
+def best_of(repeat: int, func: Callable[[], bytes]) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_rows(rows: int, repeat: int) -> None:
+    queryset = DataRecord.objects.with_dimensions().order_by("id")[:rows]
+    renderer = JSONRenderer()
+
+    def serializer_path() -> bytes:
+        return renderer.render(DataRecordSerializer(queryset.all(), many=True).data)
+
+    def fast_path() -> bytes:
+        return renderer.render(record_rows_to_dicts(queryset.values_list(*DataRecordSerializer.Meta.fields)))
+
+    identical = serializer_path() == fast_path()
+    slow, fast = best_of(repeat, serializer_path), best_of(repeat, fast_path)
+    print(f"rows={rows} identical={identical}")
+    print(f"{'serializer':<14}{slow * 1000:>10.1f} ms{rows / slow:>14,.0f} rows/sec")
+    print(f"{'fast':<14}{fast * 1000:>10.1f} ms{rows / fast:>14,.0f} rows/sec   ({slow / fast:.1f}x)")
+
+
+def bench_endpoints(repeat: int) -> None:
+    client = Client()
+
+    def fetch(url: str, fast: bool) -> bytes:
+        with override_settings(API_FAST_RECORDS=fast, API_CACHE_TIMEOUT=0):
+            return client.get(url, HTTP_HOST="localhost").content
+
+    print(f"\n{'endpoint':<48}{'serializer':>12}{'fast':>10}  identical")
+    for url in ENDPOINTS:
+        identical = fetch(url, False) == fetch(url, True)
+        slow = best_of(repeat, lambda: fetch(url, False))
+        fast = best_of(repeat, lambda: fetch(url, True))
+        print(f"{url:<48}{slow * 1000:>9.1f} ms{fast * 1000:>7.1f} ms  {identical}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Records to serialise directly (default: 5000).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per path; best is reported (default: 5).")
+    args = parser.parse_args()
+    if not DataRecord.objects.exists():
+        sys.exit("No records to serialise; run import_metoffice first.")
+    bench_rows(args.rows, args.repeat)
+    bench_endpoints(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
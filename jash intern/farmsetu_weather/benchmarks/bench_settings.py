@@ -0,0 +1,26 @@
+"""Settings for `bench_async.py`: the project settings, plus `BENCH_DB_DELAY_MS` of
+latency added to every SQL query to stand in for a remote database server."""
+from __future__ import annotations
+
+import os
+import time
+
+from django.db.backends.utils import CursorWrapper
+
+from farmsetu_weather.settings import *  # noqa: F401,F403
+
+BENCH_DB_DELAY: float = float(os.getenv("BENCH_DB_DELAY_MS", "0")) / 1000
+
+
+def _delayed(method):
+    def run(self, *args, **kwargs):
+        # Sleeps in the thread running the query, as a blocking database driver would.
+        time.sleep(BENCH_DB_DELAY)
+        return method(self, *args, **kwargs)
+
+    return run
+
+
+if BENCH_DB_DELAY:
+    CursorWrapper._execute = _delayed(CursorWrapper._execute)
+    CursorWrapper._executemany = _delayed(CursorWrapper._executemany)
@@ -0,0 +1,125 @@
+"""Synthetic MetOffice-format datasets and a local HTTP server that stands in for the MetOffice.
+
+Used by `bench_suite.py`, and usable on its own to serve a fixture tree:
+
+    python benchmarks/synthetic.py --root /tmp/metoffice --years 140 --missing 0.02 --serve
+
+Files follow the real layout (`pub/data/weather/uk/climate/datasets/<parameter>/date/<region>.txt`):
+a title and "Last updated" line, a `year jan ... ann` header, then one row per year with
+one-decimal values and `---` for missing cells. Output is deterministic for a given seed.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import random
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+MONTHS = "jan feb mar apr may jun jul aug sep oct nov dec win spr sum aut ann".split()
+DATASET_PATH = "pub/data/weather/uk/climate/datasets/{parameter}/date/{region}.txt"
+
+
+def column_names(count: int) -> List[str]:
+    """The first `count` MetOffice column names, padded with c18, c19, ... beyond the 17 real ones."""
+    return MONTHS[:count] + [f"c{i + 1}" for i in range(len(MONTHS), count)]
+
+
+def dataset_text(
+    parameter: str,
+    region: str,
+    years: int = 140,
+    columns: int = len(MONTHS),
+    missing: float = 0.0,
+    first_year: int = 1884,
+    seed: int = 0,
+) -> str:
+    """One dataset file with `years` rows of `columns` values; `missing` is the share of `---` cells."""
+    rng = random.Random(f"{seed}:{parameter}:{region}")
+    names = column_names(columns)
+    lines = [
+        f"Met Office HadUK-Grid {parameter} {region}",
+        "Last updated 01-Jan-2025",
+        "",
+        "year" + "".join(f"{name:>7}" for name in names),
+    ]
+    for year in range(first_year, first_year + years):
+        cells = ("---" if rng.random() < missing else f"{rng.uniform(-5, 25):.1f}" for _ in names)
+        lines.append(f"{year:<4}" + "".join(f"{cell:>7}" for cell in cells))
+    return "\n".join(lines) + "\n"
+
+
+def write_tree(
+    root: Path,
+    parameters: Sequence[str],
+    regions: Sequence[str],
+    **options,
+) -> List[Tuple[str, str, Path]]:
+    """Write one dataset per (parameter, region) under `root`; return (parameter, region, path)."""
+    written = []
+    for parameter in parameters:
+        for region in regions:
+            path = root / DATASET_PATH.format(parameter=parameter, region=region)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(dataset_text(parameter, region, **options), encoding="utf-8")
+            written.append((parameter, region, path))
+    return written
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        pass
+
+
+@contextlib.contextmanager
+def serve(root: Path, port: int = 0) -> Iterator[str]:
+    """Serve `root` over HTTP on localhost in a background thread; yield the base URL.
+
+    SimpleHTTPRequestHandler sends Last-Modified and honours If-Modified-Since, so
+    re-imports exercise the importer's conditional-request path.
+    """
+    handler = functools.partial(_QuietHandler, directory=str(root))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, required=True, help="Directory to write the datasets into.")
+    parser.add_argument("--parameters", default="Tmax,Tmin", help="Comma-separated parameters (default: Tmax,Tmin).")
+    parser.add_argument("--regions", default="UK,England,Wales", help="Comma-separated regions.")
+    parser.add_argument("--years", type=int, default=140, help="Years per dataset (default: 140).")
+    parser.add_argument("--columns", type=int, default=len(MONTHS), help="Value columns per year (default: 17).")
+    parser.add_argument("--missing", type=float, default=0.0, help="Share of missing cells, 0-1 (default: 0).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--serve", action="store_true", help="Serve the tree until interrupted.")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve (default: 8765).")
+    args = parser.parse_args()
+    written = write_tree(
+        args.root,
+        args.parameters.split(","),
+        args.regions.split(","),
+        years=args.years,
+        columns=args.columns,
+        missing=args.missing,
+        seed=args.seed,
+    )
+    print(f"Wrote {len(written)} datasets under {args.root}.")
+    if args.serve:
+        with serve(args.root, args.port) as base_url:
+            print(f"Serving on {base_url}/{DATASET_PATH}; Ctrl+C to stop.")
+            with contextlib.suppress(KeyboardInterrupt):
+                threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,17 @@ import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "farmsetu_weather.settings")
 django.setup()
 
-from metdata.models import DataRecord
+from metdata.models import Column, DataRecord
 
 total = DataRecord.objects.count()
 print(f"Total records: {total}")
 
-columns = list(DataRecord.objects.values_list('column_name', flat=True).distinct())
+columns = list(Column.objects.filter(records__isnull=False).values_list('name', flat=True).distinct())
 print(f"Distinct columns: {columns}")
 
-ann_count = DataRecord.objects.filter(column_name="ANN").count()
+ann_count = DataRecord.objects.filter(column__name="ANN").count()
 print(f"ANN records: {ann_count}")
 
-sample = DataRecord.objects.filter(parameter="Tmax", region="UK")[:5]
+sample = DataRecord.objects.with_dimensions().filter(parameter="Tmax", region="UK").order_by("year", "column__name")[:5]
 for rec in sample:
     print(f"  {rec.year} | {rec.column_name} | {rec.value}")
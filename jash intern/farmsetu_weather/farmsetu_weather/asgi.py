@@ -11,3 +11,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "farmsetu_weather.settings")
 
 application = get_asgi_application()
+
+# Map the dataset snapshot when the worker boots rather than on its first request.
+from metdata.store import get_store  # noqa: E402
+
+get_store()
@@ -50,6 +50,8 @@ INSTALLED_APPS: list[str] = [
 ]
 
 MIDDLEWARE: list[str] = [
+    # First, so its total time covers the rest of the stack.
+    "metdata.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -92,6 +94,70 @@ DATABASES = {
     )
 }
 
+# PostgreSQL only: migration 0010 list-partitions metdata_datarecord by dataset and uses
+# BRIN indexes on year/imported_at (see metdata.partitions). On an already migrated
+# database run `manage.py partition_records` (or `--revert`) instead.
+DATARECORD_PARTITIONED: bool = os.getenv("DATARECORD_PARTITIONED", "0").lower() in {"1", "true", "yes", "on"}
+
+# Cache
+# CACHE_URL selects the backend: "file:///path/to/dir" (default: .cache/django in the
+# project directory), "redis://host:6379/0" (requires the `redis` package) or "locmem://".
+# API responses are cached until an import changes the data they cover, and imports
+# run as a separate process, so the default is a backend every process shares.
+# "locmem://" is per process: only use it when nothing imports while the server runs.
+CACHE_URL: str = os.getenv("CACHE_URL", f"file://{BASE_DIR / '.cache' / 'django'}")
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    _CACHE_BACKEND = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL}
+elif CACHE_URL.startswith("file://"):
+    _CACHE_BACKEND = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": CACHE_URL[len("file://"):],
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+else:
+    _CACHE_BACKEND = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "farmsetu-weather",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+CACHES = {"default": _CACHE_BACKEND}
+
+# Seconds an API response may stay cached (0 disables response caching). Imports
+# invalidate affected responses immediately; this only bounds out-of-band edits.
+API_CACHE_TIMEOUT: int = int(os.getenv("API_CACHE_TIMEOUT", "3600"))
+
+# Serve the record list endpoints from `values_list` tuples instead of running
+# DataRecordSerializer per row (identical output; see metdata.views.FastRecordListMixin).
+API_FAST_RECORDS: bool = os.getenv("API_FAST_RECORDS", "0").lower() in {"1", "true", "yes", "on"}
+
+# Serve /api/records/, /api/records/filter/ and /api/stats/ with the async views in
+# metdata.async_views. Only worthwhile under an ASGI server (farmsetu_weather.asgi via
+# uvicorn); under WSGI each async view pays for its own event loop.
+API_ASYNC: bool = os.getenv("API_ASYNC", "0").lower() in {"1", "true", "yes", "on"}
+
+# Path of the memory-mapped dataset snapshot (e.g. /var/tmp/farmsetu-datasets.bin).
+# When set, the series, stats, analytics, batch and catalogue endpoints read from it
+# instead of the database; import_metoffice rewrites it after each import (see metdata.store).
+DATASET_STORE_PATH: str = os.getenv("DATASET_STORE_PATH", "")
+
+# Per-request SQL/render/total timings for the metdata API, sent as Server-Timing
+# headers and exported with the import counters at /metrics (see metdata.metrics).
+# Queries slower than API_SLOW_QUERY_MS (0 disables) are counted and logged.
+API_METRICS: bool = os.getenv("API_METRICS", "1").lower() in {"1", "true", "yes", "on"}
+API_SLOW_QUERY_MS: int = int(os.getenv("API_SLOW_QUERY_MS", "200"))
+# /metrics answers clients whose address is in API_METRICS_ALLOWED_IPS (comma-separated
+# addresses or networks, e.g. "127.0.0.1,10.0.0.0/8") or that send
+# "Authorization: Bearer <API_METRICS_TOKEN>" (empty disables the token).
+API_METRICS_ALLOWED_IPS: list[str] = [
+    a.strip() for a in os.getenv("API_METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if a.strip()
+]
+API_METRICS_TOKEN: str = os.getenv("API_METRICS_TOKEN", "")
+
+# Cache-Control lifetimes for API responses. Browsers revalidate with the ETag after
+# API_MAX_AGE seconds; shared caches (CDN) may serve a response for API_SHARED_MAX_AGE.
+API_MAX_AGE: int = int(os.getenv("API_MAX_AGE", "60"))
+API_SHARED_MAX_AGE: int = int(os.getenv("API_SHARED_MAX_AGE", "300"))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
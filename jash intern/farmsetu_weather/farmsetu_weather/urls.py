@@ -9,6 +9,8 @@ from django.urls import path, include
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
+from metdata.metrics import metrics_view
+
 
 def index_view(request: HttpRequest) -> HttpResponse:
     """Temporary index view; will be replaced with Chart.js frontend later."""
@@ -18,4 +20,5 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("", index_view, name="index"),
     path("api/", include("metdata.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -1,14 +1,161 @@
-"""Admin configuration for metdata app."""
+"""Admin configuration for metdata app.
+
+The `DataRecord` changelist is built to stay responsive on tables with millions of
+rows:
+
+- the paginator reports PostgreSQL's planner estimate (`pg_class.reltuples`) for the
+  unfiltered list and a capped count for filtered lists, and the unfiltered total is
+  never counted;
+- filter choices come from the small `Dataset`, `Column` and `DataRollup` tables
+  (decades are cached until the next import) rather than DISTINCT scans of records;
+- search matches name prefixes in the `Dataset` and `Column` tables, then filters
+  records by the matching ids through the foreign-key indexes;
+- the default ordering and the import-date filter follow indexes.
+"""
 from __future__ import annotations
 
+from typing import List, Optional, Tuple
+
+from django.conf import settings
 from django.contrib import admin
-from .models import DataRecord
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .cache import KEY_PREFIX, scope_version
+from .models import Column, DataRecord, DataRollup, Dataset
+
+
+def estimated_row_count(model, using: str) -> Optional[int]:
+    """PostgreSQL's row estimate for `model`'s table, or None where there is none.
+
+    `reltuples` is maintained by VACUUM and ANALYZE (including autovacuum), so it
+    lags behind recent writes; it is -1 until the table is first analysed. A
+    partitioned table has no estimate of its own, so its partitions' are summed.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(GREATEST(reltuples, 0))::bigint, MAX(reltuples) FROM pg_class "
+            "WHERE relkind = 'r' AND (oid = %s::regclass "
+            "OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass))",
+            [model._meta.db_table, model._meta.db_table],
+        )
+        total, largest = cursor.fetchone()
+    if largest is None or largest < 0:
+        return None
+    return total
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs an exact `COUNT(*)` over a whole large table.
+
+    An unfiltered list uses the PostgreSQL estimate once it exceeds `count_limit`.
+    Otherwise rows are counted up to `count_limit`, so page links stop there on
+    large result sets.
+    """
+
+    count_limit = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset.order_by()[: self.count_limit].count()
+
+
+def record_decades() -> List[int]:
+    """Decades holding records, from the per-decade `DataRollup` rows.
+
+    Cached under the global version token, which every import that changes data
+    replaces.
+    """
+    timeout: int = getattr(settings, "API_CACHE_TIMEOUT", 0)
+    key = f"{KEY_PREFIX}:admin:decades:{scope_version(None)}"
+    decades = cache.get(key) if timeout > 0 else None
+    if decades is None:
+        decades = list(
+            DataRollup.objects.exclude(decade=None).order_by("decade").values_list("decade", flat=True).distinct()
+        )
+        if timeout > 0:
+            cache.set(key, decades, timeout)
+    return decades
+
+
+class DecadeListFilter(admin.SimpleListFilter):
+    """Filter records to one decade, as a range on the indexed `year`."""
+
+    title = "decade"
+    parameter_name = "decade"
+
+    def lookups(self, request, model_admin) -> List[Tuple[str, str]]:
+        return [(str(decade), f"{decade}s") for decade in record_decades()]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            decade = int(self.value())
+        except ValueError as exc:
+            raise IncorrectLookupParameters(exc) from exc
+        return queryset.filter(year__gte=decade, year__lt=decade + 10)
 
 
 @admin.register(DataRecord)
 class DataRecordAdmin(admin.ModelAdmin):
-    list_display = ("parameter", "region", "year", "column_name", "value", "imported_at")
-    list_filter = ("parameter", "region", "year", "column_name")
-    search_fields = ("parameter", "region", "column_name", "source_url")
-    date_hierarchy = "imported_at"
-    ordering = ("parameter", "region", "year", "column_name")
+    list_display = ("dataset__parameter", "dataset__region", "year", "column__name", "value", "imported_at")
+    list_filter = (
+        "dataset__parameter",
+        "dataset__region",
+        DecadeListFilter,
+        "column",
+        ("imported_at", admin.DateFieldListFilter),
+    )
+    list_select_related = ("dataset", "column")
+    search_fields = ("^dataset__parameter", "^dataset__region", "^column__name")
+    search_help_text = "Start of a parameter, region or column name."
+    # (dataset, year, column) is unique, so this is a total order read from its index.
+    ordering = ("dataset_id", "year", "column_id")
+    sortable_by = ("year", "imported_at")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match each term against dataset and column names, then filter records by id.
+
+        A record matches a term when its dataset's parameter or region, or its column
+        name, starts with it (case-insensitively); every term must match.
+        """
+        for term in search_term.split():
+            dataset_ids = list(
+                Dataset.objects.filter(Q(parameter__istartswith=term) | Q(region__istartswith=term)).values_list(
+                    "id", flat=True
+                )
+            )
+            column_ids = list(Column.objects.filter(name__istartswith=term).values_list("id", flat=True))
+            queryset = queryset.filter(Q(dataset_id__in=dataset_ids) | Q(column_id__in=column_ids))
+        return queryset, False
+
+
+@admin.register(Dataset)
+class DatasetAdmin(admin.ModelAdmin):
+    list_display = ("parameter", "region", "etag", "last_modified", "checked_at", "imported_at")
+    list_filter = ("parameter", "region")
+    search_fields = ("parameter", "region", "source_url")
+    readonly_fields = ("content_hash", "row_hashes", "checked_at", "imported_at")
+    ordering = ("parameter", "region")
+
+
+@admin.register(Column)
+class ColumnAdmin(admin.ModelAdmin):
+    list_display = ("id", "name")
+    search_fields = ("name",)
@@ -0,0 +1,170 @@
+"""Async versions of the record list, record filter and stats endpoints, for ASGI servers.
+
+With `API_ASYNC` set, `/api/records/`, `/api/records/filter/` and `/api/stats/` are
+served by these views instead of their DRF counterparts. Under uvicorn a request that
+is waiting on the database gives the event loop to other requests instead of holding
+a worker, so one slow query no longer stalls everything queued behind it.
+
+DRF's `APIView` cannot await a handler, so these are Django async views that take a
+DRF `Request` and return DRF `Response`s rendered as JSON. They reuse the sync views'
+filtering, validation and payload code, read through the async ORM (`acount`,
+`async for`) and cache with `async_cache_response` / `async_conditional_response`
+under the sync views' names, so both share cache entries and ETags. The browsable API
+and `?format=` are not available here.
+
+Independent queries are issued together with `asyncio.gather`: the dataset and column
+id lookups of a filter, and a page with its `COUNT(*)`. Django runs one request's
+async ORM calls on that request's connection in turn, so this saves the hand-offs
+between them rather than overlapping them on the database.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework.exceptions import APIException, MethodNotAllowed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .cache import async_cache_response, async_conditional_response, params_scope
+from .models import DataRecord
+from .pagination import KEYSET_FIELDS, RecordPagination
+from .serializers import DataRecordSerializer, record_rows_to_dicts
+from .store import get_store
+from .views import (
+    FILTER_ORDERING,
+    StatsView,
+    apply_record_filters,
+    filter_scope,
+    record_filter_lookups,
+    rollup_rows,
+)
+
+
+class AsyncAPIView(View):
+    """Async view handling a DRF `Request`; `Response`s are rendered as JSON.
+
+    `cache_name` is the view name used in cache keys and ETags.
+    """
+
+    cache_name = ""
+    renderer = JSONRenderer()
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:  # type: ignore[override]
+        request = Request(request)
+        request.accepted_renderer = self.renderer
+        request.accepted_media_type = self.renderer.media_type
+        try:
+            response = await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            response = Response({"detail": exc.detail}, status=exc.status_code)
+        if isinstance(response, Response):
+            response.accepted_renderer = self.renderer
+            response.accepted_media_type = self.renderer.media_type
+            response.renderer_context = {"view": self, "request": request, "response": response}
+            response["Allow"] = ", ".join(self._allowed_methods())
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    async def http_method_not_allowed(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        raise MethodNotAllowed(request.method)
+
+
+class AsyncRecordListMixin:
+    """Filter backends, pagination and row conversion shared by the async record views.
+
+    Pages are always built from `values_list` tuples (the `API_FAST_RECORDS` path),
+    which render identically to `DataRecordSerializer`.
+    """
+
+    # Read by OrderingFilter to find the orderable fields.
+    serializer_class = DataRecordSerializer
+    pagination_class = RecordPagination
+
+    async def list_response(self, request: Request, queryset) -> Response:
+        for backend in api_settings.DEFAULT_FILTER_BACKENDS:
+            queryset = backend().filter_queryset(request, queryset, self)
+        rows = queryset.values_list(*DataRecordSerializer.Meta.fields, *KEYSET_FIELDS)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(rows, request)
+        if page is None:
+            return Response(record_rows_to_dicts([row async for row in rows]))
+        return paginator.get_paginated_response(record_rows_to_dicts(page))
+
+
+class AsyncDataRecordListView(AsyncRecordListMixin, AsyncAPIView):
+    """Async `DataRecordListView`: GET /api/records/ with `API_ASYNC`."""
+
+    cache_name = "DataRecordListView"
+
+    @async_conditional_response
+    @async_cache_response
+    async def get(self, request: Request) -> Response:
+        return await self.list_response(request, DataRecord.objects.with_dimensions().order_by("id"))
+
+
+class AsyncDataRecordFilterView(AsyncRecordListMixin, AsyncAPIView):
+    """Async `DataRecordFilterView`: GET /api/records/filter/ with `API_ASYNC`."""
+
+    cache_name = "DataRecordFilterView"
+
+    def cache_scope(self, request: Request):
+        return filter_scope(request.query_params)
+
+    @async_conditional_response
+    @async_cache_response
+    async def get(self, request: Request) -> Response:
+        datasets, columns = record_filter_lookups(request.query_params)
+        dataset_ids, column_ids = await asyncio.gather(_values(datasets), _values(columns))
+        queryset = apply_record_filters(
+            DataRecord.objects.with_dimensions(), request.query_params, dataset_ids, column_ids
+        )
+        return await self.list_response(request, queryset.order_by(*FILTER_ORDERING))
+
+
+class AsyncStatsView(AsyncAPIView):
+    """Async `StatsView`: GET /api/stats/ with `API_ASYNC`."""
+
+    cache_name = "StatsView"
+
+    def cache_scope(self, request: Request):
+        return params_scope(request.query_params.get("parameter"), request.query_params.get("region"))
+
+    @async_conditional_response
+    @async_cache_response
+    async def get(self, request: Request) -> Response:
+        error = StatsView.params_error(request.query_params)
+        if error:
+            return Response({"detail": error}, status=400)
+        parameter, region, column, by, start_year, end_year = StatsView.stats_params(request.query_params)
+
+        # A missing snapshot is built from the database, so this must not run on the event loop.
+        store = await sync_to_async(get_store)()
+        if start_year or end_year:
+            first = int(start_year) if start_year else 0
+            last = int(end_year) if end_year else 9999
+            if store is not None:
+                rows = store.series_rows(parameter, region, [column] if column else None)
+            else:
+                rows = [row async for row in StatsView.series_query(parameter, region, column)]
+            groups = StatsView.range_summaries(rows, by, first, last)
+        elif store is not None:
+            groups = StatsView.rollup_summaries(
+                store.rollup_rows(parameter, region, column, decades=by == "decade"), by
+            )
+        else:
+            rollups = [rollup async for rollup in StatsView.rollup_query(parameter, region, column, by)]
+            groups = StatsView.rollup_summaries(rollup_rows(rollups), by)
+        return Response(StatsView.stats_payload(parameter, region, column, by, start_year, end_year, groups))
+
+
+async def _values(queryset) -> Optional[List[Any]]:
+    if queryset is None:
+        return None
+    return [value async for value in queryset]
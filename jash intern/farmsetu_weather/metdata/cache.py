@@ -0,0 +1,280 @@
+"""Server-side caching and HTTP validators for API responses, driven by imports.
+
+Response data is cached under a key built from the view, the host (pagination
+links are absolute), the path and the normalised query params, plus a version token:
+
+- a per-(parameter, region) token for responses scoped to one dataset
+  (stats, and filters naming both a parameter and a region);
+- a global token for everything else (the full list, wider filters).
+
+`invalidate_dataset` replaces the dataset's token and the global token, so every
+response that could include that dataset misses on the next request while the rest
+stay cached. Tokens live in the cache itself, so a cache hit needs no database
+query. Use a shared backend (file or Redis, see `CACHE_URL` in settings) when the
+importer runs in a different process from the web server.
+
+`conditional_response` adds a strong ETag (from the `Dataset.data_version` counters
+the importer bumps), Last-Modified (from `Dataset.imported_at`) and Cache-Control,
+and answers matching conditional requests with 304 before the view runs.
+
+`async_cache_response` and `async_conditional_response` do the same for the async
+views in `metdata.async_views`, using the cache's and ORM's async APIs.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import Dataset
+
+KEY_PREFIX = "metdata"
+
+# A (parameter, region) pair, or None for responses that may span every dataset.
+Scope = Optional[Tuple[str, str]]
+
+
+def _scope_name(scope: Scope) -> str:
+    if scope is None:
+        return "*"
+    return "/".join(quote(name, safe="") for name in scope)
+
+
+def _version_key(scope: Scope) -> str:
+    return f"{KEY_PREFIX}:version:{_scope_name(scope)}"
+
+
+def params_scope(parameter: Optional[str], region: Optional[str]) -> Scope:
+    """Dataset scope when both names are given, otherwise the global scope."""
+    if parameter and region:
+        return (parameter, region)
+    return None
+
+
+def view_scope(view, request: Request) -> Scope:
+    """The scope named by the view's `cache_scope(request)`, if it defines one."""
+    return view.cache_scope(request) if hasattr(view, "cache_scope") else None
+
+
+def scope_version(scope: Scope) -> str:
+    """Return the current version token of `scope`, creating one if missing."""
+    key = _version_key(scope)
+    token = cache.get(key)
+    if token is None:
+        # add() so concurrent first requests agree on a single token.
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        token = cache.get(key)
+    return token
+
+
+async def ascope_version(scope: Scope) -> str:
+    """Async `scope_version`."""
+    key = _version_key(scope)
+    token = await cache.aget(key)
+    if token is None:
+        await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        token = await cache.aget(key)
+    return token
+
+
+def invalidate_dataset(parameter: str, region: str) -> None:
+    """Expire every cached response that may include the (parameter, region) dataset."""
+    cache.set_many(
+        {
+            _version_key((parameter, region)): uuid.uuid4().hex,
+            _version_key(None): uuid.uuid4().hex,
+        },
+        timeout=None,
+    )
+
+
+def scope_validators(scope: Scope) -> Tuple[str, Optional[datetime]]:
+    """Return (data version, last import time) for the datasets in `scope`.
+
+    The version joins each dataset's id and `data_version`, so it changes whenever an
+    import changes any of them. The result is cached under the scope's token, so it
+    is only read from the database once per import.
+    """
+    timeout: int = getattr(settings, "API_CACHE_TIMEOUT", 0)
+    key = f"{KEY_PREFIX}:validators:{_scope_name(scope)}:{scope_version(scope)}"
+    validators = cache.get(key) if timeout > 0 else None
+    if validators is None:
+        validators = _validators(list(_validator_rows(scope)))
+        if timeout > 0:
+            cache.set(key, validators, timeout)
+    return validators
+
+
+async def ascope_validators(scope: Scope) -> Tuple[str, Optional[datetime]]:
+    """Async `scope_validators`."""
+    timeout: int = getattr(settings, "API_CACHE_TIMEOUT", 0)
+    key = f"{KEY_PREFIX}:validators:{_scope_name(scope)}:{await ascope_version(scope)}"
+    validators = await cache.aget(key) if timeout > 0 else None
+    if validators is None:
+        validators = _validators([row async for row in _validator_rows(scope)])
+        if timeout > 0:
+            await cache.aset(key, validators, timeout)
+    return validators
+
+
+def _validator_rows(scope: Scope):
+    datasets = Dataset.objects.all()
+    if scope is not None:
+        datasets = datasets.filter(parameter=scope[0], region=scope[1])
+    return datasets.order_by("id").values_list("id", "data_version", "imported_at")
+
+
+def _validators(rows: List[Tuple[int, int, Optional[datetime]]]) -> Tuple[str, Optional[datetime]]:
+    version = ",".join(f"{pk}:{data_version}" for pk, data_version, _ in rows)
+    last_modified = max((imported_at for *_, imported_at in rows if imported_at), default=None)
+    return version, last_modified
+
+
+def normalised_params(request: Request) -> List[Tuple[str, List[str]]]:
+    """Query params sorted by name, with empty values dropped (views treat them as absent)."""
+    return sorted(
+        (name, [v for v in values if v])
+        for name, values in request.query_params.lists()
+        if any(values)
+    )
+
+
+def response_key(view_name: str, request: Request, version: str) -> str:
+    # The path carries URL kwargs (e.g. the analytics kind), which the params do not.
+    raw = repr((request.get_host(), request.path, normalised_params(request)))
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:response:{view_name}:{version}:{digest}"
+
+
+def cache_response(handler: Callable[..., Response]) -> Callable[..., Response]:
+    """Decorate a view's `get` to serve it from the cache and store successful responses.
+
+    The view's `cache_scope(request)` method, if any, names the dataset the response
+    depends on; otherwise the global scope is used. Only `response.data` is cached, so
+    content negotiation and rendering still happen per request.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(view, request: Request, *args, **kwargs) -> Response:
+        timeout: int = getattr(settings, "API_CACHE_TIMEOUT", 0)
+        if timeout <= 0:
+            return handler(view, request, *args, **kwargs)
+        key = response_key(type(view).__name__, request, scope_version(view_scope(view, request)))
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        response = handler(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
+
+
+def async_cache_response(handler: Callable[..., Awaitable[Response]]) -> Callable[..., Awaitable[Response]]:
+    """`cache_response` for an async view's `get`."""
+
+    @functools.wraps(handler)
+    async def wrapper(view, request: Request, *args, **kwargs) -> Response:
+        timeout: int = getattr(settings, "API_CACHE_TIMEOUT", 0)
+        if timeout <= 0:
+            return await handler(view, request, *args, **kwargs)
+        key = response_key(view.cache_name, request, await ascope_version(view_scope(view, request)))
+        data = await cache.aget(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        response = await handler(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, response.data, timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
+
+
+def conditional_response(handler: Callable[..., HttpResponseBase]) -> Callable[..., HttpResponseBase]:
+    """Decorate a view's `get` with ETag / Last-Modified validators and Cache-Control.
+
+    The strong ETag covers the scope's data version, the view, host, path (which carries
+    URL kwargs such as the export format), normalised query params and negotiated media
+    type, so each representation has its own tag. A request
+    whose If-None-Match / If-Modified-Since still matches gets 304 without running the view.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(view, request: Request, *args, **kwargs) -> HttpResponseBase:
+        version, last_modified = scope_validators(view_scope(view, request))
+        etag, timestamp = _validator_headers(type(view).__name__, request, version, last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return _add_validators(response, etag, timestamp)
+
+    return wrapper
+
+
+def async_conditional_response(
+    handler: Callable[..., Awaitable[HttpResponseBase]]
+) -> Callable[..., Awaitable[HttpResponseBase]]:
+    """`conditional_response` for an async view's `get`."""
+
+    @functools.wraps(handler)
+    async def wrapper(view, request: Request, *args, **kwargs) -> HttpResponseBase:
+        version, last_modified = await ascope_validators(view_scope(view, request))
+        etag, timestamp = _validator_headers(view.cache_name, request, version, last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = await handler(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return _add_validators(response, etag, timestamp)
+
+    return wrapper
+
+
+def _validator_headers(
+    view_name: str, request: Request, version: str, last_modified: Optional[datetime]
+) -> Tuple[str, Optional[int]]:
+    """The (quoted ETag, Last-Modified timestamp) of a response."""
+    raw = repr((
+        version,
+        view_name,
+        request.get_host(),
+        request.path,
+        normalised_params(request),
+        getattr(request, "accepted_media_type", ""),
+    ))
+    etag = quote_etag(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def _add_validators(response: HttpResponseBase, etag: str, timestamp: Optional[int]) -> HttpResponseBase:
+    response["ETag"] = etag
+    if timestamp is not None:
+        response["Last-Modified"] = http_date(timestamp)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, "API_MAX_AGE", 0),
+        s_maxage=getattr(settings, "API_SHARED_MAX_AGE", 0),
+    )
+    patch_vary_headers(response, ["Accept"])
+    return response
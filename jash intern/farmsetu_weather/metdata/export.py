@@ -0,0 +1,136 @@
+"""Streaming bulk export of `DataRecord` rows as CSV, NDJSON or Parquet.
+
+Rows are read with `values_list(...).iterator(chunk_size=...)` (a server-side cursor
+on PostgreSQL) in (dataset, year, column) index order and encoded one chunk at a
+time, so memory stays flat however many records are exported and the first bytes
+go out as soon as the first chunk is read. `gzip_stream` compresses any of the
+streams incrementally.
+
+Parquet needs the optional `pyarrow` package; each chunk becomes one row group.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from .serializers import DataRecordSerializer, record_rows_to_dicts
+
+EXPORT_FIELDS = tuple(DataRecordSerializer.Meta.fields)
+EXPORT_ORDER = ("dataset_id", "year", "column_id")
+CHUNK_SIZE = 2000
+
+FORMATS: Dict[str, Dict[str, str]] = {
+    "csv": {"content_type": "text/csv; charset=utf-8", "extension": "csv"},
+    "ndjson": {"content_type": "application/x-ndjson", "extension": "ndjson"},
+    "parquet": {"content_type": "application/vnd.apache.parquet", "extension": "parquet"},
+}
+
+
+def chunked(rows: Iterable[Sequence[Any]], size: int = CHUNK_SIZE) -> Iterator[List[Sequence[Any]]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_rows(queryset, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Sequence[Any]]]:
+    """Stream `queryset` as chunks of `EXPORT_FIELDS` tuples in index order."""
+    rows = queryset.order_by(*EXPORT_ORDER).values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    return chunked(rows, chunk_size)
+
+
+def csv_stream(chunks: Iterable[List[Sequence[Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in chunks:
+        for record in record_rows_to_dicts(chunk):
+            writer.writerow(record.values())
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no records.
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def ndjson_stream(chunks: Iterable[List[Sequence[Any]]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        lines = [json.dumps(record, ensure_ascii=False, separators=(",", ":")) for record in record_rows_to_dicts(chunk)]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ByteSink(io.RawIOBase):
+    """Write-only file that hands its bytes back on `drain()`; lets ParquetWriter stream."""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_stream(chunks: Iterable[List[Sequence[Any]]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("year", pa.int16()),
+        ("parameter", pa.string()),
+        ("region", pa.string()),
+        ("column_name", pa.string()),
+        ("value", pa.float64()),
+        ("source_url", pa.string()),
+        ("imported_at", pa.timestamp("us", tz="UTC")),
+    ])
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks:
+            arrays = [pa.array(values, field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(stream: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream incrementally into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
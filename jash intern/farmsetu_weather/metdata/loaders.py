@@ -0,0 +1,320 @@
+"""Database write paths for imported MetOffice cells.
+
+`DataRecord.objects.bulk_create(..., ignore_conflicts=True)` silently drops revised
+values, cannot say how many rows it actually wrote, and builds a model instance per
+cell. The loaders here upsert plain row tuples on the `(dataset, year, column)`
+unique constraint and report exactly how many cells were inserted, updated or
+left unchanged:
+
+- `CopyLoader` (PostgreSQL): streams rows into a temporary staging table with
+  `COPY FROM STDIN`, then merges them with one set-based
+  `INSERT ... SELECT ... ON CONFLICT DO UPDATE`.
+- `ExecuteManyLoader` (SQLite): one prepared single-row upsert run through
+  `executemany`.
+- `ValuesLoader` (PostgreSQL and SQLite 3.35+): one multi-row
+  `INSERT ... VALUES ... ON CONFLICT DO UPDATE ... RETURNING` statement per chunk.
+
+Rows whose value already matches are excluded by the `DO UPDATE ...
+WHERE` clause, which is how unchanged cells are counted. On PostgreSQL inserts are
+told apart from updates by the system column `xmax = 0`. SQLite has no equivalent, and
+a partitioned table (see `metdata.partitions`) cannot return system columns, so there
+the highest `id` is read once before writing (ids only grow, so any id above it is a
+new row; a row another writer inserted meanwhile and this load then updated counts as
+inserted).
+
+`upsert_records(rows, loader="auto")` picks COPY on PostgreSQL and executemany on
+SQLite. Run `python benchmarks/bench_loaders.py` to compare them with `bulk_create`.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Type
+
+from django.db import NotSupportedError, connection, transaction
+from django.db.models import Max
+
+from .models import Column, DataRecord
+
+# (dataset_id, year, column_id, value, imported_at)
+RecordRow = Tuple[int, int, int, float, datetime]
+
+INSERT_COLUMNS = ("dataset_id", "year", "column_id", "value", "imported_at")
+CONFLICT_COLUMNS = ("dataset_id", "year", "column_id")
+STAGE_TABLE = "metdata_datarecord_stage"
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+    def __iadd__(self, other: "UpsertResult") -> "UpsertResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        return self
+
+
+def _conflict_clause() -> str:
+    """`ON CONFLICT ... DO UPDATE` tail shared by every loader."""
+    qn = connection.ops.quote_name
+    table = qn(DataRecord._meta.db_table)
+    return (
+        f"ON CONFLICT ({', '.join(qn(c) for c in CONFLICT_COLUMNS)}) DO UPDATE SET "
+        f"{qn('value')} = EXCLUDED.{qn('value')}, "
+        f"{qn('imported_at')} = EXCLUDED.{qn('imported_at')} "
+        f"WHERE {table}.{qn('value')} <> EXCLUDED.{qn('value')}"
+    )
+
+
+def _insert_prefix() -> str:
+    qn = connection.ops.quote_name
+    return f"INSERT INTO {qn(DataRecord._meta.db_table)} ({', '.join(qn(c) for c in INSERT_COLUMNS)})"
+
+
+def _max_id() -> int:
+    return DataRecord.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+
+
+def _insert_marker() -> Tuple[str, Callable[[object], bool]]:
+    """A `RETURNING` expression and a test of its value that is true for inserted rows."""
+    if connection.vendor == "postgresql" and not _partitioned():
+        return "(xmax = 0)", bool
+    baseline = _max_id()
+    return connection.ops.quote_name("id"), lambda pk: pk > baseline
+
+
+def _partitioned() -> bool:
+    # As `metdata.partitions.is_partitioned`, which imports this module.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+            [DataRecord._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+class Loader:
+    """Base class for upsert backends; subclasses implement `_load`."""
+
+    name = ""
+    vendors: Tuple[str, ...] = ()
+
+    def load(self, rows: Iterable[RecordRow], chunk_size: int = 1000) -> UpsertResult:
+        """Upsert `rows` atomically and return exact counts."""
+        if connection.vendor not in self.vendors:
+            raise NotSupportedError(f"The '{self.name}' loader does not support {connection.vendor}.")
+        # Atomic so counts stay exact under concurrent writers (and, for COPY,
+        # so the staging table lives for the whole load).
+        with transaction.atomic():
+            return self._load(iter(rows), chunk_size)
+
+    def _load(self, rows: Iterator[RecordRow], chunk_size: int) -> UpsertResult:
+        raise NotImplementedError
+
+
+class ValuesLoader(Loader):
+    """One multi-row `INSERT ... VALUES ... RETURNING` statement per chunk."""
+
+    name = "values"
+    vendors = ("postgresql", "sqlite")
+
+    def _load(self, rows: Iterator[RecordRow], chunk_size: int) -> UpsertResult:
+        result = UpsertResult()
+        fields = [DataRecord._meta.get_field(name) for name in INSERT_COLUMNS]
+        # Cap the chunk by the backend's bind-parameter limit.
+        batch = max(1, min(chunk_size, connection.ops.bulk_batch_size(fields, [None] * chunk_size)))
+        returning, is_inserted = _insert_marker()
+        placeholders = "(" + ", ".join(["%s"] * len(INSERT_COLUMNS)) + ")"
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+
+        with connection.cursor() as cursor:
+            for chunk in _chunks(rows, batch):
+                params: List[object] = []
+                for row in chunk:
+                    params.extend(row[:-1])
+                    params.append(adapt_datetime(row[-1]))
+                sql = (
+                    f"{_insert_prefix()} VALUES {', '.join([placeholders] * len(chunk))} "
+                    f"{_conflict_clause()} RETURNING {returning}"
+                )
+                cursor.execute(sql, params)
+                returned = [r[0] for r in cursor.fetchall()]
+                inserted = sum(1 for marker in returned if is_inserted(marker))
+                result.inserted += inserted
+                result.updated += len(returned) - inserted
+                result.unchanged += len(chunk) - len(returned)
+        return result
+
+
+class ExecuteManyLoader(Loader):
+    """A single prepared row upsert executed for every row via `executemany`.
+
+    `executemany` cannot return rows, so counts come from the cursor's rowcount
+    (inserted + updated) and one `COUNT(*)` of ids above the pre-load maximum.
+    """
+
+    name = "executemany"
+    vendors = ("sqlite",)
+
+    def _load(self, rows: Iterator[RecordRow], chunk_size: int) -> UpsertResult:
+        qn = connection.ops.quote_name
+        baseline = _max_id()
+        placeholders = ", ".join(["%s"] * len(INSERT_COLUMNS))
+        sql = f"{_insert_prefix()} VALUES ({placeholders}) {_conflict_clause()}"
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+
+        total = written = 0
+        with connection.cursor() as cursor:
+            for chunk in _chunks(rows, chunk_size):
+                cursor.executemany(sql, [(*row[:-1], adapt_datetime(row[-1])) for row in chunk])
+                total += len(chunk)
+                written += max(cursor.rowcount, 0)
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {qn(DataRecord._meta.db_table)} WHERE {qn('id')} > %s", [baseline]
+            )
+            inserted = cursor.fetchone()[0]
+        return UpsertResult(inserted=inserted, updated=written - inserted, unchanged=total - written)
+
+
+class CopyLoader(Loader):
+    """Stream rows into a temp staging table with COPY, then merge them in one statement."""
+
+    name = "copy"
+    vendors = ("postgresql",)
+
+    def _load(self, rows: Iterator[RecordRow], chunk_size: int) -> UpsertResult:
+        qn = connection.ops.quote_name
+        columns = ", ".join(qn(c) for c in INSERT_COLUMNS)
+        returning, is_inserted = _insert_marker()
+        with connection.cursor() as cursor:
+            # Session-scoped, emptied on commit; created once per connection.
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {qn(STAGE_TABLE)} ("
+                f"{qn('dataset_id')} integer, {qn('year')} smallint, {qn('column_id')} smallint, "
+                f"{qn('value')} double precision, {qn('imported_at')} timestamp with time zone"
+                f") ON COMMIT DELETE ROWS"
+            )
+            cursor.execute(f"TRUNCATE {qn(STAGE_TABLE)}")
+            staged = copy_rows(cursor, STAGE_TABLE, rows)
+            cursor.execute(
+                f"{_insert_prefix()} SELECT {columns} FROM {qn(STAGE_TABLE)} "
+                f"{_conflict_clause()} RETURNING {returning}"
+            )
+            returned = [r[0] for r in cursor.fetchall()]
+        inserted = sum(1 for marker in returned if is_inserted(marker))
+        return UpsertResult(
+            inserted=inserted, updated=len(returned) - inserted, unchanged=staged - len(returned)
+        )
+
+
+def copy_rows(cursor, table: str, rows: Iterable[RecordRow]) -> int:
+    """Stream `rows` into `table`'s record columns with `COPY FROM STDIN` (PostgreSQL).
+
+    Returns the number of rows sent.
+    """
+    qn = connection.ops.quote_name
+    copied = 0
+
+    def copy_lines() -> Iterator[str]:
+        nonlocal copied
+        for row in rows:
+            copied += 1
+            yield "\t".join(_copy_text(v) for v in row) + "\n"
+
+    copy_sql = f"COPY {qn(table)} ({', '.join(qn(c) for c in INSERT_COLUMNS)}) FROM STDIN"
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):  # psycopg2
+        raw.copy_expert(copy_sql, _LineReader(copy_lines()), size=64 * 1024)
+    else:  # psycopg 3
+        with raw.copy(copy_sql) as copy:
+            for line in copy_lines():
+                copy.write(line)
+    return copied
+
+
+LOADERS: Dict[str, Type[Loader]] = {
+    cls.name: cls for cls in (CopyLoader, ExecuteManyLoader, ValuesLoader)
+}
+
+
+def get_loader(name: str = "auto") -> Loader:
+    """Return the loader called `name`; 'auto' picks the fastest for the current database."""
+    if name == "auto":
+        name = "copy" if connection.vendor == "postgresql" else "executemany"
+    try:
+        return LOADERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown loader '{name}'; choose from auto, {', '.join(LOADERS)}.")
+
+
+def upsert_records(
+    rows: Iterable[RecordRow], chunk_size: int = 1000, loader: str = "auto"
+) -> UpsertResult:
+    """Insert or update `rows`, returning exact inserted/updated/unchanged counts."""
+    return get_loader(loader).load(rows, chunk_size)
+
+
+def resolve_column_ids(names: Iterable[str]) -> Dict[str, int]:
+    """Map column names to `Column` ids, creating any names not seen before."""
+    wanted = set(names)
+    ids = dict(Column.objects.filter(name__in=wanted).values_list("name", "id"))
+    missing = wanted - ids.keys()
+    if missing:
+        # ignore_conflicts: a concurrent import may create the same names first.
+        Column.objects.bulk_create([Column(name=name) for name in sorted(missing)], ignore_conflicts=True)
+        ids.update(Column.objects.filter(name__in=missing).values_list("name", "id"))
+    return ids
+
+
+def _chunks(rows: Iterator[RecordRow], size: int) -> Iterator[List[RecordRow]]:
+    chunk: List[RecordRow] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_text(value: object) -> str:
+    """Format one value for COPY's text format (tab-separated, backslash escapes)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, float):
+        return repr(value)
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+class _LineReader:
+    """Minimal file-like adapter so `copy_expert` can pull lines lazily from an iterator."""
+
+    def __init__(self, lines: Iterator[str]) -> None:
+        self._lines = lines
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        parts = [self._buffer]
+        length = len(self._buffer)
+        for line in self._lines:
+            parts.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        data = "".join(parts)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from metdata.store import store_path, write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every imported dataset to a binary snapshot file (see metdata.store). "
+        "Restore it elsewhere with load_snapshot, or serve reads from it via DATASET_STORE_PATH."
+    )
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "path",
+            nargs="?",
+            help="Snapshot file to write (default: DATASET_STORE_PATH).",
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[override]
+        path = options["path"] or store_path()
+        if not path:
+            raise CommandError("No snapshot path given and DATASET_STORE_PATH is not set.")
+        try:
+            count = write_snapshot(path)
+        except OSError as e:
+            raise CommandError(f"Failed to write snapshot: {e}")
+        size = os.path.getsize(path)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} series ({size} bytes) to {path}."))
@@ -1,36 +1,140 @@
 from __future__ import annotations
 
 import logging
-from typing import List
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
 import requests
 
-from metdata.models import DataRecord
+from metdata.cache import invalidate_dataset
+from metdata.loaders import LOADERS, RecordRow, UpsertResult, resolve_column_ids, upsert_records
+from metdata.metrics import ImportMetrics
+from metdata.models import DataRecord, Dataset
+from metdata.partitions import create_partition, is_partitioned, swap_partition
+from metdata.rollups import rebuild_rollups
+from metdata.series import rebuild_series
+from metdata.store import store_path, write_snapshot
+from metdata.utils.fetching import (
+    PARAMETERS,
+    REGIONS,
+    Download,
+    build_session,
+    dataset_urls,
+    fetch_dataset,
+    read_manifest,
+    run_concurrently,
+)
 from metdata.utils.parsing import (
+    ColumnBatch,
+    cells_digest,
     infer_parameter_and_region,
-    parse_full,
+    iter_column_batches,
 )
 
 logger = logging.getLogger(__name__)
 
 
+# One year row: (year, [(column_name, value), ...]) for its non-missing cells.
+YearRow = Tuple[int, List[Tuple[str, float]]]
+
+
+@dataclass
+class _Parsed:
+    """What `_store` needs from one dataset: every year's digest and the rows to write.
+
+    `changed` holds only the year rows whose digest differs from the stored one;
+    `rows` holds every year row, and is only filled for --swap-partitions.
+    """
+
+    row_hashes: Dict[str, str]
+    changed: List[YearRow]
+    rows: List[YearRow]
+    column_count: int
+    total_cells: int
+
+
+@dataclass
+class _Fetched:
+    """Result of downloading (and, if the content changed, parsing) one dataset.
+
+    `parsed` is None when the dataset was unchanged (HTTP 304 or identical body).
+    """
+
+    download: Download
+    parsed: Optional[_Parsed] = None
+    parse_seconds: float = 0.0
+
+
+def _parse_stream(batches: Iterable[ColumnBatch], previous: Dict[str, str], keep_all: bool) -> _Parsed:
+    """Fingerprint every year row of a streamed dataset, keeping only rows that changed.
+
+    Batches are consumed as the body arrives, so memory is bounded by the changed
+    rows (all rows with `keep_all`) rather than the size of the file.
+    """
+    parsed = _Parsed(row_hashes={}, changed=[], rows=[], column_count=0, total_cells=0)
+    for batch in batches:
+        parsed.column_count = len(batch.columns)
+        for i, year in enumerate(batch.years):
+            cells = batch.row_cells(i)
+            parsed.total_cells += len(cells)
+            digest = cells_digest(year, cells)
+            parsed.row_hashes[str(year)] = digest
+            if keep_all:
+                parsed.rows.append((year, cells))
+            if previous.get(str(year)) != digest:
+                parsed.changed.append((year, cells))
+    return parsed
+
+
 class Command(BaseCommand):
     help = (
-        "Import summarised weather data from a UK MetOffice dataset URL and store "
-        "as normalized DataRecord rows."
+        "Import summarised weather data from one or more UK MetOffice dataset URLs and "
+        "store as normalized DataRecord rows. Several datasets are downloaded "
+        "concurrently while completed ones are written to the database."
     )
 
     def add_arguments(self, parser) -> None:  # type: ignore[override]
         parser.add_argument(
-            "url",
+            "urls",
+            nargs="*",
             type=str,
             help=(
-                "MetOffice dataset URL, e.g. "
+                "MetOffice dataset URL(s), e.g. "
                 "https://www.metoffice.gov.uk/pub/data/weather/uk/climate/datasets/Tmax/date/UK.txt"
             ),
         )
+        parser.add_argument(
+            "--manifest",
+            type=str,
+            help="File listing dataset URLs, one per line ('#' starts a comment).",
+        )
+        parser.add_argument(
+            "--parameters",
+            type=str,
+            help=(
+                "Comma-separated parameters to import from the standard MetOffice layout, "
+                f"or 'all' ({', '.join(PARAMETERS)}). Combined with --regions."
+            ),
+        )
+        parser.add_argument(
+            "--regions",
+            type=str,
+            help=(
+                "Comma-separated regions to import from the standard MetOffice layout, "
+                "or 'all'. Combined with --parameters."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Maximum concurrent downloads (default: 8).",
+        )
         parser.add_argument(
             "--timeout",
             type=float,
@@ -48,68 +152,326 @@ class Command(BaseCommand):
             default=1000,
             help="Bulk insert chunk size (default: 1000).",
         )
+        parser.add_argument(
+            "--loader",
+            choices=["auto", *LOADERS],
+            default="auto",
+            help=(
+                "Database write path: 'copy' (PostgreSQL COPY into a staging table), "
+                "'executemany' (SQLite) or 'values' (multi-row INSERT). "
+                "Default 'auto' picks the fastest for the configured database."
+            ),
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Ignore stored ETag/content hashes and rewrite every row.",
+        )
+        parser.add_argument(
+            "--swap-partitions",
+            action="store_true",
+            help=(
+                "On a partitioned PostgreSQL table (see partition_records), reload every year of "
+                "a changed dataset into a new partition and swap it in, instead of upserting rows."
+            ),
+        )
 
     def handle(self, *args, **options) -> None:  # type: ignore[override]
-        url: str = options["url"]
         timeout: float = options["timeout"]
         dry_run: bool = options["dry_run"]
         chunk_size: int = options["chunk_size"]
+        workers: int = options["workers"]
+        force: bool = options["force"]
+        loader: str = options["loader"]
+        swap: bool = options["swap_partitions"]
 
-        try:
-            parameter, region = infer_parameter_and_region(url)
-        except ValueError as e:
-            raise CommandError(str(e))
+        urls = self._collect_urls(options)
+        if not urls:
+            raise CommandError(
+                "No datasets given; pass URL(s), --manifest, or --parameters/--regions."
+            )
 
-        self.stdout.write(self.style.NOTICE(f"Fetching: {url}"))
-        try:
-            resp = requests.get(url, timeout=timeout)
-            resp.raise_for_status()
-        except Exception as e:  # noqa: BLE001
-            raise CommandError(f"Failed to download dataset: {e}")
+        if not dry_run and loader != "auto" and connection.vendor not in LOADERS[loader].vendors:
+            raise CommandError(f"The '{loader}' loader does not support {connection.vendor}.")
+        partitioned = not dry_run and is_partitioned()
+        if swap and not dry_run and not partitioned:
+            raise CommandError("--swap-partitions needs a partitioned PostgreSQL table; run partition_records first.")
+
+        # Validate every URL up front so a typo fails before any download starts.
+        scopes = {}
+        for url in urls:
+            try:
+                scopes[url] = infer_parameter_and_region(url)
+            except ValueError as e:
+                raise CommandError(str(e))
 
-        text = resp.text
+        # Read all import state up front; worker threads only read this mapping.
+        datasets: Dict[Tuple[str, str], Dataset] = {
+            (d.parameter, d.region): d
+            for d in Dataset.objects.filter(
+                parameter__in={p for p, _ in scopes.values()},
+                region__in={r for _, r in scopes.values()},
+            )
+        }
+        session = build_session(pool_size=min(workers, len(urls)))
+
+        def download_and_parse(url: str) -> _Fetched:
+            state = None if force else datasets.get(scopes[url])
+            # HTTP validators only mean something to the server that issued them.
+            same_source = state is not None and state.source_url == url
+            try:
+                download = fetch_dataset(
+                    session,
+                    url,
+                    timeout,
+                    etag=state.etag if same_source else "",
+                    last_modified=state.last_modified if same_source else "",
+                )
+            except requests.RequestException as e:
+                raise CommandError(f"Failed to download dataset: {e}")
+            if download.not_modified:
+                return _Fetched(download)
+            # Parse the body as it streams in; the whole file is never held in memory.
+            started = time.perf_counter()
+            try:
+                parsed = _parse_stream(
+                    iter_column_batches(download.lines(), encoding=download.encoding),
+                    state.row_hashes if state else {},
+                    keep_all=swap,
+                )
+            except requests.RequestException as e:
+                raise CommandError(f"Failed to download dataset: {e}")
+            except Exception as e:  # noqa: BLE001
+                raise CommandError(f"Failed to parse dataset text: {e}")
+            if state and download.content_hash == state.content_hash:
+                return _Fetched(download)
+            return _Fetched(download, parsed, time.perf_counter() - started - download.read_seconds)
+
+        for url in urls:
+            self.stdout.write(self.style.NOTICE(f"Fetching: {url}"))
+
+        # Downloads and parsing run on the pool; database writes stay on this thread
+        # (Django connections are per-thread) and overlap with in-flight downloads.
+        failures: List[Tuple[str, Exception]] = []
+        self._changed: List[Tuple[str, str]] = []
+        # Datasets whose records or source changed; the rest were skipped as unchanged.
+        self._written = 0
+        self._metrics = ImportMetrics()
         try:
-            header, rows = parse_full(text)
-        except Exception as e:  # noqa: BLE001
-            raise CommandError(f"Failed to parse dataset text: {e}")
+            with session:
+                for url, result in run_concurrently(download_and_parse, urls, workers):
+                    if isinstance(result, Exception):
+                        failures.append((url, result))
+                        self._metrics.datasets_failed += 1
+                        if len(urls) > 1:
+                            self.stderr.write(self.style.ERROR(f"{url}: {result}"))
+                        continue
+                    self._metrics.download_bytes += result.download.size
+                    if result.parsed is not None:
+                        self._metrics.parsed += 1
+                        self._metrics.parse_seconds += result.parse_seconds
+                    parameter, region = scopes[url]
+                    self._store(
+                        url,
+                        parameter,
+                        region,
+                        result,
+                        datasets.get(scopes[url]),
+                        force,
+                        dry_run,
+                        chunk_size,
+                        loader,
+                        partitioned,
+                        swap,
+                    )
+        finally:
+            self._publish_snapshot()
+            if not dry_run:
+                self._metrics.publish()
+
+        if failures:
+            if len(urls) == 1:
+                raise CommandError(str(failures[0][1]))
+            raise CommandError(f"{len(failures)} of {len(urls)} datasets failed to import.")
+        if len(urls) > 1:
+            skipped = len(urls) - self._written
+            if dry_run:
+                summary = f"Checked {len(urls)} datasets (dry run; nothing written)."
+            else:
+                summary = f"Updated {self._written} of {len(urls)} datasets; {skipped} unchanged."
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def _changed_dataset(self, parameter: str, region: str) -> None:
+        """Expire cached responses for a committed change, or queue that for the snapshot."""
+        if store_path():
+            self._changed.append((parameter, region))
+        else:
+            invalidate_dataset(parameter, region)
+
+    def _publish_snapshot(self) -> None:
+        """Rewrite the dataset store snapshot, then expire the responses it makes stale.
+
+        In this order so no request can cache old snapshot data under a new version.
+        """
+        if not self._changed:
+            return
+        count = write_snapshot(store_path())
+        self.stdout.write(self.style.SUCCESS(f"Wrote dataset snapshot with {count} series."))
+        for parameter, region in self._changed:
+            invalidate_dataset(parameter, region)
+
+    def _collect_urls(self, options) -> List[str]:
+        """Merge positional URLs, manifest entries and the parameter/region matrix."""
+        urls: List[str] = list(options["urls"])
+        if options["manifest"]:
+            try:
+                urls.extend(read_manifest(options["manifest"]))
+            except OSError as e:
+                raise CommandError(f"Failed to read manifest: {e}")
+        if options["parameters"] or options["regions"]:
+            parameters = _split_choice(options["parameters"], PARAMETERS)
+            regions = _split_choice(options["regions"], REGIONS)
+            urls.extend(dataset_urls(parameters, regions))
+        # Preserve order but drop duplicates so a dataset is never written twice.
+        return list(dict.fromkeys(urls))
+
+    def _store(
+        self,
+        url: str,
+        parameter: str,
+        region: str,
+        fetched: _Fetched,
+        dataset: Optional[Dataset],
+        force: bool,
+        dry_run: bool,
+        chunk_size: int,
+        loader: str,
+        partitioned: bool,
+        swap: bool,
+    ) -> None:
+        """Write the year rows of one dataset that changed since its last import."""
+        label = f"[{parameter}/{region}]"
+        now = timezone.now()
+
+        if fetched.parsed is None:
+            reason = "HTTP 304" if fetched.download.not_modified else "identical content"
+            self.stdout.write(self.style.SUCCESS(f"{label} Unchanged since last import ({reason}); skipped."))
+            self._metrics.datasets_unchanged += 1
+            if not dry_run and dataset is not None:
+                # Records expose source_url, so a moved dataset counts as a change.
+                moved = dataset.source_url != url
+                Dataset.objects.filter(pk=dataset.pk).update(
+                    source_url=url,
+                    etag=fetched.download.etag,
+                    last_modified=fetched.download.last_modified,
+                    checked_at=now,
+                    imported_at=now if moved else dataset.imported_at,
+                    data_version=F("data_version") + int(moved),
+                )
+                if moved:
+                    self._written += 1
+                    self._changed_dataset(parameter, region)
+            return
+
+        previous: Dict[str, str] = dataset.row_hashes if dataset and not force else {}
+        parsed = fetched.parsed
+        row_hashes, rows, changed = parsed.row_hashes, parsed.rows, parsed.changed
+        total_cells, column_count = parsed.total_cells, parsed.column_count
+        removed_years = [int(y) for y in previous if y not in row_hashes]
 
-        total_cells = sum(len(r.values) for r in rows)
         self.stdout.write(self.style.NOTICE(
-            f"Parsed header with {len(header.columns)-1} columns; years={len(rows)}; cells={total_cells}"
+            f"{label} Parsed header with {column_count} columns; "
+            f"years={len(row_hashes)}; cells={total_cells}"
+        ))
+        self.stdout.write(self.style.NOTICE(
+            f"{label} Changed years={len(changed)}; removed years={len(removed_years)}"
         ))
 
         if dry_run:
-            self.stdout.write(self.style.SUCCESS("Dry run complete; no data written."))
+            self.stdout.write(self.style.SUCCESS(f"{label} Dry run; no data written."))
             return
 
-        to_create: List[DataRecord] = []
-        for row in rows:
-            for col_name, val in row.values:
-                to_create.append(
-                    DataRecord(
-                        year=row.year,
-                        parameter=parameter,
-                        region=region,
-                        column_name=col_name,
-                        value=val,
-                        source_url=url,
-                    )
+        with transaction.atomic():
+            if dataset is None:
+                dataset, _ = Dataset.objects.get_or_create(
+                    parameter=parameter, region=region, defaults={"source_url": url}
                 )
+            # A swap replaces the whole partition, so it needs every year, not just the changed ones.
+            swapping = swap and bool(changed or removed_years)
+            if partitioned and not swapping:
+                create_partition(dataset.pk)
+            written = rows if swapping else changed
+            column_ids = resolve_column_ids(col for _, cells in written for col, _ in cells)
+            to_write: List[RecordRow] = [
+                (dataset.pk, year, column_ids[col_name], val, now)
+                for year, cells in written
+                for col_name, val in cells
+            ]
 
-        created_total = 0
-        with transaction.atomic():
-            # Insert in chunks; ignore conflicts per unique constraint for idempotency.
-            for i in range(0, len(to_create), chunk_size):
-                chunk = to_create[i : i + chunk_size]
-                DataRecord.objects.bulk_create(chunk, ignore_conflicts=True, batch_size=chunk_size)
-                created_total += len(chunk)
-
-        # We cannot know exact number skipped due to conflicts without extra queries.
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Import attempted {len(to_create)} records (inserts attempted in chunks)."
+            if swapping:
+                inserted, deleted = swap_partition(dataset.pk, to_write)
+                result = UpsertResult(inserted=inserted)
+            else:
+                # Upsert only the changed year rows so revised values replace stale ones.
+                result = upsert_records(to_write, chunk_size=chunk_size, loader=loader)
+                # A revised year may have lost a cell (e.g. a value withdrawn to '---').
+                scope = DataRecord.objects.filter(dataset=dataset)
+                deleted = 0
+                for year, cells in changed:
+                    if str(year) in previous:
+                        deleted += scope.filter(year=year).exclude(
+                            column_id__in=[column_ids[col] for col, _ in cells]
+                        ).delete()[0]
+                if removed_years:
+                    deleted += scope.filter(year__in=removed_years).delete()[0]
+                if not previous:
+                    # With no stored row hashes (--force, or a dataset imported before they
+                    # existed) nothing says which years or cells were dropped upstream, so
+                    # remove every record the parsed file no longer contains.
+                    kept = {(year, column_ids[col]) for year, cells in changed for col, _ in cells}
+                    stale = [
+                        pk
+                        for pk, year, column_id in scope.values_list("id", "year", "column_id").iterator()
+                        if (year, column_id) not in kept
+                    ]
+                    for start in range(0, len(stale), chunk_size):
+                        deleted += DataRecord.objects.filter(pk__in=stale[start : start + chunk_size]).delete()[0]
+            data_changed = bool(result.inserted or result.updated or deleted)
+            if data_changed:
+                rebuild_rollups(dataset.pk, rebuild_series(dataset.pk))
+            content_changed = data_changed or dataset.source_url != url
+            if content_changed:
+                # After commit, so a request cannot re-cache the old rows under the new version.
+                transaction.on_commit(lambda: self._changed_dataset(parameter, region))
+            Dataset.objects.filter(pk=dataset.pk).update(
+                source_url=url,
+                etag=fetched.download.etag,
+                last_modified=fetched.download.last_modified,
+                content_hash=fetched.download.content_hash,
+                row_hashes=row_hashes,
+                checked_at=now,
+                imported_at=now if content_changed else dataset.imported_at,
+                data_version=F("data_version") + int(content_changed),
             )
-        )
+
+        self._written += int(content_changed)
+        self._metrics.datasets_imported += 1
+        self._metrics.rows_inserted += result.inserted
+        self._metrics.rows_updated += result.updated
+        self._metrics.rows_unchanged += result.unchanged
+        self._metrics.rows_deleted += deleted
+        if swapping:
+            summary = f"Swapped in a partition of {result.inserted} rows, replacing {deleted}"
+        else:
+            summary = f"Inserted={result.inserted} Updated={result.updated} Unchanged={result.unchanged}"
+        self.stdout.write(self.style.SUCCESS(f"{label} {summary} (from {len(changed)} changed years)."))
         self.stdout.write(self.style.SUCCESS(
-            f"Done. Parameter={parameter} Region={region} Years={len(rows)} Columns={len(header.columns)-1}"
+            f"Done. Parameter={parameter} Region={region} Years={len(row_hashes)} Columns={column_count}"
         ))
+
+
+def _split_choice(value: str | None, known: Tuple[str, ...]) -> List[str]:
+    """Parse a comma-separated option; empty or 'all' selects every known name."""
+    if not value or value.strip().lower() == "all":
+        return list(known)
+    return [v.strip() for v in value.split(",") if v.strip()]
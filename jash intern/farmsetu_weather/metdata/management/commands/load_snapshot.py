@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+from typing import List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from metdata.cache import invalidate_dataset
+from metdata.loaders import LOADERS, RecordRow, resolve_column_ids, upsert_records
+from metdata.models import DataRecord, Dataset
+from metdata.partitions import is_partitioned, swap_partition
+from metdata.rollups import rebuild_rollups
+from metdata.series import unpack_values, write_series
+from metdata.store import DatasetStore, store_path, write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Restore datasets from a snapshot written by dump_snapshot. Every dataset in the "
+        "snapshot replaces the records of the same (parameter, region); others are kept."
+    )
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "path",
+            nargs="?",
+            help="Snapshot file to read (default: DATASET_STORE_PATH).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Bulk insert chunk size (default: 5000).",
+        )
+        parser.add_argument(
+            "--loader",
+            choices=["auto", *LOADERS],
+            default="auto",
+            help="Database write path, as for import_metoffice (default: auto).",
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[override]
+        path = options["path"] or store_path()
+        loader: str = options["loader"]
+        if not path:
+            raise CommandError("No snapshot path given and DATASET_STORE_PATH is not set.")
+        if loader != "auto" and connection.vendor not in LOADERS[loader].vendors:
+            raise CommandError(f"The '{loader}' loader does not support {connection.vendor}.")
+        try:
+            snapshot = DatasetStore(path)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Failed to read snapshot: {e}")
+
+        restored: List[Tuple[str, str]] = []
+        records = 0
+        partitioned = is_partitioned()
+        with transaction.atomic():
+            column_ids = resolve_column_ids(snapshot.columns)
+            for (parameter, region), stored in snapshot.datasets.items():
+                fields = stored.model_fields()
+                existing = Dataset.objects.filter(parameter=parameter, region=region).first()
+                if existing is not None:
+                    # Move past the version clients may have cached an ETag for.
+                    fields["data_version"] = max(fields["data_version"], existing.data_version + 1)
+                dataset, _ = Dataset.objects.update_or_create(
+                    parameter=parameter, region=region, defaults=fields
+                )
+                rows: List[RecordRow] = [
+                    (dataset.pk, year, column_ids[column], value, imported_at)
+                    for column, year, value, imported_at in snapshot.records(stored)
+                ]
+                if partitioned:
+                    swap_partition(dataset.pk, rows)
+                else:
+                    DataRecord.objects.filter(dataset=dataset).delete()
+                    upsert_records(rows, chunk_size=options["chunk_size"], loader=loader)
+                series = {column_ids[column]: (start, unpack_values(blob)) for column, start, blob in stored.series}
+                write_series(dataset.pk, series)
+                rebuild_rollups(dataset.pk, series)
+                restored.append((parameter, region))
+                records += len(rows)
+
+        # The store may be this very file; only rewrite a different one.
+        target = store_path()
+        if target and os.path.abspath(target) != os.path.abspath(path):
+            write_snapshot(target)
+        for parameter, region in restored:
+            invalidate_dataset(parameter, region)
+        self.stdout.write(self.style.SUCCESS(
+            f"Restored {len(restored)} datasets ({records} records) from {path} "
+            f"(snapshot of {snapshot.created_at})."
+        ))
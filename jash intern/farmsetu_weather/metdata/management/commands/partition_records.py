@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from metdata.partitions import is_partitioned, partition_records, unpartition_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert metdata_datarecord into a table list-partitioned by dataset, with BRIN "
+        "indexes on year and imported_at (PostgreSQL only; see metdata.partitions). "
+        "Existing records are kept. The table is locked while it is rewritten."
+    )
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "--revert",
+            action="store_true",
+            help="Convert a partitioned table back into a plain one.",
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[override]
+        if connection.vendor != "postgresql":
+            raise CommandError(f"Partitioning needs PostgreSQL, not {connection.vendor}.")
+        partitioned = is_partitioned()
+        if options["revert"]:
+            if not partitioned:
+                raise CommandError("metdata_datarecord is not partitioned.")
+            unpartition_records()
+            self.stdout.write(self.style.SUCCESS("Converted metdata_datarecord back into a plain table."))
+        else:
+            if partitioned:
+                raise CommandError("metdata_datarecord is already partitioned.")
+            partition_records()
+            self.stdout.write(self.style.SUCCESS("Partitioned metdata_datarecord by dataset."))
@@ -0,0 +1,430 @@
+"""Per-request query/timing instrumentation and a Prometheus-format `/metrics` endpoint.
+
+`MetricsMiddleware` times every request that resolves to a metdata view and records:
+
+- the number of SQL queries and the time spent in them (via `connection.execute_wrapper`),
+- the time spent rendering the response (DRF serialisation, from `process_template_response`
+  to the post-render callback),
+- the total time through the middleware stack.
+
+They are sent back as a `Server-Timing` header (visible in the browser's network panel)
+and aggregated into per-view histograms. A query-count histogram makes an N+1 show up
+as a shift into the higher buckets; queries slower than `API_SLOW_QUERY_MS` are counted
+and logged with their SQL, which is how a lost index (a full scan) surfaces.
+
+A streamed response (an export) runs most of its queries while the body is consumed,
+after the headers have gone out, so it gets no `Server-Timing` header; `TimedStream`
+times the body and records the request once it is exhausted or closed.
+
+Request histograms live in process memory: each worker process exposes its own, so
+scrape every worker or run the metrics through a single process. `import_metoffice`
+usually runs elsewhere, so its counters (`ImportMetrics`) are added to the Django
+cache instead, and need a shared backend (see `CACHE_URL`) to reach the web server.
+
+`metrics_view` only answers clients in `API_METRICS_ALLOWED_IPS` or presenting
+`API_METRICS_TOKEN` as a bearer token; everyone else gets 403.
+"""
+from __future__ import annotations
+
+import bisect
+import hmac
+import ipaddress
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpRequest, HttpResponse, HttpResponseBase, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = SECONDS_BUCKETS
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels((*key, ("le", _format_value(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter("metdata_requests_total", "API requests by view, method and status.", ("view", "method", "status"))
+REQUEST_SECONDS = Histogram("metdata_request_duration_seconds", "Total request time.", ("view", "method"))
+DB_SECONDS = Histogram("metdata_request_db_seconds", "Time spent in SQL queries per request.", ("view",))
+QUERIES = Histogram("metdata_request_queries", "SQL queries per request.", ("view",), QUERY_BUCKETS)
+RENDER_SECONDS = Histogram("metdata_request_render_seconds", "Response serialisation time.", ("view",))
+SLOW_QUERIES = Counter("metdata_slow_queries_total", "Queries slower than API_SLOW_QUERY_MS.", ("view",))
+REGISTRY = (REQUESTS, REQUEST_SECONDS, DB_SECONDS, QUERIES, RENDER_SECONDS, SLOW_QUERIES)
+
+
+class QueryTimer:
+    """`execute_wrapper` that counts queries and sums their time."""
+
+    def __init__(self, slow_seconds: float) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.slow: List[Tuple[float, str]] = []
+        self._slow_seconds = slow_seconds
+
+    def __call__(self, execute: Callable, sql: str, params, many: bool, context) -> object:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if self._slow_seconds and elapsed >= self._slow_seconds:
+                self.slow.append((elapsed, sql))
+
+
+def _add_wrapper(timer: QueryTimer) -> None:
+    connection.execute_wrappers.append(timer)
+
+
+def _remove_wrapper(timer: QueryTimer) -> None:
+    connection.execute_wrappers.remove(timer)
+
+
+class TimedStream:
+    """Iterate a streaming response body with `timer` attached to the connection.
+
+    `finish` is called once, when the body is exhausted or the response is closed
+    (including a client disconnect mid-stream).
+    """
+
+    def __init__(self, chunks: Iterable[bytes], timer: QueryTimer, finish: Callable[[], None]) -> None:
+        self._chunks = iter(chunks)
+        self._timer = timer
+        self._finish: Optional[Callable[[], None]] = finish
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            # Per chunk, on whichever thread consumes the body (under ASGI, an executor thread).
+            with connection.execute_wrapper(self._timer):
+                return next(self._chunks)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._finish is not None:
+            finish, self._finish = self._finish, None
+            finish()
+
+
+async def _atimed_stream(chunks: AsyncIterator[bytes], timer: QueryTimer, finish: Callable[[], None]):
+    """`TimedStream` for an async streaming body."""
+    await sync_to_async(_add_wrapper)(timer)
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await sync_to_async(_remove_wrapper)(timer)
+        finish()
+
+
+def _metdata_view(request: HttpRequest) -> Optional[str]:
+    """The URL name of the metdata view that served `request`, if any."""
+    match = getattr(request, "resolver_match", None)
+    if match is None or match.func is metrics_view or not match.func.__module__.startswith("metdata."):
+        return None
+    return match.url_name or match.view_name
+
+
+class MetricsMiddleware:
+    """Record query, render and total time for metdata API requests (see module docstring).
+
+    Add it first in `MIDDLEWARE` so the total covers the whole stack; `API_METRICS=0`
+    switches it off. Works under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase]) -> None:
+        if not getattr(settings, "API_METRICS", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, "API_SLOW_QUERY_MS", 0) / 1000
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        if self.is_async:
+            return self.__acall__(request)  # type: ignore[return-value]
+        start = time.perf_counter()
+        timer = QueryTimer(self.slow_seconds)
+        request._metrics_render = 0.0  # type: ignore[attr-defined]
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        return self._record(request, response, timer, start)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        start = time.perf_counter()
+        timer = QueryTimer(self.slow_seconds)
+        request._metrics_render = 0.0  # type: ignore[attr-defined]
+        # Under ASGI, sync views and async ORM calls run on the request's thread-sensitive
+        # executor thread, whose connection is not the one this coroutine sees.
+        await sync_to_async(_add_wrapper)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(timer)
+        return self._record(request, response, timer, start)
+
+    def _record(self, request: HttpRequest, response: HttpResponseBase, timer: QueryTimer, start: float):
+        view = _metdata_view(request)
+        if view is None:
+            return response
+        if response.streaming:
+            # The body's queries run after this returns; record once it has been sent.
+            def finish() -> None:
+                self._observe(request, response, view, timer, time.perf_counter() - start)
+
+            if response.is_async:  # type: ignore[attr-defined]
+                response.streaming_content = _atimed_stream(response.streaming_content, timer, finish)  # type: ignore[attr-defined]
+            else:
+                response.streaming_content = TimedStream(response.streaming_content, timer, finish)  # type: ignore[attr-defined]
+            return response
+        total = time.perf_counter() - start
+        self._observe(request, response, view, timer, total)
+        render = request._metrics_render  # type: ignore[attr-defined]
+        response["Server-Timing"] = (
+            f'db;dur={timer.seconds * 1000:.1f};desc="{timer.count} queries", '
+            f"render;dur={render * 1000:.1f}, total;dur={total * 1000:.1f}"
+        )
+        return response
+
+    def _observe(self, request: HttpRequest, response: HttpResponseBase, view: str, timer: QueryTimer, total: float):
+        render = request._metrics_render  # type: ignore[attr-defined]
+        REQUESTS.inc(view=view, method=request.method or "", status=str(response.status_code))
+        REQUEST_SECONDS.observe(total, view=view, method=request.method or "")
+        DB_SECONDS.observe(timer.seconds, view=view)
+        QUERIES.observe(timer.count, view=view)
+        RENDER_SECONDS.observe(render, view=view)
+        if timer.slow:
+            SLOW_QUERIES.inc(len(timer.slow), view=view)
+            for elapsed, sql in timer.slow:
+                logger.warning("Slow query in %s (%.1f ms): %s", view, elapsed * 1000, sql)
+
+    def process_template_response(self, request: HttpRequest, response):
+        # Called just before Django renders a DRF Response; time until it has rendered.
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_render = time.perf_counter() - start  # type: ignore[attr-defined]
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+@dataclass
+class ImportMetrics:
+    """Totals from one `import_metoffice` run, added to the cached counters by `publish`."""
+
+    datasets_imported: int = 0
+    datasets_unchanged: int = 0
+    datasets_failed: int = 0
+    download_bytes: int = 0
+    parse_seconds: float = 0.0
+    parsed: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    rows_deleted: int = 0
+
+    @property
+    def conflicts(self) -> int:
+        """Rows that hit an existing (dataset, year, column) record."""
+        return self.rows_updated + self.rows_unchanged
+
+    def publish(self) -> None:
+        """Add this run to the counters shared through the cache."""
+        values = {name: getattr(self, name) for name in _IMPORT_FIELDS}
+        values["parse_seconds"] = round(self.parse_seconds * 1_000_000)
+        values["conflicts"] = self.conflicts
+        values["runs"] = 1
+        for name, amount in values.items():
+            if amount:
+                key = f"{_IMPORT_KEY}:{name}"
+                cache.add(key, 0, None)
+                cache.incr(key, amount)
+        cache.set(f"{_IMPORT_KEY}:last_run", time.time(), None)
+
+
+_IMPORT_KEY = "metdata:metrics:import"
+_IMPORT_FIELDS = tuple(f.name for f in fields(ImportMetrics))
+# metric: (type, help, [(cache key, labels, scale)])
+_IMPORT_METRICS: Dict[str, Tuple[str, str, List[Tuple[str, Labels, float]]]] = {
+    "metdata_import_runs_total": ("counter", "Completed import_metoffice runs.", [("runs", (), 1)]),
+    "metdata_import_datasets_total": (
+        "counter",
+        "Datasets processed, by outcome.",
+        [(f"datasets_{outcome}", (("outcome", outcome),), 1) for outcome in ("imported", "unchanged", "failed")],
+    ),
+    "metdata_import_download_bytes_total": (
+        "counter",
+        "Bytes downloaded from the MetOffice (0 for HTTP 304).",
+        [("download_bytes", (), 1)],
+    ),
+    "metdata_import_parse_seconds": (
+        "summary",
+        "Time spent parsing changed dataset files.",
+        [("parse_seconds", (), 1_000_000), ("parsed", (), 1)],
+    ),
+    "metdata_import_rows_total": (
+        "counter",
+        "Record rows written, by action.",
+        [
+            (f"rows_{action}", (("action", action),), 1)
+            for action in ("inserted", "updated", "unchanged", "deleted")
+        ],
+    ),
+    "metdata_import_conflicts_total": (
+        "counter",
+        "Upserted rows that conflicted with an existing record (updated or unchanged).",
+        [("conflicts", (), 1)],
+    ),
+    "metdata_import_last_run_timestamp_seconds": (
+        "gauge",
+        "Unix time the last import run finished.",
+        [("last_run", (), 1)],
+    ),
+}
+
+
+def _import_lines() -> List[str]:
+    keys = [f"{_IMPORT_KEY}:{key}" for _, _, samples in _IMPORT_METRICS.values() for key, _, _ in samples]
+    stored = cache.get_many(keys)
+    lines: List[str] = []
+    for metric, (kind, documentation, samples) in _IMPORT_METRICS.items():
+        lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} {kind}"]
+        if kind == "summary":
+            (sum_key, _, scale), (count_key, _, _) = samples
+            lines.append(f"{metric}_sum {_format_value(stored.get(f'{_IMPORT_KEY}:{sum_key}', 0) / scale)}")
+            lines.append(f"{metric}_count {_format_value(stored.get(f'{_IMPORT_KEY}:{count_key}', 0))}")
+            continue
+        for key, labels, scale in samples:
+            value = stored.get(f"{_IMPORT_KEY}:{key}")
+            if value is not None or kind == "counter":
+                lines.append(f"{metric}{_format_labels(labels)} {_format_value((value or 0) / scale)}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    lines.extend(_import_lines())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_allowed(request: HttpRequest) -> bool:
+    """Whether `request` may read /metrics: a matching bearer token or an allowed address.
+
+    `REMOTE_ADDR` is the peer address; behind a reverse proxy that is the proxy, so
+    either allow only the proxy and restrict there, or use the token.
+    """
+    token: str = getattr(settings, "API_METRICS_TOKEN", "")
+    if token and hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    for allowed in getattr(settings, "API_METRICS_ALLOWED_IPS", ()):
+        try:
+            if address in ipaddress.ip_network(allowed, strict=False):
+                return True
+        except ValueError:
+            logger.warning("Ignoring invalid API_METRICS_ALLOWED_IPS entry %r.", allowed)
+    return False
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus text exposition of the request and import metrics."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden("Metrics are not available to this client.\n", content_type="text/plain")
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DatasetState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("source_url", models.URLField(max_length=500, unique=True)),
+                ("parameter", models.CharField(max_length=64)),
+                ("region", models.CharField(max_length=64)),
+                ("etag", models.CharField(blank=True, default="", max_length=256)),
+                ("last_modified", models.CharField(blank=True, default="", max_length=64)),
+                ("content_hash", models.CharField(blank=True, default="", max_length=64)),
+                ("row_hashes", models.JSONField(blank=True, default=dict)),
+                ("checked_at", models.DateTimeField(blank=True, null=True)),
+                ("imported_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Dataset State",
+                "verbose_name_plural": "Dataset States",
+                "ordering": ["parameter", "region"],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_series(apps, schema_editor):
+    """Pack the existing DataRecord rows into one DataSeries row per column."""
+    DataRecord = apps.get_model("metdata", "DataRecord")
+    DataSeries = apps.get_model("metdata", "DataSeries")
+    columns = {}
+    cells = DataRecord.objects.order_by().values_list("parameter", "region", "column_name", "year", "value")
+    for parameter, region, column_name, year, value in cells.iterator(chunk_size=5000):
+        columns.setdefault((parameter, region, column_name), {})[year] = value
+    rows = []
+    for (parameter, region, column_name), points in columns.items():
+        start = min(points)
+        values = array("d", [math.nan]) * (max(points) - start + 1)
+        for year, value in points.items():
+            values[year - start] = value
+        if sys.byteorder != "little":
+            values.byteswap()  # stored little-endian
+        rows.append(
+            DataSeries(
+                parameter=parameter,
+                region=region,
+                column_name=column_name,
+                start_year=start,
+                values=values.tobytes(),
+            )
+        )
+    DataSeries.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0002_datasetstate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataSeries",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("parameter", models.CharField(max_length=64)),
+                ("region", models.CharField(max_length=64)),
+                ("column_name", models.CharField(max_length=64)),
+                ("start_year", models.PositiveIntegerField()),
+                ("values", models.BinaryField()),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Data Series",
+                "verbose_name_plural": "Data Series",
+                "ordering": ["parameter", "region", "column_name"],
+                "constraints": [models.UniqueConstraint(fields=("parameter", "region", "column_name"), name="uniq_series_scope")],
+            },
+        ),
+        migrations.RunPython(backfill_series, migrations.RunPython.noop),
+    ]
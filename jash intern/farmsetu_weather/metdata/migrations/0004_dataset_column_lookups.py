@@ -0,0 +1,103 @@
+# Normalise dimension strings into lookup tables (schema, part 1 of 3)
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Create `Column`, turn `DatasetState` into `Dataset` and add nullable foreign keys.
+
+    The old constraints and indexes on the string columns are dropped (and the columns
+    made nullable) here, before the data migration, so that reversing the data
+    migration can refill the strings before those constraints are recreated.
+    """
+
+    dependencies = [
+        ("metdata", "0003_dataseries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Column",
+            fields=[
+                ("id", models.SmallAutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=64, unique=True)),
+            ],
+            options={
+                "verbose_name": "Column",
+                "verbose_name_plural": "Columns",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.RenameModel(old_name="DatasetState", new_name="Dataset"),
+        migrations.AlterModelOptions(
+            name="dataset",
+            options={"ordering": ["parameter", "region"], "verbose_name": "Dataset", "verbose_name_plural": "Datasets"},
+        ),
+        migrations.AlterField(
+            model_name="dataset",
+            name="id",
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name="dataset",
+            name="source_url",
+            field=models.URLField(max_length=500),
+        ),
+        migrations.AddField(
+            model_name="datarecord",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="records",
+                to="metdata.dataset",
+            ),
+        ),
+        migrations.AddField(
+            model_name="datarecord",
+            name="column",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="records",
+                to="metdata.column",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dataseries",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="series",
+                to="metdata.dataset",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dataseries",
+            name="column",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="series",
+                to="metdata.column",
+            ),
+        ),
+        migrations.RemoveConstraint(model_name="datarecord", name="uniq_record_scope"),
+        # Made nullable here so the columns can be dropped and, on reverse, re-added empty.
+        migrations.AlterField(model_name="datarecord", name="parameter", field=models.CharField(max_length=64, null=True)),
+        migrations.AlterField(model_name="datarecord", name="region", field=models.CharField(max_length=64, null=True)),
+        migrations.AlterField(model_name="datarecord", name="column_name", field=models.CharField(max_length=64, null=True)),
+        migrations.AlterField(model_name="datarecord", name="source_url", field=models.TextField(null=True)),
+        migrations.AlterField(model_name="dataseries", name="parameter", field=models.CharField(max_length=64, null=True)),
+        migrations.AlterField(model_name="dataseries", name="region", field=models.CharField(max_length=64, null=True)),
+        migrations.AlterField(model_name="dataseries", name="column_name", field=models.CharField(max_length=64, null=True)),
+        migrations.RemoveIndex(model_name="datarecord", name="idx_param_region_year"),
+        migrations.RemoveIndex(model_name="datarecord", name="idx_column"),
+        migrations.RemoveIndex(model_name="datarecord", name="idx_param_region_col"),
+        migrations.RemoveConstraint(model_name="dataseries", name="uniq_series_scope"),
+    ]
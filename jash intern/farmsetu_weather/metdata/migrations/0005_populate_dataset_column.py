@@ -0,0 +1,75 @@
+# Normalise dimension strings into lookup tables (data, part 2 of 3)
+from __future__ import annotations
+
+from django.db import migrations
+from django.db.models import F, Max
+
+
+def populate_lookups(apps, schema_editor):
+    """Create Dataset/Column rows for every distinct string and point records at them.
+
+    Issues one UPDATE per dataset and one per column rather than touching rows
+    individually.
+    """
+    DataRecord = apps.get_model("metdata", "DataRecord")
+    DataSeries = apps.get_model("metdata", "DataSeries")
+    Dataset = apps.get_model("metdata", "Dataset")
+    Column = apps.get_model("metdata", "Column")
+
+    names = set(DataRecord.objects.order_by().values_list("column_name", flat=True).distinct())
+    names |= set(DataSeries.objects.order_by().values_list("column_name", flat=True).distinct())
+    Column.objects.bulk_create([Column(name=name) for name in sorted(names)])
+    column_ids = dict(Column.objects.values_list("name", "id"))
+
+    # Import state was keyed by URL; keep the most recently imported state per scope.
+    dataset_ids = {}
+    states = Dataset.objects.order_by("parameter", "region", F("imported_at").desc(nulls_last=True), "-id")
+    for state in states:
+        key = (state.parameter, state.region)
+        if key in dataset_ids:
+            state.delete()
+        else:
+            dataset_ids[key] = state.id
+    scopes = DataRecord.objects.order_by().values("parameter", "region").annotate(url=Max("source_url"))
+    for scope in scopes:
+        key = (scope["parameter"], scope["region"])
+        if key not in dataset_ids:
+            dataset = Dataset.objects.create(parameter=key[0], region=key[1], source_url=scope["url"])
+            dataset_ids[key] = dataset.id
+
+    for (parameter, region), dataset_id in dataset_ids.items():
+        DataRecord.objects.filter(parameter=parameter, region=region).update(dataset_id=dataset_id)
+        DataSeries.objects.filter(parameter=parameter, region=region).update(dataset_id=dataset_id)
+    for name, column_id in column_ids.items():
+        DataRecord.objects.filter(column_name=name).update(column_id=column_id)
+        DataSeries.objects.filter(column_name=name).update(column_id=column_id)
+
+
+def restore_strings(apps, schema_editor):
+    """Refill the denormalised string columns from the lookup tables."""
+    DataRecord = apps.get_model("metdata", "DataRecord")
+    DataSeries = apps.get_model("metdata", "DataSeries")
+    Dataset = apps.get_model("metdata", "Dataset")
+    Column = apps.get_model("metdata", "Column")
+
+    for dataset in Dataset.objects.all():
+        DataRecord.objects.filter(dataset_id=dataset.id).update(
+            parameter=dataset.parameter, region=dataset.region, source_url=dataset.source_url
+        )
+        DataSeries.objects.filter(dataset_id=dataset.id).update(
+            parameter=dataset.parameter, region=dataset.region
+        )
+    for column in Column.objects.all():
+        DataRecord.objects.filter(column_id=column.id).update(column_name=column.name)
+        DataSeries.objects.filter(column_id=column.id).update(column_name=column.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0004_dataset_column_lookups"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_lookups, restore_strings),
+    ]
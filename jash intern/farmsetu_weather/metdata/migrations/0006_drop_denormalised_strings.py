@@ -0,0 +1,97 @@
+# Normalise dimension strings into lookup tables (schema, part 3 of 3)
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0005_populate_dataset_column"),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name="datarecord", name="parameter"),
+        migrations.RemoveField(model_name="datarecord", name="region"),
+        migrations.RemoveField(model_name="datarecord", name="column_name"),
+        migrations.RemoveField(model_name="datarecord", name="source_url"),
+        migrations.RemoveField(model_name="dataseries", name="parameter"),
+        migrations.RemoveField(model_name="dataseries", name="region"),
+        migrations.RemoveField(model_name="dataseries", name="column_name"),
+        migrations.AlterField(
+            model_name="datarecord",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="records",
+                to="metdata.dataset",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="datarecord",
+            name="column",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="records",
+                to="metdata.column",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="datarecord",
+            name="year",
+            field=models.PositiveSmallIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="dataseries",
+            name="dataset",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="series",
+                to="metdata.dataset",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dataseries",
+            name="column",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="series",
+                to="metdata.column",
+            ),
+        ),
+        migrations.AlterModelOptions(
+            name="datarecord",
+            options={
+                "ordering": ["dataset__parameter", "dataset__region", "year", "column__name"],
+                "verbose_name": "Data Record",
+                "verbose_name_plural": "Data Records",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="dataseries",
+            options={
+                "ordering": ["dataset", "column"],
+                "verbose_name": "Data Series",
+                "verbose_name_plural": "Data Series",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dataset",
+            constraint=models.UniqueConstraint(fields=("parameter", "region"), name="uniq_dataset_scope"),
+        ),
+        migrations.AddConstraint(
+            model_name="datarecord",
+            constraint=models.UniqueConstraint(fields=("dataset", "year", "column"), name="uniq_record_scope"),
+        ),
+        migrations.AddIndex(
+            model_name="datarecord",
+            index=models.Index(fields=["dataset", "column", "year"], name="idx_param_region_col"),
+        ),
+        migrations.AddConstraint(
+            model_name="dataseries",
+            constraint=models.UniqueConstraint(fields=("dataset", "column"), name="uniq_series_scope"),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def _rollup(DataRollup, series, decade, points):
+    values = [value for _, value in points]
+    return DataRollup(
+        dataset_id=series.dataset_id,
+        column_id=series.column_id,
+        decade=decade,
+        count=len(values),
+        total=math.fsum(values),
+        sum_squares=math.fsum(v * v for v in values),
+        minimum=min(values),
+        maximum=max(values),
+        first_year=points[0][0],
+        last_year=points[-1][0],
+    )
+
+
+def backfill_rollups(apps, schema_editor):
+    """Summarise every existing DataSeries into whole-column and per-decade rollups."""
+    DataSeries = apps.get_model("metdata", "DataSeries")
+    DataRollup = apps.get_model("metdata", "DataRollup")
+    rows = []
+    for series in DataSeries.objects.order_by("dataset_id", "column_id").iterator():
+        values = array("d")
+        values.frombytes(bytes(series.values))
+        if sys.byteorder != "little":
+            values.byteswap()  # stored little-endian
+        points = [
+            (series.start_year + offset, value) for offset, value in enumerate(values) if not math.isnan(value)
+        ]
+        if not points:
+            continue
+        rows.append(_rollup(DataRollup, series, None, points))
+        by_decade = {}
+        for year, value in points:
+            by_decade.setdefault(year - year % 10, []).append((year, value))
+        for decade, decade_points in sorted(by_decade.items()):
+            rows.append(_rollup(DataRollup, series, decade, decade_points))
+    DataRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0006_drop_denormalised_strings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("decade", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("count", models.PositiveIntegerField()),
+                ("total", models.FloatField()),
+                ("sum_squares", models.FloatField()),
+                ("minimum", models.FloatField()),
+                ("maximum", models.FloatField()),
+                ("first_year", models.PositiveSmallIntegerField()),
+                ("last_year", models.PositiveSmallIntegerField()),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("column", models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="rollups", to="metdata.column")),
+                ("dataset", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="rollups", to="metdata.dataset")),
+            ],
+            options={
+                "verbose_name": "Data Rollup",
+                "verbose_name_plural": "Data Rollups",
+                "ordering": ["dataset", "column", "decade"],
+                "constraints": [models.UniqueConstraint(fields=("dataset", "column", "decade"), name="uniq_rollup_scope")],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
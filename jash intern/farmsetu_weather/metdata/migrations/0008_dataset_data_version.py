@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0007_datarollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="data_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0008_dataset_data_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="datarecord",
+            index=models.Index(fields=["imported_at"], name="idx_record_imported"),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import migrations
+
+# A frozen copy of the conversion in metdata.partitions as of this migration, so later
+# changes to that module cannot alter what this migration does.
+TABLE = "metdata_datarecord"
+DATASET_TABLE = "metdata_dataset"
+BRIN_COLUMNS = ("year", "imported_at")
+
+
+def is_partitioned(conn) -> bool:
+    if conn.vendor != "postgresql":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [TABLE])
+        return cursor.fetchone()[0]
+
+
+def rebuild_table(conn, partitioned: bool) -> None:
+    """Recreate the records table (partitioned by dataset or plain), keeping rows, keys and names."""
+    qn = conn.ops.quote_name
+    old = f"{TABLE}_old"
+    with conn.cursor() as cursor:
+        # Run deferred foreign-key checks now; pending trigger events would block the DROP.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        constraints = conn.introspection.get_constraints(cursor, TABLE)
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('f', 'u')",
+            [TABLE],
+        )
+        definitions = dict(cursor.fetchall())
+        cursor.execute(f"SELECT COALESCE(MAX({qn('id')}), 0) FROM {qn(TABLE)}")
+        max_id = cursor.fetchone()[0]
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(old)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(TABLE)} (LIKE {qn(old)} INCLUDING CONSTRAINTS)"
+            + (f" PARTITION BY LIST ({qn('dataset_id')})" if partitioned else "")
+        )
+        if partitioned:
+            cursor.execute(f"SELECT {qn('id')} FROM {qn(DATASET_TABLE)}")
+            for (dataset_id,) in cursor.fetchall():
+                cursor.execute(
+                    f"CREATE TABLE {qn(f'{TABLE}_{int(dataset_id)}')} "
+                    f"PARTITION OF {qn(TABLE)} FOR VALUES IN ({int(dataset_id)})"
+                )
+            cursor.execute(f"CREATE TABLE {qn(f'{TABLE}_default')} PARTITION OF {qn(TABLE)} DEFAULT")
+        cursor.execute(
+            f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(old)} "
+            f"ORDER BY {qn('dataset_id')}, {qn('year')}, {qn('column_id')}"
+        )
+        cursor.execute(f"DROP TABLE {qn(old)}")
+
+        if partitioned:
+            sequence = f"{TABLE}_id_seq"
+            cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(TABLE)}.{qn('id')}")
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('id')} SET DEFAULT nextval('{sequence}')")
+        else:
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('id')} ADD GENERATED BY DEFAULT AS IDENTITY")
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, %s)", [TABLE, max(max_id, 1), max_id > 0])
+
+        for name, info in constraints.items():
+            columns = ", ".join(qn(c) for c in info["columns"])
+            if info["primary_key"]:
+                key = ("id", "dataset_id") if partitioned else ("id",)
+                cursor.execute(
+                    f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} "
+                    f"PRIMARY KEY ({', '.join(qn(c) for c in key)})"
+                )
+            elif name in definitions:
+                cursor.execute(f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definitions[name]}")
+            elif info["index"]:
+                brin = partitioned and not info["unique"] and tuple(info["columns"]) in [(c,) for c in BRIN_COLUMNS]
+                cursor.execute(
+                    f"CREATE {'UNIQUE ' if info['unique'] else ''}INDEX {qn(name)} ON {qn(TABLE)} "
+                    f"USING {'brin' if brin else 'btree'} ({columns})"
+                )
+
+
+def partition(apps, schema_editor):
+    """With DATARECORD_PARTITIONED on PostgreSQL, list-partition the records by dataset."""
+    conn = schema_editor.connection
+    if getattr(settings, "DATARECORD_PARTITIONED", False) and conn.vendor == "postgresql" and not is_partitioned(conn):
+        rebuild_table(conn, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    conn = schema_editor.connection
+    if is_partitioned(conn):
+        rebuild_table(conn, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0009_datarecord_imported_at_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3
+from __future__ import annotations
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metdata", "0010_partition_datarecord"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="datarecord",
+            options={"verbose_name": "Data Record", "verbose_name_plural": "Data Records"},
+        ),
+    ]
@@ -5,60 +5,205 @@ text datasets. Each row in those datasets typically represents an annual or mont
 statistic depending on the dataset category. For this assignment we treat the first
 column as the `year` (integer) and subsequent named columns map to values that may
 be imported using a management command.
+
+Dimension strings are normalised into small lookup tables so they are stored once:
+`Dataset` holds each (parameter, region, source_url) plus its import metadata and
+`Column` holds each column name; `DataRecord` references both by integer key.
 """
 from __future__ import annotations
 
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 
 
+class Dataset(models.Model):
+    """One imported MetOffice dataset, i.e. a (parameter, region) pair.
+
+    Fields:
+        parameter: The meteorological parameter derived from the dataset URL
+                   (e.g., "Tmax", "Tmin", "Rainfall").
+        region: Region code or name derived from dataset URL (e.g., "UK", "England").
+        source_url: The URL the dataset was last imported from.
+        etag / last_modified: HTTP validators from the last successful download, sent
+                              back as If-None-Match / If-Modified-Since on re-import.
+        content_hash: SHA-256 of the last downloaded body, used to skip unchanged files
+                      when the server does not honour conditional requests.
+        row_hashes: Mapping of year (as string) to a digest of that year's parsed cells,
+                    so only the year rows that actually changed are written.
+        checked_at: When the dataset was last checked for changes.
+        imported_at: When data for this dataset last changed in the database.
+        data_version: Counter bumped by every import that changes the dataset; API
+                      ETags are derived from it.
+    """
+
+    id = models.AutoField(primary_key=True)
+    parameter = models.CharField(max_length=64)
+    region = models.CharField(max_length=64)
+    source_url = models.URLField(max_length=500)
+    etag = models.CharField(max_length=256, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    row_hashes = models.JSONField(default=dict, blank=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+    imported_at = models.DateTimeField(null=True, blank=True)
+    data_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Dataset"
+        verbose_name_plural = "Datasets"
+        constraints = [
+            models.UniqueConstraint(fields=["parameter", "region"], name="uniq_dataset_scope")
+        ]
+        ordering = ["parameter", "region"]
+
+    def __str__(self) -> str:  # pragma: no cover - simple representation
+        return f"{self.parameter}:{self.region}"
+
+
+class Column(models.Model):
+    """A source column name (e.g. "jan", "win", "ann"), stored once and referenced by code."""
+
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=64, unique=True)
+
+    class Meta:
+        verbose_name = "Column"
+        verbose_name_plural = "Columns"
+        ordering = ["id"]
+
+    def __str__(self) -> str:  # pragma: no cover - simple representation
+        return self.name
+
+
+class DataRecordQuerySet(models.QuerySet):
+    def with_dimensions(self) -> "DataRecordQuerySet":
+        """Annotate the denormalised `parameter`, `region`, `column_name` and `source_url`.
+
+        API serializers, filters and `?ordering=` use these names, so annotating them
+        keeps the public shape of a record unchanged after normalisation.
+        """
+        return self.annotate(
+            parameter=F("dataset__parameter"),
+            region=F("dataset__region"),
+            column_name=F("column__name"),
+            source_url=F("dataset__source_url"),
+        )
+
+
 class DataRecord(models.Model):
     """A single numeric data point from a MetOffice summary dataset.
 
     Fields:
+        dataset: The (parameter, region) dataset this value belongs to.
         year: Year associated with the observation/summary. Stored as integer for
               efficient filtering & aggregation. If a dataset includes non-numeric
               temporal labels they could be stored alternatively in a text field.
-        parameter: The meteorological parameter derived from the dataset URL
-                   (e.g., "Tmax", "Tmin", "Rainfall").
-        region: Region code or name derived from dataset URL (e.g., "UK", "England").
-        column_name: Name of the column from the source file (e.g., "JAN", "WINTER", "ANN").
+        column: The source column (e.g., "JAN", "WINTER", "ANN").
         value: Floating point value for the metric.
-        source_url: The full URL of the dataset from which this record originated.
         imported_at: Timestamp automatically set when the record was created.
 
     Indexing strategy:
-        - Composite index on (parameter, region, year) improves query performance for filtering.
-        - Separate index on column_name to accelerate column-based filters.
-        - Additional composite index on (parameter, region, column_name) to support summary stats.
+        - The unique (dataset, year, column) index also serves (dataset, year) filters,
+          i.e. the (parameter, region, year) lookups of the original schema.
+        - Composite index on (dataset, column, year) supports per-column series and summary stats.
+        - The `column` foreign key index accelerates column-only filters.
+        - The `imported_at` index backs the admin's import-date filter and sorting.
+        - With `DATARECORD_PARTITIONED` on PostgreSQL the table is list-partitioned by
+          dataset and the `year`/`imported_at` indexes are BRIN (see `metdata.partitions`).
 
     Uniqueness:
-        There can be multiple columns for the same (parameter, region, year). Enforce uniqueness
-        per year/column within parameter & region scope to prevent duplicate imports.
+        There can be multiple columns for the same dataset and year. Enforce uniqueness
+        per year/column within a dataset to prevent duplicate imports.
     """
 
-    year = models.PositiveIntegerField(db_index=True)
-    parameter = models.CharField(max_length=64, db_index=True)
-    region = models.CharField(max_length=64, db_index=True)
-    column_name = models.CharField(max_length=64, db_index=True)
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="records", db_index=False)
+    year = models.PositiveSmallIntegerField(db_index=True)
+    column = models.ForeignKey(Column, on_delete=models.PROTECT, related_name="records")
     value = models.FloatField()
-    source_url = models.TextField()
     imported_at = models.DateTimeField(default=timezone.now, editable=False)
 
+    objects = DataRecordQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Data Record"
         verbose_name_plural = "Data Records"
         indexes = [
-            models.Index(fields=["parameter", "region", "year"], name="idx_param_region_year"),
-            models.Index(fields=["column_name"], name="idx_column"),
-            models.Index(fields=["parameter", "region", "column_name"], name="idx_param_region_col"),
+            models.Index(fields=["dataset", "column", "year"], name="idx_param_region_col"),
+            models.Index(fields=["imported_at"], name="idx_record_imported"),
         ]
         constraints = [
-            models.UniqueConstraint(
-                fields=["parameter", "region", "year", "column_name"], name="uniq_record_scope"
-            )
+            models.UniqueConstraint(fields=["dataset", "year", "column"], name="uniq_record_scope")
+        ]
+        # No default ordering: it would join Dataset and Column into every internal
+        # query. The API querysets order explicitly.
+
+    def __str__(self) -> str:  # pragma: no cover - simple representation
+        return f"{self.dataset}:{self.year}:{self.column}={self.value}"
+
+
+class DataSeries(models.Model):
+    """One column of one dataset as a packed array of yearly values.
+
+    `DataRecord` stores a row per (year, column) cell. Chart and statistics reads
+    want a whole column at once, so each (dataset, column) is also kept here as a
+    single row: `values` holds little-endian float64s where index `i` is the value
+    for `start_year + i` and NaN marks a year with no value.
+
+    Rows are rebuilt from `DataRecord` by the importer whenever a dataset changes
+    (see `metdata.series.rebuild_series`), so `DataRecord` stays the source of truth.
+    """
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="series", db_index=False)
+    column = models.ForeignKey(Column, on_delete=models.PROTECT, related_name="series")
+    start_year = models.PositiveIntegerField()
+    values = models.BinaryField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Data Series"
+        verbose_name_plural = "Data Series"
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "column"], name="uniq_series_scope")
+        ]
+        ordering = ["dataset", "column"]
+
+    def __str__(self) -> str:  # pragma: no cover - simple representation
+        return f"{self.dataset}:{self.column} from {self.start_year}"
+
+
+class DataRollup(models.Model):
+    """Precomputed statistics for one column of one dataset.
+
+    Each (dataset, column) has one whole-column row (`decade` is NULL) plus one row per
+    decade (`decade` holds the first year, e.g. 1990), so `/api/stats/` combines a
+    handful of rows instead of reading values. Sums and sums of squares make averages and
+    standard deviations combinable across columns and decades.
+
+    Rows are rebuilt from the freshly packed `DataSeries` whenever the importer changes a
+    dataset (see `metdata.rollups.rebuild_rollups`).
+    """
+
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name="rollups", db_index=False)
+    column = models.ForeignKey(Column, on_delete=models.PROTECT, related_name="rollups")
+    decade = models.PositiveSmallIntegerField(null=True, blank=True)
+    count = models.PositiveIntegerField()
+    total = models.FloatField()
+    sum_squares = models.FloatField()
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    first_year = models.PositiveSmallIntegerField()
+    last_year = models.PositiveSmallIntegerField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Data Rollup"
+        verbose_name_plural = "Data Rollups"
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "column", "decade"], name="uniq_rollup_scope")
         ]
-        ordering = ["parameter", "region", "year", "column_name"]
+        ordering = ["dataset", "column", "decade"]
 
     def __str__(self) -> str:  # pragma: no cover - simple representation
-        return f"{self.parameter}:{self.region}:{self.year}:{self.column_name}={self.value}"
\ No newline at end of file
+        scope = f"{self.decade}s" if self.decade is not None else "all years"
+        return f"{self.dataset}:{self.column} ({scope})"
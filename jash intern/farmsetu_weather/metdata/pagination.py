@@ -0,0 +1,168 @@
+"""Pagination for the record list endpoints.
+
+`RecordPagination` behaves like `PageNumberPagination` (`?page=N`) unless the request
+carries `?cursor=`, in which case it switches to keyset pagination: records come in
+the order of the unique (dataset, year, column) index and each page continues after
+the last key of the previous one. Every page is then an index range scan of fixed
+size, however deep, and no `COUNT(*)` runs unless `?count=true` is passed.
+
+Start with `?cursor=start` and follow `next` until it is null. `page_size` (up to
+`max_page_size`) is honoured in both modes; `?ordering=` is ignored in cursor mode,
+since the order is what makes the cursor cheap.
+
+`apaginate_queryset` is the async equivalent for `metdata.async_views`. It issues the
+page query and the `COUNT(*)` together instead of one after the other.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.paginator import InvalidPage, Page
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import DataRecord
+
+# Index order of `uniq_record_scope`; rows fetched as tuples must end with these fields.
+KEYSET_FIELDS = ("dataset_id", "year", "column_id")
+START_CURSOR = "start"
+
+Key = Tuple[int, int, int]
+
+
+def encode_cursor(key: Key) -> str:
+    return base64.urlsafe_b64encode(":".join(map(str, key)).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(token: str) -> Optional[Key]:
+    """Return the key encoded in `token`, None for the start cursor; raise NotFound if invalid."""
+    if token == START_CURSOR:
+        return None
+    try:
+        parts = base64.urlsafe_b64decode(token.encode("ascii")).decode("ascii").split(":")
+        dataset_id, year, column_id = (int(part) for part in parts)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound("Invalid cursor.")
+    return dataset_id, year, column_id
+
+
+def _row_key(row: Any) -> Key:
+    if isinstance(row, tuple):
+        return row[-len(KEYSET_FIELDS):]
+    return tuple(getattr(row, field) for field in KEYSET_FIELDS)
+
+
+class RecordPagination(PageNumberPagination):
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None) -> Optional[List[Any]]:  # type: ignore[override]
+        self.keyset = bool(request.query_params.get(self.cursor_query_param))
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.count: Optional[int] = None
+        if self._wants_count(request):
+            self.count = queryset.order_by().count()
+        page_size = self.get_page_size(request)
+        rows = list(self._keyset_page(queryset, request, page_size))
+        return self._keyset_rows(rows, page_size)
+
+    async def apaginate_queryset(self, queryset, request) -> Optional[List[Any]]:
+        """Async `paginate_queryset`; the page and its count are queried concurrently."""
+        self.keyset = bool(request.query_params.get(self.cursor_query_param))
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        if self.keyset:
+            page = self._keyset_page(queryset, request, page_size)
+            count = queryset.order_by().acount() if self._wants_count(request) else _none()
+            self.count, rows = await asyncio.gather(count, _alist(page))
+            return self._keyset_rows(rows, page_size)
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        number = request.query_params.get(self.page_query_param) or 1
+        if number in self.last_page_strings:
+            # The last page's offset depends on the count.
+            paginator.count = await queryset.acount()
+            number = paginator.num_pages
+            rows = await _alist(_page_slice(queryset, number, page_size))
+        else:
+            # Fetch the page the number asks for alongside the count; validate it after.
+            paginator.count, rows = await asyncio.gather(
+                queryset.acount(), _alist(_page_slice(queryset, number, page_size))
+            )
+        try:
+            number = paginator.validate_number(number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=number, message=str(exc)))
+        self.page = Page(rows, number, paginator)
+        return rows
+
+    def _wants_count(self, request) -> bool:
+        return request.query_params.get(self.count_query_param, "").lower() in {"1", "true", "yes"}
+
+    def _keyset_page(self, queryset, request, page_size: int):
+        """One row more than a page after the request's cursor, in key order."""
+        after = decode_cursor(request.query_params[self.cursor_query_param])
+        if after is not None:
+            qn = connection.ops.quote_name
+            table = qn(DataRecord._meta.db_table)
+            columns = ", ".join(f"{table}.{qn(field)}" for field in KEYSET_FIELDS)
+            # A row-value comparison lets the planner seek straight into the unique index.
+            queryset = queryset.filter(
+                RawSQL(f"({columns}) > (%s, %s, %s)", after, output_field=BooleanField())
+            )
+        return queryset.order_by(*KEYSET_FIELDS)[: page_size + 1]
+
+    def _keyset_rows(self, rows: List[Any], page_size: int) -> List[Any]:
+        self.next_key: Optional[Key] = _row_key(rows[page_size - 1]) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self) -> Optional[str]:  # type: ignore[override]
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_key is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_key))
+
+    def get_paginated_response(self, data: Sequence[Any]) -> Response:  # type: ignore[override]
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        payload: "OrderedDict[str, Any]" = OrderedDict()
+        if self.count is not None:
+            payload["count"] = self.count
+        payload["next"] = self.get_next_link()
+        payload["results"] = data
+        return Response(payload)
+
+
+def _page_slice(queryset, number, page_size: int):
+    try:
+        bottom = max(int(number) - 1, 0) * page_size
+    except (TypeError, ValueError):
+        bottom = 0  # validate_number rejects it once the count is known
+    return queryset[bottom:bottom + page_size]
+
+
+async def _alist(queryset) -> List[Any]:
+    return [row async for row in queryset]
+
+
+async def _none() -> None:
+    return None
@@ -0,0 +1,200 @@
+"""Optional PostgreSQL list partitioning of `metdata_datarecord` by dataset.
+
+Every read and write in this app is scoped to one (parameter, region) dataset, so in
+partitioned mode each `Dataset` gets its own partition `metdata_datarecord_<id>` and
+filters on a dataset touch only that partition's indexes. A `metdata_datarecord_default`
+partition catches rows of datasets created outside the importer (e.g. in the admin);
+`create_partition` moves them out when the dataset is next imported.
+
+Per-partition indexes stay small, and two single-column B-trees become BRIN: `year`
+and `imported_at` follow the order rows are written in (a dataset at a time, in year
+order), so a BRIN index of a few pages replaces a B-tree entry per row. The unique
+`(dataset, year, column)` constraint already includes the partition key, and the
+primary key becomes `(id, dataset_id)` because PostgreSQL requires that too.
+
+`swap_partition` reloads a whole dataset without per-row conflict checks: rows are
+copied into a new, unattached table, which then replaces the dataset's partition in one
+transaction. Readers keep the old rows until it commits.
+
+`partition_records` / `unpartition_records` convert the table in place (used by the
+`partition_records` command; migration 0010 runs a frozen copy when
+`DATARECORD_PARTITIONED` is set). Both keep constraint and index names, so later Django
+migrations still apply.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Tuple
+
+from django.db import connection, transaction
+
+from .loaders import INSERT_COLUMNS, RecordRow, copy_rows
+from .models import DataRecord, Dataset
+
+TABLE = DataRecord._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+# Single-column indexes built as BRIN in partitioned mode.
+BRIN_COLUMNS = ("year", "imported_at")
+
+
+def partition_name(dataset_id: int) -> str:
+    return f"{TABLE}_{int(dataset_id)}"
+
+
+def is_partitioned(conn=connection) -> bool:
+    """Whether `metdata_datarecord` is a partitioned table on this database."""
+    if conn.vendor != "postgresql":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [TABLE])
+        return cursor.fetchone()[0]
+
+
+def partition_records(conn=connection) -> None:
+    """Convert `metdata_datarecord` into a table list-partitioned by dataset, keeping its rows."""
+    _rebuild_table(conn, partitioned=True)
+
+
+def unpartition_records(conn=connection) -> None:
+    """Convert a partitioned `metdata_datarecord` back into a plain table, keeping its rows."""
+    _rebuild_table(conn, partitioned=False)
+
+
+def create_partition(dataset_id: int) -> None:
+    """Give a dataset its own partition if it has none, moving in its rows from the default partition."""
+    qn = connection.ops.quote_name
+    name = partition_name(dataset_id)
+    columns = ", ".join(qn(c) for c in ("id", *INSERT_COLUMNS))
+    with transaction.atomic(), connection.cursor() as cursor:
+        if _exists(cursor, name):
+            return
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} WHERE {qn('dataset_id')} = %s RETURNING {columns}) "
+            f"INSERT INTO {qn(name)} ({columns}) SELECT {columns} FROM moved",
+            [dataset_id],
+        )
+        _attach(cursor, name, dataset_id)
+
+
+def swap_partition(dataset_id: int, rows: Iterable[RecordRow]) -> Tuple[int, int]:
+    """Replace every record of a dataset with `rows` by swapping in a freshly loaded partition.
+
+    Rows are copied into a new table with the partition's indexes, so the lock on
+    `metdata_datarecord` is only held for the detach, drop and attach at the end.
+    Returns (rows written, rows replaced).
+    """
+    qn = connection.ops.quote_name
+    name = partition_name(dataset_id)
+    staging = f"{name}_new"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {qn(staging)} "
+            f"(LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES)"
+        )
+        written = copy_rows(cursor, staging, rows)
+        cursor.execute(f"ANALYZE {qn(staging)}")
+        if _exists(cursor, name):
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f"SELECT COUNT(*) FROM {qn(name)}")
+            replaced = cursor.fetchone()[0]
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}")
+            cursor.execute(f"DROP TABLE {qn(name)}")
+        else:
+            cursor.execute(f"DELETE FROM {qn(DEFAULT_PARTITION)} WHERE {qn('dataset_id')} = %s", [dataset_id])
+            replaced = cursor.rowcount
+        cursor.execute(f"ALTER TABLE {qn(staging)} RENAME TO {qn(name)}")
+        # LIKE named the indexes after the staging table; give them the partition's names.
+        cursor.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", [name])
+        for (index,) in cursor.fetchall():
+            if index.startswith(staging):
+                cursor.execute(f"ALTER INDEX {qn(index)} RENAME TO {qn(name + index[len(staging):])}")
+        _attach(cursor, name, dataset_id)
+    return written, replaced
+
+
+def _exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def _attach(cursor, name: str, dataset_id: int) -> None:
+    qn = connection.ops.quote_name
+    # The CHECK constraint proves the partition bound, so ATTACH skips its validation scan.
+    cursor.execute(
+        f"ALTER TABLE {qn(name)} ADD CONSTRAINT {qn(f'{name}_bound')} "
+        f"CHECK ({qn('dataset_id')} = {int(dataset_id)})"
+    )
+    cursor.execute(f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES IN ({int(dataset_id)})")
+
+
+def _rebuild_table(conn, partitioned: bool) -> None:
+    """Recreate `metdata_datarecord` (partitioned or plain), copy its rows and restore its keys.
+
+    The new table copies NOT NULL and CHECK constraints with LIKE. Foreign keys and
+    unique constraints are re-added from their `pg_get_constraintdef` definitions, so
+    their deferrability and actions are kept. The primary key and indexes are
+    recreated under their existing names, with BRIN for `BRIN_COLUMNS` when partitioned.
+    """
+    qn = conn.ops.quote_name
+    old = f"{TABLE}_old"
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        # Run deferred foreign-key checks now; pending trigger events would block the DROP.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        constraints = conn.introspection.get_constraints(cursor, TABLE)
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('f', 'u')",
+            [TABLE],
+        )
+        definitions = dict(cursor.fetchall())
+        cursor.execute(f"SELECT COALESCE(MAX({qn('id')}), 0) FROM {qn(TABLE)}")
+        max_id = cursor.fetchone()[0]
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(old)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(TABLE)} (LIKE {qn(old)} INCLUDING CONSTRAINTS)"
+            + (f" PARTITION BY LIST ({qn('dataset_id')})" if partitioned else "")
+        )
+        if partitioned:
+            cursor.execute(f"SELECT {qn('id')} FROM {qn(Dataset._meta.db_table)}")
+            for (dataset_id,) in cursor.fetchall():
+                cursor.execute(
+                    f"CREATE TABLE {qn(partition_name(dataset_id))} "
+                    f"PARTITION OF {qn(TABLE)} FOR VALUES IN ({int(dataset_id)})"
+                )
+            cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT")
+        # In index order, so the new BRIN ranges are tight.
+        cursor.execute(
+            f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(old)} "
+            f"ORDER BY {qn('dataset_id')}, {qn('year')}, {qn('column_id')}"
+        )
+        # Also drops the id sequence, which belongs to the old table.
+        cursor.execute(f"DROP TABLE {qn(old)}")
+
+        if partitioned:
+            # Identity columns need PostgreSQL 17 on partitioned tables; an owned sequence works everywhere.
+            sequence = f"{TABLE}_id_seq"
+            cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(TABLE)}.{qn('id')}")
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('id')} SET DEFAULT nextval('{sequence}')")
+        else:
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('id')} ADD GENERATED BY DEFAULT AS IDENTITY")
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, %s)", [TABLE, max(max_id, 1), max_id > 0])
+
+        for name, info in constraints.items():
+            columns = ", ".join(qn(c) for c in info["columns"])
+            if info["primary_key"]:
+                # PostgreSQL requires the partition key in every unique key.
+                key = ("id", "dataset_id") if partitioned else ("id",)
+                cursor.execute(
+                    f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} "
+                    f"PRIMARY KEY ({', '.join(qn(c) for c in key)})"
+                )
+            elif name in definitions:
+                cursor.execute(f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definitions[name]}")
+            elif info["index"]:
+                brin = partitioned and not info["unique"] and tuple(info["columns"]) in [(c,) for c in BRIN_COLUMNS]
+                cursor.execute(
+                    f"CREATE {'UNIQUE ' if info['unique'] else ''}INDEX {qn(name)} ON {qn(TABLE)} "
+                    f"USING {'brin' if brin else 'btree'} ({columns})"
+                )
+            # CHECK constraints were copied by LIKE.
@@ -0,0 +1,50 @@
+"""Custom DRF renderers for the metdata API."""
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PackedSeriesRenderer(BaseRenderer):
+    """Render a `/api/series/` payload as packed little-endian binary (`?format=f32`).
+
+    Layout (all integers uint32, everything little-endian, every block 4-byte aligned):
+
+        b"MDS1", series count
+        per series:
+            label length, UTF-8 label "parameter/region/column", zero padding to 4 bytes
+            point count n, n int32 years, n float32 values
+
+    float32 keeps about 7 significant digits, ample for the one-decimal source data.
+    Error responses are rendered by `JSONRenderer` and sent as `application/json`.
+    """
+
+    media_type = "application/octet-stream"
+    format = "f32"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        response = (renderer_context or {}).get("response")
+        if not isinstance(data, dict) or "series" not in data or (response and response.status_code >= 400):
+            # Errors (e.g. 400 details) have no binary form; send them as JSON, labelled as such.
+            if response is not None:
+                response["Content-Type"] = JSONRenderer.media_type
+            return JSONRenderer().render(data, JSONRenderer.media_type, renderer_context)
+        parts = [b"MDS1", struct.pack("<I", len(data["series"]))]
+        for series in data["series"]:
+            label = "/".join((series["parameter"], series["region"], series["column"])).encode("utf-8")
+            years = array("i", series["years"])
+            values = array("f", series["values"])
+            if sys.byteorder != "little":
+                years.byteswap()
+                values.byteswap()
+            parts.append(struct.pack("<I", len(label)))
+            parts.append(label + b"\0" * (-len(label) % 4))
+            parts.append(struct.pack("<I", len(years)))
+            parts.append(years.tobytes())
+            parts.append(values.tobytes())
+        return b"".join(parts)
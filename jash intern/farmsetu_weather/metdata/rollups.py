@@ -0,0 +1,165 @@
+"""Precomputed column statistics kept alongside `DataSeries`.
+
+A `DataRollup` row holds count, sum, sum of squares, min, max and first/last year for
+one dataset column, either over all years (`decade` is NULL) or over one decade.
+Because sums combine by addition, statistics for a whole dataset, a single column or
+a decade are a merge of a few rows rather than a scan of `DataRecord`.
+
+Helpers:
+- `Summary` accumulates and merges statistics and renders them for the API
+- `summarise_points` / `summarise_series` build summaries from (year, value) points
+- `rebuild_rollups` regenerates the rollup rows of a dataset from its packed series
+"""
+from __future__ import annotations
+
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+from .models import DataRollup
+from .series import series_points
+
+
+@dataclass
+class Summary:
+    """Combinable statistics over a set of (year, value) points."""
+
+    count: int = 0
+    total: float = 0.0
+    sum_squares: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    first_year: Optional[int] = None
+    last_year: Optional[int] = None
+
+    @classmethod
+    def from_rollup(cls, rollup: DataRollup) -> "Summary":
+        return cls(
+            count=rollup.count,
+            total=rollup.total,
+            sum_squares=rollup.sum_squares,
+            minimum=rollup.minimum,
+            maximum=rollup.maximum,
+            first_year=rollup.first_year,
+            last_year=rollup.last_year,
+        )
+
+    def merge(self, other: "Summary") -> "Summary":
+        """Fold `other` into this summary and return it."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.minimum, self.maximum = other.minimum, other.maximum
+            self.first_year, self.last_year = other.first_year, other.last_year
+        else:
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+            self.first_year = min(self.first_year, other.first_year)
+            self.last_year = max(self.last_year, other.last_year)
+        self.count += other.count
+        self.total += other.total
+        self.sum_squares += other.sum_squares
+        return self
+
+    @property
+    def avg(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self) -> Optional[float]:
+        """Population standard deviation."""
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return math.sqrt(max(self.sum_squares / self.count - mean * mean, 0.0))
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "avg": self.avg,
+            "min": self.minimum,
+            "max": self.maximum,
+            "count": self.count,
+            "stddev": self.stddev,
+            "first_year": self.first_year,
+            "last_year": self.last_year,
+        }
+
+
+def summarise_points(points: Iterable[Tuple[int, float]]) -> Summary:
+    """Summarise (year, value) points given in ascending year order."""
+    years: List[int] = []
+    values: List[float] = []
+    for year, value in points:
+        years.append(year)
+        values.append(value)
+    if not values:
+        return Summary()
+    return Summary(
+        count=len(values),
+        total=math.fsum(values),
+        sum_squares=math.fsum(v * v for v in values),
+        minimum=min(values),
+        maximum=max(values),
+        first_year=years[0],
+        last_year=years[-1],
+    )
+
+
+def decade_of(year: int) -> int:
+    return year - year % 10
+
+
+def summarise_series(start_year: int, values: array) -> Tuple[Summary, Dict[int, Summary]]:
+    """Return the whole-column summary and the per-decade summaries of one series."""
+    by_decade: Dict[int, List[Tuple[int, float]]] = {}
+    for offset, value in enumerate(values):
+        if not math.isnan(value):
+            year = start_year + offset
+            by_decade.setdefault(decade_of(year), []).append((year, value))
+    decades = {decade: summarise_points(points) for decade, points in by_decade.items()}
+    whole = summarise_points(point for points in by_decade.values() for point in points)
+    return whole, decades
+
+
+def summarise_blob(start_year: int, blob: bytes, first: int, last: int) -> Summary:
+    """Summarise the points of a stored series that fall within [first, last]."""
+    return summarise_points(
+        (year, value) for year, value in series_points(start_year, blob) if first <= year <= last
+    )
+
+
+def rebuild_rollups(dataset_id: int, series: Dict[int, Tuple[int, array]]) -> int:
+    """Replace the `DataRollup` rows of one dataset from its {column_id: (start, values)} series.
+
+    `series` is what `rebuild_series` returns for the dataset, so no values are re-read.
+    Returns the number of rows written. Call inside the transaction that changed the records.
+    """
+    now = timezone.now()
+    rows: List[DataRollup] = []
+    for column_id, (start, values) in series.items():
+        whole, decades = summarise_series(start, values)
+        for decade, summary in [(None, whole), *sorted(decades.items())]:
+            if summary.count:
+                rows.append(
+                    DataRollup(
+                        dataset_id=dataset_id,
+                        column_id=column_id,
+                        decade=decade,
+                        count=summary.count,
+                        total=summary.total,
+                        sum_squares=summary.sum_squares,
+                        minimum=summary.minimum,
+                        maximum=summary.maximum,
+                        first_year=summary.first_year,
+                        last_year=summary.last_year,
+                        updated_at=now,
+                    )
+                )
+    # Delete-and-insert: the whole-column rows have a NULL decade, which unique
+    # constraints (and so ON CONFLICT) treat as distinct.
+    DataRollup.objects.filter(dataset_id=dataset_id).delete()
+    DataRollup.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
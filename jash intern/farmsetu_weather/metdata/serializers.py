@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import functools
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
 from rest_framework import serializers
 from .models import DataRecord
 
 
 class DataRecordSerializer(serializers.ModelSerializer):
+    # Dimension names live on Dataset/Column; querysets provide them through
+    # `DataRecord.objects.with_dimensions()`.
+    parameter = serializers.CharField(read_only=True)
+    region = serializers.CharField(read_only=True)
+    column_name = serializers.CharField(read_only=True)
+    source_url = serializers.CharField(read_only=True)
+
     class Meta:
         model = DataRecord
         fields = [
@@ -18,3 +28,27 @@ class DataRecordSerializer(serializers.ModelSerializer):
             "imported_at",
         ]
         read_only_fields = ["id", "imported_at"]
+
+
+def record_rows_to_dicts(rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Fast equivalent of `DataRecordSerializer(queryset, many=True).data`.
+
+    `rows` are tuples from `queryset.values_list(*DataRecordSerializer.Meta.fields)`.
+    Each value goes through the serializer field's own `to_representation`, so the
+    rendered JSON is byte-identical, but no model instances are built and the field
+    lookup and validation machinery is skipped. Datetimes are memoised since a whole
+    import shares one `imported_at`.
+    """
+    fields = DataRecordSerializer().fields
+    names = list(DataRecordSerializer.Meta.fields)
+    converters: List[Callable[[Any], Any]] = []
+    for name in names:
+        convert = fields[name].to_representation
+        if isinstance(fields[name], serializers.DateTimeField):
+            convert = functools.lru_cache(maxsize=64)(convert)
+        converters.append(convert)
+    pairs = list(zip(names, converters))
+    return [
+        {name: None if value is None else convert(value) for (name, convert), value in zip(pairs, row)}
+        for row in rows
+    ]
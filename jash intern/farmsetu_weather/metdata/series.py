@@ -0,0 +1,134 @@
+"""Packed per-column series kept alongside `DataRecord`.
+
+A `DataSeries` row holds a whole column of one dataset (e.g. Tmax/UK/ann) as a
+little-endian float64 array indexed by `year - start_year`, with NaN for years
+without a value. Reading a chart line or computing statistics then touches one
+small row per column instead of one row per cell.
+
+Helpers:
+- `pack_values` / `unpack_values` convert between `array('d')` and the stored bytes
+- `series_points` yields the (year, value) pairs of a stored series
+- `downsample_lttb` thins a long series for charting while keeping its shape
+- `rebuild_series` regenerates every series of a dataset from `DataRecord`
+- `write_series` stores already-built series for a dataset
+"""
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.utils import timezone
+
+from .models import DataRecord, DataSeries
+
+SERIES_TYPECODE = "d"
+
+
+def pack_values(values: array) -> bytes:
+    """Serialise an `array('d')` as little-endian bytes."""
+    if sys.byteorder != "little":
+        values = array(SERIES_TYPECODE, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_values(blob: bytes) -> array:
+    """Inverse of `pack_values`."""
+    values = array(SERIES_TYPECODE)
+    values.frombytes(bytes(blob))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def series_points(start_year: int, blob: bytes) -> Iterator[Tuple[int, float]]:
+    """Yield (year, value) for every non-missing entry of a packed series."""
+    for offset, value in enumerate(unpack_values(blob)):
+        if not math.isnan(value):
+            yield start_year + offset, value
+
+
+def downsample_lttb(years: List[int], values: List[float], max_points: int) -> Tuple[List[int], List[float]]:
+    """Reduce a series to `max_points` points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; from each bucket in between the point forming
+    the largest triangle with the previously kept point and the next bucket's average
+    is kept, so peaks and troughs survive. Returned points are original (year, value) pairs.
+    """
+    n = len(values)
+    if max_points < 3 or n <= max_points:
+        return years, values
+    every = (n - 2) / (max_points - 2)
+    kept = [0]
+    a = 0
+    for i in range(max_points - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = max(min(int((i + 2) * every) + 1, n), avg_start + 1)
+        avg_x = math.fsum(years[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = math.fsum(values[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs(
+                (years[a] - avg_x) * (values[j] - values[a]) - (years[a] - years[j]) * (avg_y - values[a])
+            )
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return [years[k] for k in kept], [values[k] for k in kept]
+
+
+def build_series(cells: Iterable[Tuple[int, int, float]]) -> Dict[int, Tuple[int, array]]:
+    """Group (column_id, year, value) cells into {column_id: (start_year, values)}."""
+    by_column: Dict[int, Dict[int, float]] = {}
+    for column_id, year, value in cells:
+        by_column.setdefault(column_id, {})[year] = value
+    series: Dict[int, Tuple[int, array]] = {}
+    for column_id, points in by_column.items():
+        start, end = min(points), max(points)
+        values = array(SERIES_TYPECODE, [math.nan]) * (end - start + 1)
+        for year, value in points.items():
+            values[year - start] = value
+        series[column_id] = (start, values)
+    return series
+
+
+def rebuild_series(dataset_id: int) -> Dict[int, Tuple[int, array]]:
+    """Regenerate the `DataSeries` rows of one dataset from its `DataRecord` rows.
+
+    Returns the series written as {column_id: (start_year, values)}. Columns that no
+    longer have any records are removed. Call inside the transaction that changed
+    the records.
+    """
+    cells = DataRecord.objects.filter(dataset_id=dataset_id).order_by().values_list(
+        "column_id", "year", "value"
+    )
+    series = build_series(cells.iterator())
+    write_series(dataset_id, series)
+    return series
+
+
+def write_series(dataset_id: int, series: Dict[int, Tuple[int, array]]) -> None:
+    """Replace the `DataSeries` rows of one dataset with {column_id: (start_year, values)}."""
+    now = timezone.now()
+    rows: List[DataSeries] = [
+        DataSeries(
+            dataset_id=dataset_id,
+            column_id=column_id,
+            start_year=start,
+            values=pack_values(values),
+            updated_at=now,
+        )
+        for column_id, (start, values) in series.items()
+    ]
+    scope = DataSeries.objects.filter(dataset_id=dataset_id)
+    scope.exclude(column_id__in=[row.column_id for row in rows]).delete()
+    DataSeries.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["dataset", "column"],
+        update_fields=["start_year", "values", "updated_at"],
+    )
@@ -0,0 +1,297 @@
+"""Dataset snapshots: a compact binary copy of every dataset, read through `mmap`.
+
+A snapshot holds everything needed to serve reads and to restore the database:
+
+    b"MDSS", uint32 format version (2), uint32 metadata length
+    UTF-8 JSON metadata, zero padding to 8 bytes
+    values: per series, float64 values indexed by year - start_year (NaN = no record)
+    stamps: per series, uint32 indexes into the metadata's `timestamps` (0xFFFFFFFF = none)
+
+All numbers are little-endian. The metadata holds the dimension dictionaries: the
+`columns` names, the distinct record `timestamps`, and each dataset's `Dataset`
+fields. Each dataset's series are listed as
+[column index, start_year, length, values offset, stamps offset], in column id order,
+with offsets relative to the start of the values section.
+
+`dump_snapshot` writes one and `load_snapshot` restores the database from one.
+
+When `DATASET_STORE_PATH` is set, the series, stats, analytics, batch and catalogue
+endpoints read from the snapshot at that path instead of the database. It is mapped
+read-only, so all worker processes on a host share one copy through the page cache.
+`import_metoffice` rewrites it (atomically, via `os.replace`) after it commits
+changes. `get_store` notices the new file by its inode and mtime and maps it before
+the next request. Responses cached under the old data are only invalidated once the
+new snapshot is in place. Edits made outside the importer (e.g. in the admin) are
+not picked up until the next import.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Column, DataRecord, Dataset
+from .rollups import Summary, summarise_series
+from .series import SERIES_TYPECODE, pack_values, unpack_values
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"MDSS"
+SNAPSHOT_VERSION = 2
+_HEADER = struct.Struct("<4sII")
+_NO_STAMP = 0xFFFFFFFF
+# Dataset fields copied into the snapshot metadata; datetimes are stored as ISO 8601.
+DATASET_FIELDS = (
+    "parameter",
+    "region",
+    "source_url",
+    "etag",
+    "last_modified",
+    "content_hash",
+    "row_hashes",
+    "checked_at",
+    "imported_at",
+    "data_version",
+)
+_DATETIME_FIELDS = ("checked_at", "imported_at")
+
+# (column name, start_year, packed float64 values)
+SeriesRow = Tuple[str, int, memoryview]
+# (column name, decade or None for the whole column, summary)
+RollupRow = Tuple[str, Optional[int], Summary]
+
+
+def _pack_stamps(stamps: array) -> bytes:
+    if sys.byteorder != "little":
+        stamps = array("I", stamps)
+        stamps.byteswap()
+    return stamps.tobytes()
+
+
+def _unpack_stamps(blob: memoryview) -> array:
+    stamps = array("I")
+    stamps.frombytes(bytes(blob))
+    if sys.byteorder != "little":
+        stamps.byteswap()
+    return stamps
+
+
+def write_snapshot(path: str) -> int:
+    """Write every dataset to a snapshot at `path`, replacing it atomically; return the series count."""
+    with transaction.atomic():
+        column_names = dict(Column.objects.order_by("pk").values_list("pk", "name"))
+        datasets = {row.pop("pk"): row for row in Dataset.objects.order_by("pk").values("pk", *DATASET_FIELDS)}
+        cells = DataRecord.objects.order_by("dataset_id", "column_id", "year").values_list(
+            "dataset_id", "column_id", "year", "value", "imported_at"
+        )
+        grouped: Dict[Tuple[int, int], List[Tuple[int, float, Optional[datetime]]]] = {}
+        for dataset_id, column_id, year, value, imported_at in cells.iterator(chunk_size=5000):
+            grouped.setdefault((dataset_id, column_id), []).append((year, value, imported_at))
+
+    column_index = {pk: index for index, pk in enumerate(column_names)}
+    timestamps: Dict[Optional[datetime], int] = {}
+    value_blobs: List[bytes] = []
+    stamp_blobs: List[bytes] = []
+    entries: Dict[int, List[List[int]]] = {}
+    values_size = 0
+    stamps_size = 0
+    for (dataset_id, column_id), points in grouped.items():
+        start, length = points[0][0], points[-1][0] - points[0][0] + 1
+        values = array(SERIES_TYPECODE, [math.nan]) * length
+        stamps = array("I", [_NO_STAMP]) * length
+        for year, value, imported_at in points:
+            values[year - start] = value
+            if imported_at is not None:
+                stamps[year - start] = timestamps.setdefault(imported_at, len(timestamps))
+        value_blobs.append(pack_values(values))
+        stamp_blobs.append(_pack_stamps(stamps))
+        entries.setdefault(dataset_id, []).append([column_index[column_id], start, length, values_size, stamps_size])
+        values_size += len(value_blobs[-1])
+        stamps_size += len(stamp_blobs[-1])
+    for entry in entries.values():
+        for series in entry:
+            series[4] += values_size
+
+    metadata = json.dumps(
+        {
+            "created_at": timezone.now().isoformat(),
+            "columns": list(column_names.values()),
+            "timestamps": [stamp.isoformat() for stamp in timestamps],
+            "datasets": [
+                {
+                    **{
+                        name: value.isoformat() if name in _DATETIME_FIELDS and value else value
+                        for name, value in fields.items()
+                    },
+                    "series": entries[pk],
+                }
+                for pk, fields in datasets.items()
+                if pk in entries
+            ],
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    padding = b"\0" * (-(_HEADER.size + len(metadata)) % 8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as fh:
+        fh.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(metadata)))
+        fh.write(metadata + padding)
+        for blob in value_blobs:
+            fh.write(blob)
+        for blob in stamp_blobs:
+            fh.write(blob)
+    # Readers keep mapping the old inode until they notice the new file.
+    os.replace(temp, path)
+    return len(value_blobs)
+
+
+@dataclass
+class StoredDataset:
+    parameter: str
+    region: str
+    data_version: int
+    imported_at: Optional[str]
+    series: List[SeriesRow]
+    fields: Dict[str, Any] = field(default_factory=dict, repr=False)
+    stamps: List[memoryview] = field(default_factory=list, repr=False)
+    _rollups: Optional[List[RollupRow]] = field(default=None, repr=False)
+
+    def rollups(self) -> List[RollupRow]:
+        """Whole-column and per-decade summaries, as `rebuild_rollups` stores them."""
+        if self._rollups is None:
+            rows: List[RollupRow] = []
+            for column, start, blob in self.series:
+                whole, decades = summarise_series(start, unpack_values(blob))
+                rows.append((column, None, whole))
+                rows.extend((column, decade, decades[decade]) for decade in sorted(decades))
+            self._rollups = rows
+        return self._rollups
+
+    def model_fields(self) -> Dict[str, Any]:
+        """The stored `Dataset` field values, with datetimes parsed."""
+        return {
+            name: parse_datetime(value) if name in _DATETIME_FIELDS and value else value
+            for name, value in self.fields.items()
+        }
+
+
+class DatasetStore:
+    """One mapped snapshot file; look datasets up by (parameter, region)."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as fh:
+            stat = os.fstat(fh.fileno())
+            self.key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{path} is not a dataset snapshot.")
+        magic, version, length = _HEADER.unpack_from(self._map)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} dataset snapshot.")
+        metadata = json.loads(self._map[_HEADER.size:_HEADER.size + length])
+        data = memoryview(self._map)[_HEADER.size + length + (-(_HEADER.size + length) % 8):]
+        self.created_at: str = metadata["created_at"]
+        self.columns: List[str] = metadata["columns"]
+        self.timestamps: List[str] = metadata["timestamps"]
+        self.datasets: Dict[Tuple[str, str], StoredDataset] = {}
+        for entry in metadata["datasets"]:
+            series: List[SeriesRow] = []
+            stamps: List[memoryview] = []
+            for column, start, count, values_at, stamps_at in entry.pop("series"):
+                series.append((self.columns[column], start, data[values_at:values_at + count * 8]))
+                stamps.append(data[stamps_at:stamps_at + count * 4])
+            self.datasets[(entry["parameter"], entry["region"])] = StoredDataset(
+                entry["parameter"], entry["region"], entry["data_version"], entry["imported_at"], series, entry, stamps
+            )
+
+    def records(self, dataset: StoredDataset) -> Iterator[Tuple[str, int, float, Optional[datetime]]]:
+        """Yield (column name, year, value, imported_at) for every record of `dataset`."""
+        parsed: Dict[int, Optional[datetime]] = {_NO_STAMP: None}
+        for (column, start, blob), stamp_blob in zip(dataset.series, dataset.stamps):
+            stamps = _unpack_stamps(stamp_blob)
+            for offset, value in enumerate(unpack_values(blob)):
+                if math.isnan(value):
+                    continue
+                index = stamps[offset]
+                if index not in parsed:
+                    parsed[index] = parse_datetime(self.timestamps[index])
+                yield column, start + offset, value, parsed[index]
+
+    def series_rows(self, parameter: str, region: str, columns: Optional[Iterable[str]] = None) -> List[SeriesRow]:
+        """The dataset's series in column id order, optionally only the named columns."""
+        dataset = self.datasets.get((parameter, region))
+        if dataset is None:
+            return []
+        wanted = set(columns) if columns is not None else None
+        return [row for row in dataset.series if wanted is None or row[0] in wanted]
+
+    def rollup_rows(
+        self, parameter: str, region: str, column: Optional[str] = None, decades: Optional[bool] = None
+    ) -> List[RollupRow]:
+        """Summaries in column id order: whole-column ones, per-decade ones (`decades=True`) or both."""
+        dataset = self.datasets.get((parameter, region))
+        if dataset is None:
+            return []
+        return [
+            row
+            for row in dataset.rollups()
+            if (not column or row[0] == column) and (decades is None or (row[1] is not None) == decades)
+        ]
+
+
+_store: Optional[DatasetStore] = None
+_lock = threading.Lock()
+
+
+def store_path() -> str:
+    return getattr(settings, "DATASET_STORE_PATH", "")
+
+
+def get_store() -> Optional[DatasetStore]:
+    """The current store, remapped if the snapshot changed; None when disabled or unavailable.
+
+    A missing snapshot is built from the database first. Failures are logged and
+    the caller falls back to the database.
+    """
+    global _store
+    path = store_path()
+    if not path:
+        return None
+    try:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            write_snapshot(path)
+            stat = os.stat(path)
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if _store is None or _store.key != key:
+            with _lock:
+                if _store is None or _store.key != key:
+                    # The old map is released once in-flight requests drop their views.
+                    try:
+                        _store = DatasetStore(path)
+                    except ValueError:
+                        # Written by an older release; rebuild it in the current format.
+                        write_snapshot(path)
+                        _store = DatasetStore(path)
+    except (OSError, ValueError, DatabaseError):
+        logger.exception("Dataset store unavailable; serving from the database.")
+        return None
+    return _store
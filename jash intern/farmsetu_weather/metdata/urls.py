@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+from django.conf import settings
 from django.urls import path
-from .views import DataRecordListView, DataRecordFilterView, StatsView
+
+from .async_views import AsyncDataRecordFilterView, AsyncDataRecordListView, AsyncStatsView
+from .views import AnalyticsView, BatchView, DataRecordListView, DataRecordFilterView, RecordExportView, DatasetCatalogueView, SeriesView, StatsView
+
+if getattr(settings, "API_ASYNC", False):
+    RecordList, RecordFilter, Stats = AsyncDataRecordListView, AsyncDataRecordFilterView, AsyncStatsView
+else:
+    RecordList, RecordFilter, Stats = DataRecordListView, DataRecordFilterView, StatsView
 
 urlpatterns = [
-    path("records/", DataRecordListView.as_view(), name="records-list"),
-    path("records/filter/", DataRecordFilterView.as_view(), name="records-filter"),
-    path("stats/", StatsView.as_view(), name="stats"),
+    path("records/", RecordList.as_view(), name="records-list"),
+    path("records/filter/", RecordFilter.as_view(), name="records-filter"),
+    path("records/export/<str:fmt>/", RecordExportView.as_view(), name="records-export"),
+    path("stats/", Stats.as_view(), name="stats"),
+    path("datasets/", DatasetCatalogueView.as_view(), name="datasets"),
+    path("series/", SeriesView.as_view(), name="series"),
+    path("batch/", BatchView.as_view(), name="batch"),
+    path("analytics/<str:kind>/", AnalyticsView.as_view(), name="analytics"),
 ]
@@ -0,0 +1,189 @@
+"""HTTP helpers for downloading MetOffice summary datasets.
+
+Every dataset lives under the same host and follows one URL pattern:
+https://www.metoffice.gov.uk/pub/data/weather/uk/climate/datasets/<Parameter>/date/<Region>.txt
+
+Downloading the full parameter x region matrix one file at a time spends most of
+its wall-clock time waiting on the network, so this module provides:
+- the known parameter and region names plus a URL builder for the matrix
+- a manifest reader (one URL per line)
+- a shared keep-alive `requests.Session` sized for a worker pool
+- conditional downloads (ETag / Last-Modified) so unchanged files cost a 304, with the
+  body streamed line by line instead of buffered
+- a bounded thread-pool runner that yields results as soon as each one completes
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+DATASET_URL_TEMPLATE = (
+    "https://www.metoffice.gov.uk/pub/data/weather/uk/climate/datasets/{parameter}/date/{region}.txt"
+)
+
+PARAMETERS: Tuple[str, ...] = ("Tmax", "Tmin", "Tmean", "Rainfall", "Sunshine")
+
+REGIONS: Tuple[str, ...] = (
+    "UK",
+    "England",
+    "Wales",
+    "Scotland",
+    "Northern_Ireland",
+    "England_and_Wales",
+    "England_N",
+    "England_S",
+    "Scotland_N",
+    "Scotland_E",
+    "Scotland_W",
+    "England_E_and_NE",
+    "England_NW_and_N_Wales",
+    "Midlands",
+    "East_Anglia",
+    "England_SW_and_S_Wales",
+    "England_SE_and_Central_S",
+)
+
+
+def dataset_urls(
+    parameters: Sequence[str], regions: Sequence[str], template: str = DATASET_URL_TEMPLATE
+) -> List[str]:
+    """Expand a parameter x region matrix into dataset URLs."""
+    return [template.format(parameter=p, region=r) for p in parameters for r in regions]
+
+
+def read_manifest(path: Union[str, Path]) -> List[str]:
+    """Read dataset URLs from a manifest file.
+
+    One URL per line; blank lines and lines starting with '#' are ignored.
+    """
+    urls: List[str] = []
+    for raw in Path(path).read_text(encoding="utf-8").splitlines():
+        line = raw.strip()
+        if line and not line.startswith("#"):
+            urls.append(line)
+    return urls
+
+
+def build_session(pool_size: int = 10) -> requests.Session:
+    """Return a keep-alive session whose connection pool fits `pool_size` workers.
+
+    All datasets share one host, so a single pool of persistent connections avoids
+    a TCP/TLS handshake per file.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@dataclass
+class Download:
+    """Outcome of a (possibly conditional) dataset download.
+
+    `not_modified` is True when the server answered 304; there is then no body and
+    the previously stored data is still current. Otherwise the body is read once,
+    through `lines()`; `content_hash` and `size` describe it after that.
+    """
+
+    not_modified: bool
+    response: Optional[requests.Response] = None
+    encoding: str = "utf-8"
+    etag: str = ""
+    last_modified: str = ""
+    size: int = 0
+    # Time spent waiting on the network inside `lines()`.
+    read_seconds: float = 0.0
+    _digest: "hashlib._Hash" = field(default_factory=hashlib.sha256, repr=False)
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 hex digest of the body read so far."""
+        return self._digest.hexdigest()
+
+    def lines(self, chunk_size: int = 16 * 1024) -> Iterator[bytes]:
+        """Yield the body's lines as raw bytes, reading `chunk_size` bytes at a time.
+
+        Only the current chunk and a partial line are held in memory. The connection
+        is released when the body is exhausted or the iterator is closed.
+        """
+        if self.response is None:
+            return
+        with self.response:
+            chunks = self.response.iter_content(chunk_size)
+            pending = b""
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                self.read_seconds += time.perf_counter() - started
+                if chunk is None:
+                    break
+                self._digest.update(chunk)
+                self.size += len(chunk)
+                *complete, pending = (pending + chunk).split(b"\n")
+                yield from complete
+            if pending:
+                yield pending
+
+
+def fetch_dataset(
+    session: requests.Session,
+    url: str,
+    timeout: float,
+    etag: str = "",
+    last_modified: str = "",
+) -> Download:
+    """Request `url`, sending If-None-Match / If-Modified-Since when validators are known.
+
+    Only the headers are read here; the body streams through `Download.lines()`.
+    Raises `requests.HTTPError` for error statuses.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    resp = session.get(url, timeout=timeout, headers=headers, stream=True)
+    if resp.status_code == 304:
+        resp.close()
+        return Download(not_modified=True, etag=etag, last_modified=last_modified)
+    if not resp.ok:
+        resp.close()
+    resp.raise_for_status()
+    return Download(
+        not_modified=False,
+        response=resp,
+        # apparent_encoding would need the whole body; requests defaults text/* to ISO-8859-1.
+        encoding=resp.encoding or "utf-8",
+        etag=resp.headers.get("ETag", ""),
+        last_modified=resp.headers.get("Last-Modified", ""),
+    )
+
+
+def run_concurrently(
+    func: Callable[[str], T], urls: Iterable[str], workers: int
+) -> Iterator[Tuple[str, Union[T, Exception]]]:
+    """Apply `func` to every URL on a bounded thread pool.
+
+    Yields (url, result) pairs in completion order so the caller can consume
+    (e.g. write to the database) one result while the others are still
+    downloading. Exceptions raised by `func` are yielded in place of the result
+    rather than aborting the remaining work.
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {pool.submit(func, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                yield url, future.result()
+            except Exception as e:  # noqa: BLE001
+                yield url, e
@@ -25,11 +25,17 @@ This module exposes high-level helper functions for:
 - inferring parameter & region
 - extracting columns
 - iterating value rows
+- fingerprinting rows so re-imports can detect which years changed
+- streaming column-oriented batches (`iter_column_batches`) in a single pass over
+  any iterable of lines, e.g. `response.iter_lines()` or an open file
 """
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+import hashlib
+import math
 import re
 from pathlib import PurePosixPath
 
@@ -51,6 +57,40 @@ class ParsedRow:
     values: List[Tuple[str, float]]  # (column_name, value)
 
 
+@dataclass(frozen=True)
+class ColumnBatch:
+    """A block of consecutive data rows stored column-wise.
+
+    `years` holds one entry per row; `values[column][i]` is the cell for
+    `years[i]`, or NaN when the source marked it missing (or the row was short).
+    Both use `array` so a batch costs a few bytes per cell rather than a Python
+    object per cell.
+    """
+
+    columns: Tuple[str, ...]  # data columns, excluding Year
+    years: array  # array('i')
+    values: Dict[str, array]  # column -> array('d')
+    year_column: str = "Year"  # header label of the year column, as written
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def row_cells(self, index: int) -> List[Tuple[str, float]]:
+        """Return the non-missing (column_name, value) pairs of row `index`."""
+        cells = []
+        for col in self.columns:
+            val = self.values[col][index]
+            if not math.isnan(val):
+                cells.append((col, val))
+        return cells
+
+    def iter_cells(self) -> Iterator[Tuple[int, str, float]]:
+        """Yield (year, column_name, value) for every non-missing cell, row by row."""
+        for i, year in enumerate(self.years):
+            for col, val in self.row_cells(i):
+                yield year, col, val
+
+
 def infer_parameter_and_region(url: str) -> Tuple[str, str]:
     """Infer (parameter, region) from a MetOffice dataset URL.
 
@@ -122,10 +162,89 @@ def parse_data_rows(text: str, header: ParsedHeader) -> Iterable[ParsedRow]:
 
 
 def parse_full(text: str) -> Tuple[ParsedHeader, List[ParsedRow]]:
-    """Convenience function returning header and all parsed rows."""
-    # We need to iterate lines twice (once for header, again for rows). So store filtered lines.
-    non_comment_lines = list(iter_non_comment_lines(text))
-    header = parse_header(non_comment_lines)
-    # Build rows from original full text (to preserve order) - we could also use filtered.
-    rows = list(parse_data_rows(text, header))
-    return header, rows
+    """Convenience function returning header and all parsed rows.
+
+    Built on `iter_column_batches`, so the text is scanned once.
+    """
+    header_columns: List[str] = []
+    rows: List[ParsedRow] = []
+    for batch in iter_column_batches(text.splitlines()):
+        header_columns = [batch.year_column, *batch.columns]
+        rows.extend(ParsedRow(year=year, values=batch.row_cells(i)) for i, year in enumerate(batch.years))
+    if not rows:
+        # A header with no data rows yields no batches; recover its columns.
+        return parse_header(iter_non_comment_lines(text)), rows
+    return ParsedHeader(columns=header_columns), rows
+
+
+def row_digest(row: ParsedRow) -> str:
+    """Return a short stable fingerprint of a parsed row's cells.
+
+    Two rows with the same year, columns and values produce the same digest, so a
+    stored digest per year tells a re-import whether that year needs rewriting.
+    """
+    return cells_digest(row.year, row.values)
+
+
+def cells_digest(year: int, cells: Iterable[Tuple[str, float]]) -> str:
+    """Fingerprint one year's (column_name, value) cells; see `row_digest`."""
+    payload = ";".join(f"{col}={val!r}" for col, val in cells)
+    return hashlib.blake2b(f"{year}|{payload}".encode(), digest_size=8).hexdigest()
+
+
+def iter_column_batches(
+    lines: Iterable[Union[str, bytes]],
+    batch_size: int = 256,
+    encoding: str = "utf-8",
+) -> Iterator[ColumnBatch]:
+    """Parse a dataset in one pass, yielding column-oriented batches of rows.
+
+    `lines` may yield `str` or `bytes` (decoded with `encoding`); nothing before
+    the current line is retained, so memory stays bounded by `batch_size` rows.
+    Lines before the 'Year' header are skipped; after it, lines whose first token
+    is not a year are skipped without re-running the header pattern.
+    """
+    columns: Tuple[str, ...] = ()
+    year_column = "Year"
+    years = array("i")
+    values: Dict[str, array] = {}
+    nan = math.nan
+    missing = MISSING_VALUE_TOKENS
+
+    for raw in lines:
+        line = raw.decode(encoding, errors="replace") if isinstance(raw, bytes) else raw
+        line = line.strip()
+        if not line or line.startswith(COMMENT_PREFIXES):
+            continue
+        if not columns:
+            if HEADER_YEAR_PATTERN.search(line):
+                year_column, *names = line.split()
+                columns = tuple(names)
+                values = {col: array("d") for col in columns}
+            continue
+
+        tokens = line.split()
+        if not tokens[0].isdigit():  # skip lines not starting with a year
+            continue
+        years.append(int(tokens[0]))
+        cells = tokens[1:]
+        for i, col in enumerate(columns):
+            val = nan
+            if i < len(cells):
+                raw_val = cells[i]
+                if raw_val not in missing:
+                    try:
+                        val = float(raw_val)
+                    except ValueError:
+                        pass
+            values[col].append(val)
+
+        if len(years) >= batch_size:
+            yield ColumnBatch(columns=columns, years=years, values=values, year_column=year_column)
+            years = array("i")
+            values = {col: array("d") for col in columns}
+
+    if not columns:
+        raise ValueError("Header line starting with 'Year' not found in dataset.")
+    if years:
+        yield ColumnBatch(columns=columns, years=years, values=values, year_column=year_column)
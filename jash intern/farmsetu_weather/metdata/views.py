@@ -1,74 +1,729 @@
 from __future__ import annotations
 
-from django.db.models import Avg, Min, Max
-from django.http import HttpRequest
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpRequest, HttpResponseBase, StreamingHttpResponse
 from rest_framework import generics
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import DataRecord
-from .serializers import DataRecordSerializer
+from . import analytics, export
+from .cache import cache_response, conditional_response, params_scope
+from .models import Column, DataRecord, DataRollup, Dataset, DataSeries
+from .pagination import KEYSET_FIELDS, RecordPagination
+from .rollups import Summary, decade_of, summarise_blob, summarise_points
+from .renderers import PackedSeriesRenderer
+from .serializers import DataRecordSerializer, record_rows_to_dicts
+from .series import downsample_lttb, series_points, unpack_values
+from .store import RollupRow, get_store
+
 
+class FastRecordListMixin:
+    """Opt-in (`API_FAST_RECORDS`) list path that skips per-row ModelSerializer work.
+
+    Filtering, ordering and pagination run as usual; the page is then fetched as
+    `values_list` tuples and converted by `record_rows_to_dicts`, which renders
+    byte-identically to `DataRecordSerializer`.
+    """
 
-class DataRecordListView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):  # type: ignore[override]
+        if not getattr(settings, "API_FAST_RECORDS", False):
+            return super().list(request, *args, **kwargs)  # type: ignore[misc]
+        queryset = self.filter_queryset(self.get_queryset())  # type: ignore[attr-defined]
+        # Trailing key fields let cursor pagination read each row's position.
+        rows = queryset.values_list(*DataRecordSerializer.Meta.fields, *KEYSET_FIELDS)
+        page = self.paginate_queryset(rows)  # type: ignore[attr-defined]
+        if page is not None:
+            return self.get_paginated_response(record_rows_to_dicts(page))  # type: ignore[attr-defined]
+        return Response(record_rows_to_dicts(rows))
+
+
+class DataRecordListView(FastRecordListMixin, generics.ListAPIView):
     """GET /api/records/
 
     Paginated list of all records (suitable for exploration).
     Supports ordering via ?ordering=year,-value etc.
+    `?cursor=start` switches to keyset pagination for constant-time deep pages
+    (see `metdata.pagination`).
+    Responses are cached until the next import changes any dataset (see `metdata.cache`).
     """
 
-    queryset = DataRecord.objects.all().order_by("id")
+    queryset = DataRecord.objects.with_dimensions().order_by("id")
     serializer_class = DataRecordSerializer
+    pagination_class = RecordPagination
+    # Public and cached: without authenticators the session is never read, so responses
+    # carry no `Vary: Cookie` and shared caches can store them.
+    authentication_classes = []
+
+    @conditional_response
+    @cache_response
+    def get(self, request, *args, **kwargs):  # type: ignore[override]
+        return super().get(request, *args, **kwargs)
 
 
-class DataRecordFilterView(generics.ListAPIView):
-    """GET /api/records/filter/?parameter=&region=&year=&column=
+class DataRecordFilterView(FastRecordListMixin, generics.ListAPIView):
+    """GET /api/records/filter/?parameter=&region=&column=&year=&year_min=&year_max=&value_min=&value_max=
 
-    Filter by exact matches on provided fields; any combination supported.
+    Any combination of filters; `parameter`, `region` and `column` accept comma-separated
+    lists, so one request covers several datasets or a range of years (see `filter_records`).
+    Accepts `?cursor=start` like the list view.
     """
 
     serializer_class = DataRecordSerializer
+    pagination_class = RecordPagination
+    authentication_classes = []
+
+    def cache_scope(self, request):  # type: ignore[override]
+        return filter_scope(request.query_params)
+
+    @conditional_response
+    @cache_response
+    def get(self, request, *args, **kwargs):  # type: ignore[override]
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):  # type: ignore[override]
-        qs = DataRecord.objects.all()
-        p = self.request.query_params.get("parameter")
-        r = self.request.query_params.get("region")
-        y = self.request.query_params.get("year")
-        c = self.request.query_params.get("column")
-        if p:
-            qs = qs.filter(parameter=p)
-        if r:
-            qs = qs.filter(region=r)
-        if y and y.isdigit():
-            qs = qs.filter(year=int(y))
-        if c:
-            qs = qs.filter(column_name=c)
-        return qs.order_by("parameter", "region", "year", "column_name")
+        qs = filter_records(DataRecord.objects.with_dimensions(), self.request.query_params)
+        return qs.order_by(*FILTER_ORDERING)
 
 
-class StatsView(APIView):
-    """GET /api/stats/?parameter=&region=
+# The original API order: datasets by name, then year and column name. Within a dataset
+# the year range comes from `uniq_record_scope`; only each year's columns are sorted.
+FILTER_ORDERING = ("dataset__parameter", "dataset__region", "year", "column__name")
+
 
-    Returns aggregate statistics (avg, min, max) across all values for parameter+region.
+def filter_records(qs, params):
+    """Apply the record filter query params to a `DataRecord` queryset.
+
+    `parameter`, `region` and `column` take comma-separated lists; `year` is an exact
+    match, `year_min`/`year_max` and `value_min`/`value_max` are inclusive bounds.
+    Names are resolved to dataset and column ids first, so the record query is a plain
+    `dataset_id IN (...)` range scan of `uniq_record_scope` (dataset, year, column), or of
+    `idx_param_region_col` (dataset, column, year) when columns are given.
     """
+    datasets, columns = record_filter_lookups(params)
+    dataset_ids = list(datasets) if datasets is not None else None
+    column_ids = list(columns) if columns is not None else None
+    return apply_record_filters(qs, params, dataset_ids, column_ids)
+
+
+def record_filter_lookups(params):
+    """(dataset ids, column ids) querysets for the named dimensions; None where none are named."""
+    parameters = _split_list(params, "parameter")
+    regions = _split_list(params, "region")
+    columns = _split_list(params, "column")
+    datasets = None
+    if parameters or regions:
+        datasets = Dataset.objects.all()
+        if parameters:
+            datasets = datasets.filter(parameter__in=parameters)
+        if regions:
+            datasets = datasets.filter(region__in=regions)
+        datasets = datasets.values_list("pk", flat=True)
+    column_ids = Column.objects.filter(name__in=columns).values_list("pk", flat=True) if columns else None
+    return datasets, column_ids
+
+
+def apply_record_filters(qs, params, dataset_ids: Optional[List[int]], column_ids: Optional[List[int]]):
+    """Apply the resolved ids of `record_filter_lookups` and the year and value filters."""
+    if dataset_ids is not None:
+        qs = qs.filter(dataset_id__in=dataset_ids)
+    if column_ids is not None:
+        qs = qs.filter(column_id__in=column_ids)
+    y = params.get("year")
+    if y and y.isdigit():
+        qs = qs.filter(year=int(y))
+    year_min, year_max = _year_param(params, "year_min"), _year_param(params, "year_max")
+    if year_min is not None:
+        qs = qs.filter(year__gte=year_min)
+    if year_max is not None:
+        qs = qs.filter(year__lte=year_max)
+    value_min, value_max = _value_param(params, "value_min"), _value_param(params, "value_max")
+    if value_min is not None:
+        qs = qs.filter(value__gte=value_min)
+    if value_max is not None:
+        qs = qs.filter(value__lte=value_max)
+    return qs
+
+
+def rollup_rows(rollups: Iterable[DataRollup]) -> List[RollupRow]:
+    """(column name, decade, summary) triples of `DataRollup` rows with `column` loaded."""
+    return [(rollup.column.name, rollup.decade, Summary.from_rollup(rollup)) for rollup in rollups]
+
+
+def filter_scope(params):
+    """Cache scope of a record filter: one dataset only when a single parameter and region are named."""
+    parameters, regions = _split_list(params, "parameter"), _split_list(params, "region")
+    if len(parameters) == 1 and len(regions) == 1:
+        return params_scope(parameters[0], regions[0])
+    return None
+
+
+def _split_list(params, name: str) -> List[str]:
+    return list(dict.fromkeys(v.strip() for v in params.get(name, "").split(",") if v.strip()))
+
+
+def _year_param(params, name: str) -> Optional[int]:
+    value = params.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ParseError(f"'{name}' must be a positive integer.")
+    return int(value)
+
+
+def _value_param(params, name: str) -> Optional[float]:
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        number = math.nan
+    if not math.isfinite(number):
+        raise ParseError(f"'{name}' must be a number.")
+    return number
+
+
+class RecordExportView(APIView):
+    """GET /api/records/export/<csv|ndjson|parquet>/?<filter params>[&compress=gzip]
 
+    Streams every matching record in one response, using the same filters as
+    `/api/records/filter/`. Rows are read through a server-side cursor and encoded chunk
+    by chunk, so memory stays constant (see `metdata.export`). `compress=gzip` returns a
+    `.gz` file. Parquet requires `pyarrow`; without it the request gets a 406.
+    """
+
+    authentication_classes = []
+
+    def cache_scope(self, request):  # type: ignore[override]
+        return filter_scope(request.query_params)
+
+    @conditional_response
+    def get(self, request: HttpRequest, fmt: str) -> HttpResponseBase:  # type: ignore[override]
+        if fmt not in export.FORMATS:
+            return Response({"detail": f"Unknown export format '{fmt}'; use csv, ndjson or parquet."}, status=404)
+        if fmt == "parquet" and not export.pyarrow_available():
+            # Refused before any bytes are streamed, so clients never get a truncated file.
+            return Response(
+                {"detail": "Parquet export is not available on this server (requires 'pyarrow'); use csv or ndjson."},
+                status=406,
+            )
+        compress = request.query_params.get("compress")
+        if compress not in (None, "", "gzip"):
+            return Response({"detail": "'compress' must be 'gzip'."}, status=400)
+
+        queryset = filter_records(DataRecord.objects.with_dimensions(), request.query_params)
+        stream = getattr(export, f"{fmt}_stream")(export.export_rows(queryset))
+        content_type = export.FORMATS[fmt]["content_type"]
+        filename = f"records.{export.FORMATS[fmt]['extension']}"
+        if compress:
+            stream = export.gzip_stream(stream)
+            content_type = "application/gzip"
+            filename += ".gz"
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class DatasetCatalogueView(APIView):
+    """GET /api/datasets/
+
+    Lists every imported dataset with its columns, year range and record count, plus the
+    distinct parameters and regions. Built from the whole-column `DataRollup` rows in one
+    query (or from the dataset store), so it never touches `DataRecord`.
+    """
+
+    authentication_classes = []
+
+    @conditional_response
+    @cache_response
     def get(self, request: HttpRequest) -> Response:  # type: ignore[override]
+        store = get_store()
+        if store is not None:
+            rows = [
+                (parameter, region, column, summary.first_year, summary.last_year, summary.count)
+                for parameter, region in sorted(store.datasets)
+                for column, _, summary in store.rollup_rows(parameter, region, None, decades=False)
+            ]
+        else:
+            rows = (
+                DataRollup.objects.filter(decade__isnull=True)
+                .order_by("dataset__parameter", "dataset__region", "column_id")
+                .values_list(
+                    "dataset__parameter", "dataset__region", "column__name", "first_year", "last_year", "count"
+                )
+            )
+        datasets: Dict[Tuple[str, str], Dict[str, object]] = {}
+        for parameter, region, column_name, first_year, last_year, count in rows:
+            entry = datasets.get((parameter, region))
+            if entry is None:
+                entry = datasets[(parameter, region)] = {
+                    "parameter": parameter,
+                    "region": region,
+                    "columns": [],
+                    "first_year": first_year,
+                    "last_year": last_year,
+                    "records": 0,
+                }
+            entry["columns"].append(column_name)
+            entry["first_year"] = min(entry["first_year"], first_year)
+            entry["last_year"] = max(entry["last_year"], last_year)
+            entry["records"] += count
+        return Response({
+            "parameters": sorted({parameter for parameter, _ in datasets}),
+            "regions": sorted({region for _, region in datasets}),
+            "datasets": list(datasets.values()),
+        })
+
+
+class SeriesView(APIView):
+    """GET /api/series/?series=Tmax:UK:ann&series=Tmin:UK:ann[&start_year=&end_year=][&max_points=]
+
+    Compact chart data: for each requested (parameter, region, column) returns parallel
+    `years` and `values` arrays, in request order. `?parameter=&region=&column=ann,win`
+    is shorthand for series of one dataset. `max_points` downsamples long series (LTTB)
+    and `?format=f32` returns packed binary (see `PackedSeriesRenderer`).
+
+    Reads the packed `DataSeries` rows with `values_list`, one row per series.
+    """
+
+    MAX_SERIES = 50
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PackedSeriesRenderer]
+    authentication_classes = []
+
+    def cache_scope(self, request):  # type: ignore[override]
+        keys = self._requested(request) or []
+        datasets = {(parameter, region) for parameter, region, _ in keys}
+        return params_scope(*datasets.pop()) if len(datasets) == 1 else None
+
+    @staticmethod
+    def _requested(request) -> Optional[List[Tuple[str, str, str]]]:
+        """The (parameter, region, column) triples asked for, or None if malformed."""
+        keys: List[Tuple[str, str, str]] = []
+        for spec in request.query_params.getlist("series"):
+            for item in spec.split(","):
+                parts = item.split(":")
+                if len(parts) != 3 or not all(parts):
+                    return None
+                keys.append((parts[0], parts[1], parts[2]))
         parameter = request.query_params.get("parameter")
         region = request.query_params.get("region")
-        if not parameter or not region:
+        columns = request.query_params.get("column")
+        if parameter and region and columns:
+            keys.extend((parameter, region, column) for column in columns.split(",") if column)
+        return list(dict.fromkeys(keys))
+
+    @conditional_response
+    @cache_response
+    def get(self, request: HttpRequest) -> Response:  # type: ignore[override]
+        keys = self._requested(request)
+        if keys is None:
+            return Response({"detail": "'series' entries must look like parameter:region:column."}, status=400)
+        if not keys:
             return Response(
-                {
-                    "detail": "Both 'parameter' and 'region' are required query params.",
-                },
+                {"detail": "Pass 'series=parameter:region:column' or 'parameter', 'region' and 'column'."},
                 status=400,
             )
-        qs = DataRecord.objects.filter(parameter=parameter, region=region)
-        agg = qs.aggregate(avg=Avg("value"), min=Min("value"), max=Max("value"))
-        return Response({
-            "parameter": parameter,
-            "region": region,
-            "avg": agg["avg"],
-            "min": agg["min"],
-            "max": agg["max"],
-            "count": qs.count(),
-        })
+        if len(keys) > self.MAX_SERIES:
+            return Response({"detail": f"At most {self.MAX_SERIES} series per request."}, status=400)
+        bounds = {}
+        for name in ("start_year", "end_year", "max_points"):
+            value = request.query_params.get(name)
+            if value and not value.isdigit():
+                return Response({"detail": f"'{name}' must be a positive integer."}, status=400)
+            bounds[name] = int(value) if value else None
+        first = bounds["start_year"] or 0
+        last = bounds["end_year"] or 9999
+
+        store = get_store()
+        if store is not None:
+            stored = {
+                (p, r, c): (start, blob)
+                for p, r in {(p, r) for p, r, _ in keys}
+                for c, start, blob in store.series_rows(p, r)
+            }
+        else:
+            match = Q()
+            for parameter, region, column in keys:
+                match |= Q(dataset__parameter=parameter, dataset__region=region, column__name=column)
+            rows = DataSeries.objects.filter(match).values_list(
+                "dataset__parameter", "dataset__region", "column__name", "start_year", "values"
+            )
+            stored = {(p, r, c): (start, blob) for p, r, c, start, blob in rows}
+        series = [self.series_payload(key, stored.get(key), first, last, bounds["max_points"]) for key in keys]
+        return Response({"series": series})
+
+    @staticmethod
+    def series_payload(
+        key: Tuple[str, str, str],
+        stored: Optional[Tuple[int, bytes]],
+        first: int,
+        last: int,
+        max_points: Optional[int],
+    ) -> Dict[str, object]:
+        """One entry of the `series` list from a stored (start_year, blob) pair, if any."""
+        years: List[int] = []
+        values: List[float] = []
+        if stored is not None:
+            start, blob = stored
+            lo, hi = max(first - start, 0), max(last - start + 1, 0)
+            for offset, value in enumerate(unpack_values(blob)[lo:hi], lo):
+                if not math.isnan(value):
+                    years.append(start + offset)
+                    values.append(value)
+        if max_points:
+            years, values = downsample_lttb(years, values, max_points)
+        return {"parameter": key[0], "region": key[1], "column": key[2], "years": years, "values": values}
+
+
+class StatsView(APIView):
+    """GET /api/stats/?parameter=&region=[&column=][&by=column|decade][&start_year=&end_year=]
+
+    Returns aggregate statistics (avg, min, max, count, stddev, first/last year) across
+    all values for parameter+region, optionally restricted to one `column`.
+
+    - `by=column` or `by=decade` adds a per-column or per-decade breakdown.
+    - `start_year` / `end_year` restrict the statistics to a year range.
+
+    Served from the precomputed `DataRollup` rows; year ranges are summarised from the
+    packed `DataSeries` rows. Neither path reads `DataRecord`.
+    """
+
+    GROUPINGS = ("column", "decade")
+    authentication_classes = []
+
+    def cache_scope(self, request):  # type: ignore[override]
+        return params_scope(request.query_params.get("parameter"), request.query_params.get("region"))
+
+    @conditional_response
+    @cache_response
+    def get(self, request: HttpRequest) -> Response:  # type: ignore[override]
+        error = self.params_error(request.query_params)
+        if error:
+            return Response({"detail": error}, status=400)
+        parameter, region, column, by, start_year, end_year = self.stats_params(request.query_params)
+
+        store = get_store()
+        if start_year or end_year:
+            first = int(start_year) if start_year else 0
+            last = int(end_year) if end_year else 9999
+            if store is not None:
+                rows = store.series_rows(parameter, region, [column] if column else None)
+            else:
+                rows = self.series_query(parameter, region, column)
+            groups = self.range_summaries(rows, by, first, last)
+        elif store is not None:
+            groups = self.rollup_summaries(store.rollup_rows(parameter, region, column, decades=by == "decade"), by)
+        else:
+            groups = self.rollup_summaries(rollup_rows(self.rollup_query(parameter, region, column, by)), by)
+        return Response(self.stats_payload(parameter, region, column, by, start_year, end_year, groups))
+
+    @classmethod
+    def params_error(cls, params) -> Optional[str]:
+        """The 400 message for invalid stats query params, if any."""
+        if not params.get("parameter") or not params.get("region"):
+            return "Both 'parameter' and 'region' are required query params."
+        by = params.get("by")
+        if by and by not in cls.GROUPINGS:
+            return "'by' must be one of: column, decade."
+        for name in ("start_year", "end_year"):
+            value = params.get(name)
+            if value and not value.isdigit():
+                return f"'{name}' must be a year."
+        return None
+
+    @staticmethod
+    def stats_params(params) -> Tuple[str, str, Optional[str], Optional[str], Optional[str], Optional[str]]:
+        """(parameter, region, column, by, start_year, end_year) of validated query params."""
+        names = ("parameter", "region", "column", "by", "start_year", "end_year")
+        return tuple(params.get(name) for name in names)  # type: ignore[return-value]
+
+    @staticmethod
+    def series_query(parameter: str, region: str, column: Optional[str]):
+        """(column name, start_year, blob) rows of the dataset's `DataSeries`, in column id order."""
+        series = DataSeries.objects.filter(dataset__parameter=parameter, dataset__region=region)
+        if column:
+            series = series.filter(column__name=column)
+        return series.order_by("column_id").values_list("column__name", "start_year", "values")
+
+    @staticmethod
+    def rollup_query(parameter: str, region: str, column: Optional[str], by: Optional[str]):
+        """The dataset's whole-column (or, for `by=decade`, per-decade) `DataRollup` rows."""
+        rollups = DataRollup.objects.filter(dataset__parameter=parameter, dataset__region=region)
+        if column:
+            rollups = rollups.filter(column__name=column)
+        rollups = rollups.filter(decade__isnull=by != "decade")
+        return rollups.select_related("column").order_by("column_id", "decade")
+
+    @classmethod
+    def stats_payload(
+        cls,
+        parameter: str,
+        region: str,
+        column: str | None,
+        by: str | None,
+        start_year: str | None,
+        end_year: str | None,
+        groups: Dict[object, Summary],
+    ) -> Dict[str, object]:
+        overall = Summary()
+        for summary in groups.values():
+            overall.merge(summary)
+        payload: Dict[str, object] = {"parameter": parameter, "region": region}
+        if column:
+            payload["column"] = column
+        if start_year or end_year:
+            payload["start_year"] = int(start_year) if start_year else None
+            payload["end_year"] = int(end_year) if end_year else None
+        payload.update(overall.as_dict())
+        if by == "column":
+            payload["columns"] = [{"column": key, **groups[key].as_dict()} for key in groups]
+        elif by == "decade":
+            payload["decades"] = [{"decade": key, **groups[key].as_dict()} for key in sorted(groups)]
+        return payload
+
+    @classmethod
+    def rollup_summaries(cls, rollups: Iterable[RollupRow], by: str | None) -> Dict[object, Summary]:
+        """Merge (column name, decade, summary) rollups into one `Summary` per group key."""
+        groups: Dict[object, Summary] = {}
+        for column_name, decade, summary in rollups:
+            groups.setdefault(cls._group_key(by, column_name, decade), Summary()).merge(summary)
+        return groups
+
+    @classmethod
+    def range_summaries(
+        cls, rows: Iterable[Tuple[str, int, bytes]], by: str | None, first: int, last: int
+    ) -> Dict[object, Summary]:
+        """Summarise the years in [first, last] of packed (column name, start_year, blob) series."""
+        groups: Dict[object, Summary] = {}
+        for column_name, start, blob in rows:
+            if by == "decade":
+                by_decade: Dict[int, List[Tuple[int, float]]] = {}
+                for year, value in series_points(start, blob):
+                    if first <= year <= last:
+                        by_decade.setdefault(decade_of(year), []).append((year, value))
+                for decade, points in by_decade.items():
+                    groups.setdefault(decade, Summary()).merge(summarise_points(points))
+            else:
+                summary = summarise_blob(start, blob, first, last)
+                groups.setdefault(cls._group_key(by, column_name, None), Summary()).merge(summary)
+        return {key: summary for key, summary in groups.items() if summary.count}
+
+    @staticmethod
+    def _group_key(by: str | None, column_name: str, decade: int | None) -> object:
+        if by == "column":
+            return column_name
+        if by == "decade":
+            return decade
+        return None
+
+
+class BatchView(APIView):
+    """POST /api/batch/
+
+    Runs several series and stats queries in one request, e.g.
+
+        {"queries": [
+            {"type": "series", "parameter": "Tmax", "region": "UK", "column": "ann"},
+            {"type": "stats", "parameter": "Tmax", "region": "UK"},
+            {"type": "stats", "parameter": "Tmax", "region": "England", "column": "ann", "by": "decade"}
+        ]}
+
+    Each query takes the query params of `/api/series/` (one series) or `/api/stats/`,
+    and `results` holds, in query order, what those endpoints would return. However many
+    queries are sent, at most two SQL statements run: one for all `DataSeries` rows
+    needed (series and year-range stats) and one for all `DataRollup` rows needed.
+
+    Being a POST, a batch bypasses the response cache and HTTP validators; pages that
+    repeat the same queries should use the cacheable GET endpoints instead.
+    """
+
+    MAX_QUERIES = 50
+    FIELDS = {
+        "series": ("parameter", "region", "column", "start_year", "end_year", "max_points"),
+        "stats": ("parameter", "region", "column", "by", "start_year", "end_year"),
+    }
+    NUMBERS = ("start_year", "end_year", "max_points")
+
+    def post(self, request: HttpRequest) -> Response:  # type: ignore[override]
+        queries = request.data.get("queries") if isinstance(request.data, dict) else None
+        if not isinstance(queries, list) or not queries:
+            return Response({"detail": "'queries' must be a non-empty list."}, status=400)
+        if len(queries) > self.MAX_QUERIES:
+            return Response({"detail": f"At most {self.MAX_QUERIES} queries per request."}, status=400)
+        specs: List[Dict[str, Optional[str]]] = []
+        for index, query in enumerate(queries):
+            try:
+                specs.append(self._parse(query))
+            except ValueError as e:
+                return Response({"detail": f"queries[{index}]: {e}"}, status=400)
+
+        series_match, rollup_match = Q(), Q()
+        for spec in specs:
+            match = Q(dataset__parameter=spec["parameter"], dataset__region=spec["region"])
+            if spec["column"]:
+                match &= Q(column__name=spec["column"])
+            if spec["type"] == "series" or spec["start_year"] or spec["end_year"]:
+                series_match |= match
+            else:
+                rollup_match |= match & Q(decade__isnull=spec["by"] != "decade")
+
+        stored: Dict[Tuple[str, str], List[Tuple[str, int, bytes]]] = {}
+        rollups: Dict[Tuple[str, str], List[RollupRow]] = {}
+        store = get_store()
+        if store is not None:
+            for spec in specs:
+                dataset = (spec["parameter"], spec["region"])
+                stored[dataset] = store.series_rows(*dataset)
+                rollups[dataset] = store.rollup_rows(*dataset)
+        if series_match and store is None:
+            rows = DataSeries.objects.filter(series_match).order_by("dataset_id", "column_id").values_list(
+                "dataset__parameter", "dataset__region", "column__name", "start_year", "values"
+            )
+            for parameter, region, column, start, blob in rows:
+                stored.setdefault((parameter, region), []).append((column, start, blob))
+        if rollup_match and store is None:
+            rows = DataRollup.objects.filter(rollup_match).select_related("dataset", "column")
+            for rollup in rows.order_by("dataset_id", "column_id", "decade"):
+                rollups.setdefault((rollup.dataset.parameter, rollup.dataset.region), []).extend(
+                    rollup_rows([rollup])
+                )
+
+        return Response({"results": [self._result(spec, stored, rollups) for spec in specs]})
+
+    def _parse(self, query: object) -> Dict[str, Optional[str]]:
+        """Validate one query into its type and query-param style string values."""
+        if not isinstance(query, dict) or query.get("type") not in self.FIELDS:
+            raise ValueError("each query must be an object with 'type' 'series' or 'stats'.")
+        kind = query["type"]
+        unknown = set(query) - {"type", *self.FIELDS[kind]}
+        if unknown:
+            raise ValueError(f"unknown {kind} field(s): {', '.join(sorted(unknown))}.")
+        spec: Dict[str, Optional[str]] = {"type": kind}
+        for name in self.FIELDS["series"] + self.FIELDS["stats"]:
+            value = query.get(name)
+            if isinstance(value, int) and not isinstance(value, bool) and name in self.NUMBERS:
+                value = str(value)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"'{name}' must be a string.")
+            if value and name in self.NUMBERS and not value.isdigit():
+                raise ValueError(f"'{name}' must be a positive integer.")
+            spec[name] = value or None
+        required = ("parameter", "region", "column") if kind == "series" else ("parameter", "region")
+        if not all(spec[name] for name in required):
+            raise ValueError(f"{kind} queries need {', '.join(repr(name) for name in required)}.")
+        if spec["by"] and spec["by"] not in StatsView.GROUPINGS:
+            raise ValueError("'by' must be one of: column, decade.")
+        return spec
+
+    @staticmethod
+    def _result(
+        spec: Dict[str, Optional[str]],
+        stored: Dict[Tuple[str, str], List[Tuple[str, int, bytes]]],
+        rollups: Dict[Tuple[str, str], List[RollupRow]],
+    ) -> Dict[str, object]:
+        parameter, region, column, by = spec["parameter"], spec["region"], spec["column"], spec["by"]
+        first = int(spec["start_year"]) if spec["start_year"] else 0
+        last = int(spec["end_year"]) if spec["end_year"] else 9999
+        rows = [row for row in stored.get((parameter, region), []) if not column or row[0] == column]
+        if spec["type"] == "series":
+            match = (rows[0][1], rows[0][2]) if rows else None
+            max_points = int(spec["max_points"]) if spec["max_points"] else None
+            return SeriesView.series_payload((parameter, region, column), match, first, last, max_points)
+        if spec["start_year"] or spec["end_year"]:
+            groups = StatsView.range_summaries(rows, by, first, last)
+        else:
+            matching = [
+                row
+                for row in rollups.get((parameter, region), [])
+                if (not column or row[0] == column) and (row[1] is None) == (by != "decade")
+            ]
+            groups = StatsView.rollup_summaries(matching, by)
+        return StatsView.stats_payload(parameter, region, column, by, spec["start_year"], spec["end_year"], groups)
+
+
+class AnalyticsView(APIView):
+    """GET /api/analytics/<climatology|anomalies|rolling|trend>/?parameter=&region=[&column=ann,jan]
+
+    Per-column analytics of one dataset, computed from the packed `DataSeries` rows in
+    a single query (see `metdata.analytics`):
+
+    - `climatology`: statistics of the baseline period (`baseline_start`/`baseline_end`,
+      default 1961-1990)
+    - `anomalies`: each year's departure from the baseline mean
+    - `rolling`: trailing `window`-year means (default 10)
+    - `trend`: least-squares slope per year and per decade
+
+    `start_year`/`end_year` restrict the years returned or fitted. Responses are cached
+    until the next import changes the dataset.
+    """
+
+    KINDS = ("climatology", "anomalies", "rolling", "trend")
+    BASELINE = (1961, 1990)
+    WINDOW = 10
+    authentication_classes = []
+
+    def cache_scope(self, request):  # type: ignore[override]
+        return params_scope(request.query_params.get("parameter"), request.query_params.get("region"))
+
+    @conditional_response
+    @cache_response
+    def get(self, request: HttpRequest, kind: str) -> Response:  # type: ignore[override]
+        if kind not in self.KINDS:
+            return Response({"detail": f"Unknown analysis '{kind}'; use {', '.join(self.KINDS)}."}, status=404)
+        parameter = request.query_params.get("parameter")
+        region = request.query_params.get("region")
+        if not parameter or not region:
+            return Response({"detail": "Both 'parameter' and 'region' are required query params."}, status=400)
+        numbers = {}
+        for name in ("start_year", "end_year", "baseline_start", "baseline_end", "window"):
+            value = request.query_params.get(name)
+            if value and not value.isdigit():
+                return Response({"detail": f"'{name}' must be a positive integer."}, status=400)
+            numbers[name] = int(value) if value else None
+        first = numbers["start_year"] or 0
+        last = numbers["end_year"] or 9999
+        baseline = (numbers["baseline_start"] or self.BASELINE[0], numbers["baseline_end"] or self.BASELINE[1])
+        window = numbers["window"] or self.WINDOW
+
+        columns = _split_list(request.query_params, "column")
+        store = get_store()
+        if store is not None:
+            rows = store.series_rows(parameter, region, columns or None)
+        else:
+            series = DataSeries.objects.filter(dataset__parameter=parameter, dataset__region=region)
+            if columns:
+                series = series.filter(column__name__in=columns)
+            rows = series.order_by("column_id").values_list("column__name", "start_year", "values")
+
+        payload: Dict[str, object] = {"parameter": parameter, "region": region}
+        if kind in ("climatology", "anomalies"):
+            payload.update(baseline_start=baseline[0], baseline_end=baseline[1])
+        if kind == "rolling":
+            payload["window"] = window
+        if kind != "climatology":
+            payload.update(start_year=numbers["start_year"], end_year=numbers["end_year"])
+        results = []
+        for column, start, blob in rows:
+            values = unpack_values(blob)
+            if kind == "climatology":
+                results.append({"column": column, **analytics.climatology(start, values, *baseline).as_dict()})
+            elif kind == "trend":
+                years, kept = analytics.points_between(start, values, first, last)
+                results.append({"column": column, **analytics.linear_trend(years, kept)})
+            elif kind == "anomalies":
+                reference = analytics.climatology(start, values, *baseline).avg
+                years, kept = (
+                    analytics.anomalies(start, values, reference, first, last) if reference is not None else ([], [])
+                )
+                results.append({"column": column, "baseline": reference, "years": years, "values": kept})
+            else:
+                years, kept = analytics.rolling_mean(start, values, window, first, last)
+                results.append({"column": column, "years": years, "values": kept})
+        payload["columns" if kind in ("climatology", "trend") else "series"] = results
+        return Response(payload)
@@ -0,0 +1,118 @@
+"""Checks for `metdata.analytics` on small series with hand-computed results.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+import math
+from array import array
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from metdata import analytics
+from metdata.models import Column, Dataset, DataSeries
+from metdata.series import pack_values
+
+NAN = float("nan")
+# 2000..2005 with 2002 missing.
+START = 2000
+VALUES = array("d", [1.0, 2.0, NAN, 4.0, 5.0, 6.0])
+
+
+class AnalyticsFunctionTests(SimpleTestCase):
+    def test_points_between_skips_missing_years(self):
+        self.assertEqual(analytics.points_between(START, VALUES, 2001, 2004), ([2001, 2003, 2004], [2.0, 4.0, 5.0]))
+        self.assertEqual(analytics.points_between(START, VALUES, 1990, 1999), ([], []))
+        self.assertEqual(analytics.points_between(START, VALUES, 2010, 2020), ([], []))
+
+    def test_climatology(self):
+        summary = analytics.climatology(START, VALUES, 2000, 2003)
+        self.assertEqual((summary.count, summary.minimum, summary.maximum), (3, 1.0, 4.0))
+        self.assertEqual((summary.first_year, summary.last_year), (2000, 2003))
+        self.assertAlmostEqual(summary.avg, 7 / 3)
+        # Population variance: (1 + 4 + 16) / 3 - (7 / 3)² = 14 / 9.
+        self.assertAlmostEqual(summary.stddev, math.sqrt(14 / 9))
+
+    def test_climatology_of_an_empty_baseline(self):
+        for first, last in ((1961, 1990), (2002, 2002)):
+            summary = analytics.climatology(START, VALUES, first, last)
+            self.assertEqual(summary.count, 0)
+            self.assertIsNone(summary.avg)
+            self.assertIsNone(summary.stddev)
+
+    def test_anomalies(self):
+        self.assertEqual(
+            analytics.anomalies(START, VALUES, 3.0, 0, 9999),
+            ([2000, 2001, 2003, 2004, 2005], [-2.0, -1.0, 1.0, 2.0, 3.0]),
+        )
+        self.assertEqual(analytics.anomalies(START, VALUES, 3.0, 2003, 2004), ([2003, 2004], [1.0, 2.0]))
+
+    def test_rolling_mean_skips_windows_with_gaps(self):
+        self.assertEqual(analytics.rolling_mean(START, VALUES, 2, 0, 9999), ([2001, 2004, 2005], [1.5, 4.5, 5.5]))
+        self.assertEqual(analytics.rolling_mean(START, VALUES, 3, 0, 9999), ([2005], [5.0]))
+        self.assertEqual(analytics.rolling_mean(START, VALUES, 2, 2004, 2004), ([2004], [4.5]))
+        self.assertEqual(analytics.rolling_mean(START, VALUES, 7, 0, 9999), ([], []))
+
+    def test_linear_trend(self):
+        trend = analytics.linear_trend([2000, 2001, 2003, 2004], [1.0, 2.0, 4.0, 5.0])
+        self.assertAlmostEqual(trend["slope"], 1.0)
+        self.assertAlmostEqual(trend["slope_per_decade"], 10.0)
+        self.assertAlmostEqual(trend["intercept"], -1999.0, places=6)
+        self.assertAlmostEqual(trend["r_squared"], 1.0)
+        self.assertEqual((trend["count"], trend["first_year"], trend["last_year"]), (4, 2000, 2004))
+        # x̄ = ȳ = 1, Sxy = 1, Sxx = Syy = 2: slope 0.5, intercept 0.5, r = 0.5.
+        trend = analytics.linear_trend([0, 1, 2], [0.0, 2.0, 1.0])
+        self.assertAlmostEqual(trend["slope"], 0.5)
+        self.assertAlmostEqual(trend["intercept"], 0.5)
+        self.assertAlmostEqual(trend["r_squared"], 0.25)
+
+    def test_linear_trend_of_too_few_or_flat_points(self):
+        empty = analytics.linear_trend([], [])
+        self.assertEqual((empty["count"], empty["first_year"], empty["last_year"]), (0, None, None))
+        self.assertEqual({empty[key] for key in ("slope", "slope_per_decade", "intercept", "r_squared")}, {None})
+        single = analytics.linear_trend([2000], [1.0])
+        self.assertIsNone(single["slope"])
+        self.assertEqual((single["count"], single["first_year"], single["last_year"]), (1, 2000, 2000))
+        flat = analytics.linear_trend([2000, 2001, 2002], [3.0, 3.0, 3.0])
+        self.assertEqual(flat["slope"], 0.0)
+        self.assertIsNone(flat["r_squared"])
+
+
+# Keep test responses out of the shared file cache the settings default to.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+)
+class AnalyticsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        DataSeries.objects.create(
+            dataset=Dataset.objects.create(parameter="Tmax", region="UK"),
+            column=Column.objects.create(name="ann"),
+            start_year=START,
+            values=pack_values(VALUES),
+        )
+
+    def get(self, kind: str, **params):
+        response = self.client.get(f"/api/analytics/{kind}/", {"parameter": "Tmax", "region": "UK", **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_empty_default_baseline(self):
+        # The series starts in 2000, after the default 1961-1990 baseline.
+        climatology = self.get("climatology")["columns"][0]
+        self.assertEqual((climatology["count"], climatology["avg"]), (0, None))
+        anomalies = self.get("anomalies")["series"][0]
+        self.assertEqual(anomalies, {"column": "ann", "baseline": None, "years": [], "values": []})
+
+    def test_anomalies_against_a_given_baseline(self):
+        series = self.get("anomalies", baseline_start=2000, baseline_end=2001, start_year=2003)["series"][0]
+        self.assertEqual(series["baseline"], 1.5)
+        self.assertEqual((series["years"], series["values"]), ([2003, 2004, 2005], [2.5, 3.5, 4.5]))
+
+    def test_rolling_and_trend(self):
+        rolling = self.get("rolling", window=2)["series"][0]
+        self.assertEqual((rolling["years"], rolling["values"]), ([2001, 2004, 2005], [1.5, 4.5, 5.5]))
+        trend = self.get("trend", end_year=2004)["columns"][0]
+        self.assertAlmostEqual(trend["slope"], 1.0)
+        self.assertEqual(trend["count"], 4)
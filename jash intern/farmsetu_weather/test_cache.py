@@ -0,0 +1,130 @@
+"""Checks for the response cache and HTTP validators in `metdata.cache`.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.cache import has_vary_header
+
+from metdata.models import Dataset
+from test_import import ROWS, UK, WALES, FakeSession, dataset_file
+
+STATS = "/api/stats/"
+TMAX_UK = {"parameter": "Tmax", "region": "UK"}
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+    API_CACHE_TIMEOUT=3600,
+)
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = FakeSession({UK: dataset_file()})
+        self.run_import()
+
+    def run_import(self) -> None:
+        # The importer invalidates the cache on commit, which TestCase only runs when asked.
+        build_session = mock.patch("metdata.management.commands.import_metoffice.build_session", return_value=self.session)
+        with build_session, self.captureOnCommitCallbacks(execute=True):
+            call_command("import_metoffice", UK, stdout=StringIO())
+
+    def test_etag_is_stable_across_identical_requests(self):
+        first = self.client.get(STATS, TMAX_UK)
+        second = self.client.get(STATS, {"region": "UK", "parameter": "Tmax"})
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["ETag"])
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertNotEqual(self.client.get(STATS, {**TMAX_UK, "by": "decade"})["ETag"], first["ETag"])
+
+    def test_matching_if_none_match_returns_304_without_a_body(self):
+        etag = self.client.get(STATS, TMAX_UK)["ETag"]
+        response = self.client.get(STATS, TMAX_UK, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_changes_after_an_import_bumps_the_data_version(self):
+        etag = self.client.get(STATS, TMAX_UK)["ETag"]
+        version = Dataset.objects.get(parameter="Tmax", region="UK").data_version
+        self.session.files[UK] = dataset_file({**ROWS, 1992: "1992    7.0    8.5    9.0    8.1"})
+        self.run_import()
+        self.assertEqual(Dataset.objects.get(parameter="Tmax", region="UK").data_version, version + 1)
+        response = self.client.get(STATS, TMAX_UK, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_responses_vary_on_accept_but_not_cookie(self):
+        response = self.client.get(STATS, TMAX_UK)
+        self.assertTrue(has_vary_header(response, "Accept"))
+        self.assertFalse(has_vary_header(response, "Cookie"))
+        self.assertIn("public", response["Cache-Control"])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+    API_CACHE_TIMEOUT=3600,
+    ALLOWED_HOSTS=["testserver", "a.example", "b.example"],
+)
+class CacheResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = FakeSession({UK: dataset_file(), WALES: dataset_file()})
+        self.run_import(UK, WALES)
+
+    def run_import(self, *urls: str) -> None:
+        build_session = mock.patch("metdata.management.commands.import_metoffice.build_session", return_value=self.session)
+        with build_session, self.captureOnCommitCallbacks(execute=True):
+            call_command("import_metoffice", *urls, stdout=StringIO())
+
+    def test_second_request_is_served_from_the_cache(self):
+        first = self.client.get(STATS, TMAX_UK)
+        second = self.client.get(STATS, TMAX_UK)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+
+    def test_import_expires_the_datasets_responses(self):
+        before = self.client.get(STATS, TMAX_UK).json()
+        self.client.get(STATS, {"parameter": "Tmax", "region": "Wales"})
+        self.session.files[UK] = dataset_file({**ROWS, 1992: "1992    7.0    8.5    9.0    8.1"})
+        self.run_import(UK)
+        response = self.client.get(STATS, TMAX_UK)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertAlmostEqual(response.json()["avg"], before["avg"] + 0.6 / before["count"])
+        self.assertEqual(self.client.get(STATS, TMAX_UK)["X-Cache"], "HIT")
+        # Responses scoped to another dataset keep their token.
+        self.assertEqual(self.client.get(STATS, {"parameter": "Tmax", "region": "Wales"})["X-Cache"], "HIT")
+
+    def test_unchanged_import_keeps_responses_cached(self):
+        self.client.get(STATS, TMAX_UK)
+        self.run_import(UK)
+        self.assertEqual(self.client.get(STATS, TMAX_UK)["X-Cache"], "HIT")
+
+    def test_params_do_not_collide(self):
+        self.client.get(STATS, TMAX_UK)
+        by_decade = self.client.get(STATS, {**TMAX_UK, "by": "decade"})
+        self.assertEqual(by_decade["X-Cache"], "MISS")
+        self.assertIn("decades", by_decade.json())
+        wales = self.client.get(STATS, {"parameter": "Tmax", "region": "Wales"})
+        self.assertEqual(wales["X-Cache"], "MISS")
+        self.assertEqual(wales.json()["region"], "Wales")
+        # Reordered or empty params name the same response.
+        self.assertEqual(self.client.get(STATS, {"region": "UK", "column": "", "parameter": "Tmax"})["X-Cache"], "HIT")
+
+    def test_hosts_do_not_collide(self):
+        first = self.client.get("/api/records/", {"cursor": "start", "page_size": 5}, HTTP_HOST="a.example")
+        second = self.client.get("/api/records/", {"cursor": "start", "page_size": 5}, HTTP_HOST="b.example")
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "MISS")
+        self.assertTrue(first.json()["next"].startswith("http://a.example/"))
+        self.assertTrue(second.json()["next"].startswith("http://b.example/"))
+        self.assertEqual(self.client.get("/api/records/", {"cursor": "start", "page_size": 5}, HTTP_HOST="a.example")["X-Cache"], "HIT")
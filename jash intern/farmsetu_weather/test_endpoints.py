@@ -0,0 +1,82 @@
+"""Query-plan checks for the record filter endpoint.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+from typing import List
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+
+from metdata.models import Column, DataRecord, Dataset
+from metdata.views import DataRecordFilterView
+
+TABLE = DataRecord._meta.db_table
+
+
+def index_names(constraint: str) -> List[str]:
+    """Names the database's planner may report for the index behind `constraint`.
+
+    SQLite builds unique constraints declared in CREATE TABLE as `sqlite_autoindex_*`
+    indexes, so those are matched by their columns. On a partitioned PostgreSQL table
+    (`DATARECORD_PARTITIONED`) the plan names each partition's copy of the index.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass", [constraint])
+            return [constraint, *(name for (name,) in cursor.fetchall())]
+        if connection.vendor != "sqlite":
+            return [constraint]
+        columns = connection.introspection.get_constraints(cursor, TABLE)[constraint]["columns"]
+        cursor.execute("SELECT name FROM pragma_index_list(%s)", [TABLE])
+        names = []
+        for (name,) in cursor.fetchall():
+            cursor.execute("SELECT name FROM pragma_index_info(%s) ORDER BY seqno", [name])
+            if [row[0] for row in cursor.fetchall()] == columns:
+                names.append(name)
+        return names
+
+
+# Keep test responses out of the shared file cache the settings default to.
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class RecordFilterPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        columns = [Column.objects.create(name=name) for name in ("jan", "feb", "mar", "win", "ann")]
+        records = []
+        for parameter in ("Tmax", "Tmin", "Rainfall"):
+            for region in ("UK", "England", "Wales", "Scotland"):
+                dataset = Dataset.objects.create(parameter=parameter, region=region)
+                records.extend(
+                    DataRecord(dataset=dataset, column=column, year=year, value=float(year % 17))
+                    for year in range(1884, 2024)
+                    for column in columns
+                )
+        DataRecord.objects.bulk_create(records, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def plan(self, query: str) -> str:
+        view = DataRecordFilterView()
+        view.request = type("Request", (), {"query_params": QueryDict(query)})()
+        return view.get_queryset().explain()
+
+    def test_dataset_filter_reads_unique_index(self):
+        plan = self.plan("parameter=Tmax&region=UK")
+        self.assertTrue(any(name in plan for name in index_names("uniq_record_scope")), plan)
+
+    def test_column_filter_reads_composite_index(self):
+        plan = self.plan("parameter=Tmax&region=UK,Wales&column=ann&year_min=1990")
+        self.assertTrue(any(name in plan for name in index_names("idx_param_region_col")), plan)
+
+    def test_records_come_in_parameter_region_year_column_name_order(self):
+        response = self.client.get("/api/records/filter/", {"region": "UK,Wales", "year_min": 2023})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        keys = [(r["parameter"], r["region"], r["year"], r["column_name"]) for r in results]
+        self.assertEqual(len(keys), 30)
+        self.assertEqual(keys, sorted(keys))
+        # Column ids run jan, feb, mar, win, ann; the names must not come back in that order.
+        self.assertEqual([key[3] for key in keys[:5]], ["ann", "feb", "jan", "mar", "win"])
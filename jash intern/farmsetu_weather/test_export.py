@@ -0,0 +1,96 @@
+"""Checks for the streamed record export (`/api/records/export/<format>/`).
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+from unittest import mock, skipUnless
+
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from metdata import export
+from metdata.models import Column, DataRecord, Dataset
+from metdata.serializers import DataRecordSerializer
+from metdata.views import filter_records
+
+FILTER = {"parameter": "Tmax", "region": "UK,Wales", "year_min": "1760"}
+
+
+# Keep test responses out of the shared file cache the settings default to.
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class RecordExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        columns = [Column.objects.create(name=name) for name in ("jan", "feb", "mar", "ann")]
+        DataRecord.objects.bulk_create(
+            DataRecord(dataset=dataset, column=column, year=year, value=year % 11 - 4.5)
+            for dataset in [
+                Dataset.objects.create(parameter=parameter, region=region, source_url=f"https://example.com/{region}")
+                for parameter in ("Tmax", "Rainfall")
+                for region in ("UK", "Wales")
+            ]
+            for column in columns
+            for year in range(1750, 2024)
+        )
+        cls.expected = filter_records(DataRecord.objects.with_dimensions(), FILTER).order_by(*export.EXPORT_ORDER)
+
+    def download(self, fmt: str, **params) -> bytes:
+        response = self.client.get(f"/api/records/export/{fmt}/", {**FILTER, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def serialized(self):
+        return json.loads(JSONRenderer().render(DataRecordSerializer(self.expected, many=True).data))
+
+    def test_csv_has_a_header_and_every_filtered_record(self):
+        # More rows than one export chunk, so the stream spans several chunks.
+        self.assertGreater(self.expected.count(), export.CHUNK_SIZE)
+        rows = list(csv.reader(io.StringIO(self.download("csv").decode("utf-8"))))
+        self.assertEqual(rows[0], list(export.EXPORT_FIELDS))
+        self.assertEqual(len(rows) - 1, self.expected.count())
+        expected = [[str(value) for value in record.values()] for record in self.serialized()]
+        self.assertEqual(rows[1:], expected)
+
+    def test_ndjson_has_one_record_per_line(self):
+        lines = self.download("ndjson").decode("utf-8").splitlines()
+        self.assertEqual(len(lines), self.expected.count())
+        self.assertEqual([json.loads(line) for line in lines], self.serialized())
+
+    def test_gzip_wraps_the_same_bytes(self):
+        for fmt in ("csv", "ndjson"):
+            with self.subTest(fmt=fmt):
+                response = self.client.get(f"/api/records/export/{fmt}/", {**FILTER, "compress": "gzip"})
+                self.assertEqual(response["Content-Type"], "application/gzip")
+                self.assertIn(f'filename="records.{fmt}.gz"', response["Content-Disposition"])
+                self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.download(fmt))
+
+    def test_empty_export_keeps_the_csv_header(self):
+        body = self.download("csv", year_min="2100").decode("utf-8")
+        self.assertEqual(body.splitlines(), [",".join(export.EXPORT_FIELDS)])
+        self.assertEqual(self.download("ndjson", year_min="2100"), b"")
+
+    def test_parquet_without_pyarrow_is_refused_before_streaming(self):
+        with mock.patch.object(export, "pyarrow_available", return_value=False):
+            response = self.client.get("/api/records/export/parquet/", FILTER)
+        self.assertEqual(response.status_code, 406)
+        self.assertFalse(response.streaming)
+        self.assertIn("pyarrow", response.json()["detail"])
+
+    def test_invalid_format_and_compression(self):
+        self.assertEqual(self.client.get("/api/records/export/xlsx/").status_code, 404)
+        self.assertEqual(self.client.get("/api/records/export/csv/", {"compress": "zip"}).status_code, 400)
+
+    @skipUnless(export.pyarrow_available(), "Parquet export needs pyarrow")
+    def test_parquet_has_every_filtered_record(self):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.download("parquet")))
+        self.assertEqual(table.column_names, list(export.EXPORT_FIELDS))
+        self.assertEqual(table.num_rows, self.expected.count())
+        self.assertEqual(table.column("id").to_pylist(), list(self.expected.values_list("id", flat=True)))
@@ -0,0 +1,198 @@
+"""Checks for incremental re-imports by `import_metoffice`, against a fake MetOffice server.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from io import StringIO
+from typing import Dict, List, Optional, Tuple
+from unittest import mock
+
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from requests.structures import CaseInsensitiveDict
+
+from metdata.models import DataRecord, Dataset
+from metdata.utils.fetching import dataset_urls
+
+HEADER = "year    jan    feb    mar    ann"
+ROWS = {
+    1990: "1990    1.0    2.0    3.0    2.0",
+    1991: "1991    4.0    5.0    6.0    5.0",
+    1992: "1992    7.0    8.0    9.0    8.0",
+}
+UK, WALES = dataset_urls(["Tmax"], ["UK", "Wales"])
+
+
+def dataset_file(rows: Dict[int, str] = ROWS, updated: str = "01-Jan-2025") -> bytes:
+    lines = ["Met Office HadUK-Grid Tmax UK", f"Last updated {updated}", "", HEADER, *rows.values()]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class FakeSession:
+    """Serves `files` (URL -> body) with ETags, answering a matching If-None-Match with 304.
+
+    By default the ETag is derived from the body; `etags` overrides it per URL.
+    """
+
+    def __init__(self, files: Dict[str, bytes]) -> None:
+        self.files = files
+        self.etags: Dict[str, str] = {}
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+
+    def get(self, url: str, timeout: Optional[float] = None, headers=None, stream: bool = False):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        response = requests.Response()
+        response.url = url
+        response._content_consumed = True
+        body = self.files.get(url)
+        if body is None:
+            response.status_code = 404
+            response._content = b""
+            return response
+        etag = self.etags.get(url) or f'"{hashlib.md5(body).hexdigest()}"'
+        response.headers = CaseInsensitiveDict({"ETag": etag})
+        if headers.get("If-None-Match") == etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response._content = body
+            response.encoding = "utf-8"
+        return response
+
+    def __enter__(self) -> "FakeSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+# Keep invalidations and import counters out of the shared file cache the settings default to.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+)
+class IncrementalImportTests(TestCase):
+    def setUp(self):
+        self.session = FakeSession({UK: dataset_file()})
+
+    def run_import(self, *urls: str, **options) -> str:
+        out = StringIO()
+        with mock.patch("metdata.management.commands.import_metoffice.build_session", return_value=self.session):
+            call_command("import_metoffice", *(urls or [UK]), stdout=out, **options)
+        return out.getvalue()
+
+    def counts(self, output: str) -> Tuple[int, int, int]:
+        match = re.search(r"Inserted=(\d+) Updated=(\d+) Unchanged=(\d+)", output)
+        self.assertIsNotNone(match, output)
+        return tuple(int(n) for n in match.groups())
+
+    def records(self) -> Dict[Tuple[int, str], float]:
+        return {
+            (year, column): value
+            for year, column, value in DataRecord.objects.values_list("year", "column__name", "value")
+        }
+
+    def dataset(self) -> Dataset:
+        return Dataset.objects.get(parameter="Tmax", region="UK")
+
+    def test_first_import_stores_every_cell_and_its_state(self):
+        output = self.run_import()
+        self.assertEqual(self.counts(output), (12, 0, 0))
+        self.assertEqual(self.records()[(1991, "feb")], 5.0)
+        dataset = self.dataset()
+        self.assertEqual(dataset.content_hash, hashlib.sha256(dataset_file()).hexdigest())
+        self.assertEqual(dataset.etag, f'"{hashlib.md5(dataset_file()).hexdigest()}"')
+        self.assertEqual(sorted(dataset.row_hashes), ["1990", "1991", "1992"])
+
+    def test_not_modified_skips_the_dataset(self):
+        self.run_import()
+        version = self.dataset().data_version
+        output = self.run_import()
+        self.assertIn("Unchanged since last import (HTTP 304)", output)
+        self.assertEqual(self.session.requests[-1][1]["If-None-Match"], self.dataset().etag)
+        self.assertEqual(self.dataset().data_version, version)
+        self.assertEqual(DataRecord.objects.count(), 12)
+
+    def test_identical_content_skips_the_dataset(self):
+        self.run_import()
+        version = self.dataset().data_version
+        # A new ETag for the same bytes: the body is downloaded but nothing is written.
+        self.session.etags[UK] = '"regenerated"'
+        output = self.run_import()
+        self.assertIn("Unchanged since last import (identical content)", output)
+        self.assertEqual(self.dataset().data_version, version)
+        self.assertEqual(self.dataset().etag, '"regenerated"')
+
+    def test_only_changed_years_are_written(self):
+        self.run_import()
+        version = self.dataset().data_version
+        untouched = DataRecord.objects.get(year=1990, column__name="jan").imported_at
+        self.session.files[UK] = dataset_file({**ROWS, 1992: "1992    7.0    8.5    9.0    8.1"})
+        output = self.run_import()
+        self.assertIn("Changed years=1; removed years=0", output)
+        self.assertEqual(self.counts(output), (0, 2, 2))
+        self.assertIn("(from 1 changed years)", output)
+        self.assertEqual(self.records()[(1992, "feb")], 8.5)
+        self.assertEqual(self.records()[(1992, "ann")], 8.1)
+        self.assertEqual(DataRecord.objects.get(year=1990, column__name="jan").imported_at, untouched)
+        self.assertEqual(self.dataset().data_version, version + 1)
+
+    def test_removed_years_and_withdrawn_cells_are_deleted(self):
+        self.run_import()
+        self.session.files[UK] = dataset_file({1990: ROWS[1990], 1991: "1991    4.0    ---    6.0    5.0"})
+        output = self.run_import()
+        self.assertIn("Changed years=1; removed years=1", output)
+        records = self.records()
+        self.assertFalse(any(year == 1992 for year, _ in records))
+        self.assertNotIn((1991, "feb"), records)
+        self.assertEqual(len(records), 7)
+
+    def test_force_deletes_records_missing_from_the_file(self):
+        self.run_import()
+        self.session.files[UK] = dataset_file({1990: ROWS[1990], 1991: "1991    4.0    ---    6.0    5.0"})
+        self.run_import(force=True)
+        self.assertEqual(len(self.records()), 7)
+        self.assertNotIn((1991, "feb"), self.records())
+
+    def test_missing_row_hashes_delete_records_missing_from_the_file(self):
+        self.run_import()
+        Dataset.objects.update(row_hashes={}, content_hash="", etag="")
+        self.session.files[UK] = dataset_file({1990: ROWS[1990], 1991: ROWS[1991]})
+        self.run_import()
+        self.assertEqual(sorted({year for year, _ in self.records()}), [1990, 1991])
+
+    def test_upsert_counts_inserted_updated_and_unchanged_cells(self):
+        self.run_import()
+        self.session.files[UK] = dataset_file(
+            {**ROWS, 1991: "1991    4.5    5.0    6.0    5.5", 1993: "1993    1.0    1.0    1.0    1.0"}
+        )
+        output = self.run_import()
+        self.assertIn("Changed years=2", output)
+        self.assertEqual(self.counts(output), (4, 2, 2))
+        self.assertEqual(self.records()[(1991, "jan")], 4.5)
+        self.assertEqual(DataRecord.objects.count(), 16)
+
+    def test_force_reports_unchanged_rows(self):
+        self.run_import()
+        output = self.run_import(force=True)
+        self.assertIn("Changed years=3", output)
+        self.assertEqual(self.counts(output), (0, 0, 12))
+        self.assertEqual(DataRecord.objects.count(), 12)
+
+    def test_bulk_summary_counts_written_and_skipped_datasets(self):
+        self.session.files[WALES] = dataset_file()
+        self.assertIn("Updated 2 of 2 datasets; 0 unchanged.", self.run_import(UK, WALES))
+        self.session.files[UK] = dataset_file({**ROWS, 1990: "1990    1.5    2.0    3.0    2.0"})
+        self.assertIn("Updated 1 of 2 datasets; 1 unchanged.", self.run_import(UK, WALES))
+        self.assertIn("Updated 0 of 2 datasets; 2 unchanged.", self.run_import(UK, WALES))
+
+    def test_record_scans_do_not_join_dimension_tables(self):
+        # The stale-row scan reads records only; a default ordering would join Dataset and Column.
+        scan = DataRecord.objects.filter(dataset_id=1).values_list("id", "year", "column_id")
+        self.assertNotIn("JOIN", str(scan.query))
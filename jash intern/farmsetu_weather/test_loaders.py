@@ -0,0 +1,70 @@
+"""Checks for the record upsert loaders in `metdata.loaders`.
+
+Run with `python manage.py test`; the COPY tests need `DATABASE_URL` to point at PostgreSQL.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from metdata.loaders import LOADERS, _copy_text, get_loader, upsert_records
+from metdata.models import Column, DataRecord, Dataset
+
+IMPORTED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class CopyTextTests(SimpleTestCase):
+    def test_escapes(self):
+        self.assertEqual(_copy_text(None), "\\N")
+        self.assertEqual(_copy_text(float("nan")), "nan")
+        self.assertEqual(_copy_text(-1.5), "-1.5")
+        self.assertEqual(_copy_text("a\tb\nc\rd\\e"), "a\\tb\\nc\\rd\\\\e")
+        self.assertEqual(_copy_text(IMPORTED_AT), "2024-01-01T00:00:00+00:00")
+
+
+class LoaderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(parameter="Tmax", region="UK")
+        cls.columns = [Column.objects.create(name=name).pk for name in ("jan", "feb", "ann")]
+
+    def rows(self, values):
+        return [
+            (self.dataset.pk, 2000 + i, column_id, value, IMPORTED_AT)
+            for i, value in enumerate(values)
+            for column_id in self.columns
+        ]
+
+    def stored(self):
+        return list(DataRecord.objects.order_by("year", "column_id").values_list("year", "column_id", "value"))
+
+    def check_loader(self, name):
+        first = upsert_records(self.rows([1.0, 2.0, 3.0]), chunk_size=4, loader=name)
+        self.assertEqual((first.inserted, first.updated, first.unchanged), (9, 0, 0))
+        again = upsert_records(self.rows([1.0, 2.5, 3.0, 4.0]), chunk_size=4, loader=name)
+        self.assertEqual((again.inserted, again.updated, again.unchanged), (3, 3, 6))
+        values = [value for _, _, value in self.stored()]
+        self.assertEqual(values, [1.0] * 3 + [2.5] * 3 + [3.0] * 3 + [4.0] * 3)
+
+    def test_supported_loaders_agree(self):
+        for name, loader in LOADERS.items():
+            if connection.vendor in loader.vendors:
+                DataRecord.objects.all().delete()
+                with self.subTest(loader=name):
+                    self.check_loader(name)
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_copy_round_trips_nan(self):
+        result = upsert_records(self.rows([float("nan")]), loader="copy")
+        self.assertEqual(result.inserted, 3)
+        self.assertTrue(all(math.isnan(value) for _, _, value in self.stored()))
+        # PostgreSQL orders NaN equal to itself, so reloading it changes nothing.
+        self.assertEqual(upsert_records(self.rows([float("nan")]), loader="copy").unchanged, 3)
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_auto_uses_copy_on_postgresql(self):
+        self.assertEqual(get_loader().name, "copy")
@@ -0,0 +1,92 @@
+"""Checks for the request metrics middleware and the `/metrics` endpoint.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from metdata.metrics import QUERIES, QueryTimer, TimedStream
+from metdata.models import Column, DataRecord, Dataset
+
+
+def observed(view: str):
+    """(requests, total queries) recorded so far for `view`."""
+    key = (("view", view),)
+    counts, total = QUERIES._series.get(key, ([0], [0.0]))
+    return sum(counts), total[0]
+
+
+# Fresh responses only: a cached response would run no queries.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    API_CACHE_TIMEOUT=0,
+    DATASET_STORE_PATH="",
+)
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dataset = Dataset.objects.create(parameter="Tmax", region="UK")
+        column = Column.objects.create(name="ann")
+        DataRecord.objects.bulk_create(
+            DataRecord(dataset=dataset, column=column, year=year, value=1.0) for year in range(1900, 2000)
+        )
+
+    def test_responses_carry_server_timing(self):
+        response = self.client.get("/api/records/filter/", {"parameter": "Tmax", "region": "UK"})
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=')
+
+    def test_streamed_queries_are_recorded_once_the_body_is_consumed(self):
+        before = observed("records-export")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/records/export/csv/", {"parameter": "Tmax", "region": "UK"})
+            self.assertNotIn("Server-Timing", response)
+            self.assertEqual(observed("records-export"), before)
+            body = b"".join(response.streaming_content)
+        self.assertEqual(body.count(b"\n"), 101)
+        requests, total = observed("records-export")
+        self.assertEqual(requests, before[0] + 1)
+        # Every query of the request, including the export's own SELECT, is counted.
+        self.assertEqual(total - before[1], len(queries.captured_queries))
+        self.assertTrue(any("metdata_datarecord" in query["sql"] for query in queries.captured_queries))
+
+    def test_abandoned_stream_is_recorded_once(self):
+        finished = []
+        timer = QueryTimer(0)
+
+        def body():
+            for year in (1900, 1901):
+                DataRecord.objects.filter(year=year).count()
+                yield b"chunk"
+
+        # A client that disconnects after the first chunk: the server closes the response.
+        stream = TimedStream(body(), timer, lambda: finished.append(timer.count))
+        self.assertEqual(next(stream), b"chunk")
+        stream.close()
+        stream.close()
+        self.assertEqual(finished, [1])
+
+
+class MetricsAccessTests(TestCase):
+    def test_loopback_is_allowed_by_default(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE metdata_requests_total counter", response.content)
+
+    def test_other_addresses_are_refused(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn(b"metdata_", response.content)
+
+    @override_settings(API_METRICS_ALLOWED_IPS=["10.0.0.0/8", "not-an-address"])
+    def test_allowed_networks(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="127.0.0.1").status_code, 403)
+
+    @override_settings(API_METRICS_ALLOWED_IPS=[], API_METRICS_TOKEN="s3cret")
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
@@ -0,0 +1,70 @@
+"""Checks for page-number and keyset pagination in `metdata.pagination`.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+import base64
+from collections import Counter
+from typing import List
+
+from django.test import TestCase, override_settings
+
+from metdata.models import Column, DataRecord, Dataset
+from metdata.pagination import RecordPagination
+
+
+# Keep test responses out of the shared file cache the settings default to.
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class RecordPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        columns = [Column.objects.create(name=name) for name in ("jan", "feb", "ann")]
+        datasets = [Dataset.objects.create(parameter="Tmax", region=region) for region in ("UK", "Wales")]
+        # Insert newest years first so id order differs from the keyset order.
+        DataRecord.objects.bulk_create(
+            DataRecord(dataset=dataset, column=column, year=year, value=float(year % 7))
+            for year in range(2012, 1999, -1)
+            for dataset in datasets
+            for column in columns
+        )
+
+    def walk(self, url: str, params: dict) -> List[int]:
+        """Ids of every record reached by following `next` from the first page."""
+        ids: List[int] = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page["results"]), 7)
+            ids.extend(record["id"] for record in page["results"])
+            if page["next"] is None:
+                return ids
+            response = self.client.get(page["next"])
+
+    def test_cursor_walk_matches_offset_walk(self):
+        expected = sorted(DataRecord.objects.values_list("id", flat=True))
+        for fast in (False, True):
+            for url, params in (("/api/records/", {}), ("/api/records/filter/", {"parameter": "Tmax"})):
+                with self.subTest(url=url, fast=fast), self.settings(API_FAST_RECORDS=fast):
+                    by_offset = self.walk(url, {**params, "page_size": 7})
+                    by_cursor = self.walk(url, {**params, "page_size": 7, "cursor": "start"})
+                    for ids in (by_offset, by_cursor):
+                        self.assertEqual([i for i, n in Counter(ids).items() if n > 1], [])
+                        self.assertEqual(sorted(ids), expected)
+
+    def test_page_size_is_honoured_and_capped_in_page_mode(self):
+        response = self.client.get("/api/records/", {"page_size": 7, "page": 2})
+        self.assertEqual(len(response.json()["results"]), 7)
+        self.assertIn("page_size=7", response.json()["next"])
+        self.assertEqual(len(self.client.get("/api/records/").json()["results"]), 50)
+        request = type("Request", (), {"query_params": {"page_size": "5000"}})()
+        self.assertEqual(RecordPagination().get_page_size(request), RecordPagination.max_page_size)
+
+    def test_invalid_cursor_returns_404(self):
+        wrong_arity = base64.urlsafe_b64encode(b"1:2000").decode("ascii")
+        for cursor in ("not-a-cursor!", wrong_arity, base64.urlsafe_b64encode(b"a:b:c").decode("ascii")):
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/records/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()["detail"], "Invalid cursor.")
@@ -0,0 +1,96 @@
+"""Checks for the optional PostgreSQL partitioning in `metdata.partitions`.
+
+Run with `python manage.py test` and `DATABASE_URL` pointing at PostgreSQL; skipped elsewhere.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from metdata.models import Column, DataRecord, Dataset
+from metdata.partitions import (
+    TABLE,
+    is_partitioned,
+    partition_name,
+    partition_records,
+    swap_partition,
+    unpartition_records,
+)
+
+IMPORTED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def table_definition(table: str = TABLE):
+    """Constraint and index definitions of `table`, by name."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass", [table]
+        )
+        constraints = dict(cursor.fetchall())
+        cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [table])
+        indexes = dict(cursor.fetchall())
+    return constraints, indexes
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+class PartitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.datasets = [Dataset.objects.create(parameter="Tmax", region=region) for region in ("UK", "Wales")]
+        cls.column = Column.objects.create(name="ann")
+        DataRecord.objects.bulk_create(
+            DataRecord(dataset=dataset, column=cls.column, year=year, value=float(year), imported_at=IMPORTED_AT)
+            for dataset in cls.datasets
+            for year in range(1990, 2000)
+        )
+
+    def setUp(self):
+        if is_partitioned():
+            self.skipTest("The test database is already partitioned (DATARECORD_PARTITIONED).")
+
+    def test_round_trip_keeps_rows_keys_and_sequence(self):
+        before = table_definition()
+        rows = list(DataRecord.objects.order_by("id").values_list("id", "dataset_id", "year", "value"))
+
+        partition_records()
+        self.assertTrue(is_partitioned())
+        constraints, indexes = table_definition()
+        self.assertEqual(constraints.keys(), before[0].keys())
+        self.assertEqual(indexes.keys(), before[1].keys())
+        self.assertEqual(constraints["metdata_datarecord_pkey"], "PRIMARY KEY (id, dataset_id)")
+        for name, definition in before[0].items():
+            if name != "metdata_datarecord_pkey":
+                self.assertEqual(constraints[name], definition)
+        self.assertIn("USING brin (year)", indexes["metdata_datarecord_year_cb5665f8"])
+        self.assertEqual(list(DataRecord.objects.order_by("id").values_list("id", "dataset_id", "year", "value")), rows)
+        created = DataRecord.objects.create(
+            dataset=self.datasets[0], column=self.column, year=2000, value=1.0, imported_at=IMPORTED_AT
+        )
+        self.assertEqual(created.pk, rows[-1][0] + 1)
+
+        unpartition_records()
+        self.assertFalse(is_partitioned())
+        self.assertEqual(table_definition(), before)
+        created = DataRecord.objects.create(
+            dataset=self.datasets[0], column=self.column, year=2001, value=1.0, imported_at=IMPORTED_AT
+        )
+        self.assertEqual(created.pk, rows[-1][0] + 2)
+
+    def test_swap_replaces_one_dataset(self):
+        partition_records()
+        dataset, other = self.datasets
+        name = partition_name(dataset.pk)
+        _, indexes = table_definition(name)
+        swapped = [(dataset.pk, year, self.column.pk, -1.0, IMPORTED_AT) for year in range(2000, 2005)]
+        for _ in range(2):
+            self.assertEqual(swap_partition(dataset.pk, swapped)[0], 5)
+        self.assertEqual(
+            list(DataRecord.objects.filter(dataset=dataset).order_by("year").values_list("year", "value")),
+            [(year, -1.0) for year in range(2000, 2005)],
+        )
+        self.assertEqual(DataRecord.objects.filter(dataset=other).count(), 10)
+        self.assertEqual(len(table_definition(name)[1]), len(indexes))
+        self.assertTrue(all(index.startswith(f"{name}_") and "_new" not in index for index in table_definition(name)[1]))
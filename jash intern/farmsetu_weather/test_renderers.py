@@ -0,0 +1,87 @@
+"""Checks for the packed binary series format of `metdata.renderers.PackedSeriesRenderer`.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+import struct
+from array import array
+from typing import Dict, List, Tuple
+
+from django.test import TestCase, override_settings
+
+from metdata.models import Column, Dataset, DataSeries
+from metdata.renderers import PackedSeriesRenderer
+from metdata.series import pack_values
+
+SERIES = "/api/series/"
+
+
+def decode(body: bytes) -> Dict[str, Tuple[List[int], List[float]]]:
+    """Read the `MDS1` layout back into {label: (years, values)}."""
+    assert body[:4] == b"MDS1", body[:4]
+    (count,) = struct.unpack_from("<I", body, 4)
+    offset, decoded = 8, {}
+    for _ in range(count):
+        (length,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        label = body[offset:offset + length].decode("utf-8")
+        offset += length + (-length % 4)
+        (points,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        years = list(struct.unpack_from(f"<{points}i", body, offset))
+        offset += 4 * points
+        values = list(struct.unpack_from(f"<{points}f", body, offset))
+        offset += 4 * points
+        decoded[label] = (years, values)
+    assert offset == len(body), (offset, len(body))
+    return decoded
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+)
+class PackedSeriesRendererTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dataset = Dataset.objects.create(parameter="Tmax", region="Wales")
+        nan = float("nan")
+        for name, values in (("ann", [10.5, nan, 11.25, -0.5]), ("jan", [3.0, 4.0])):
+            DataSeries.objects.create(
+                dataset=dataset,
+                column=Column.objects.create(name=name),
+                start_year=1990,
+                values=pack_values(array("d", values)),
+            )
+
+    def test_binary_round_trips_the_json_series(self):
+        params = {"parameter": "Tmax", "region": "Wales", "column": "ann,jan,win"}
+        series = self.client.get(SERIES, params).json()["series"]
+        response = self.client.get(SERIES, {**params, "format": "f32"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        decoded = decode(response.content)
+        self.assertEqual(list(decoded), ["Tmax/Wales/ann", "Tmax/Wales/jan", "Tmax/Wales/win"])
+        for entry in series:
+            years, values = decoded[f"{entry['parameter']}/{entry['region']}/{entry['column']}"]
+            self.assertEqual(years, entry["years"])
+            self.assertEqual(values, entry["values"])
+        self.assertEqual(decoded["Tmax/Wales/ann"], ([1990, 1992, 1993], [10.5, 11.25, -0.5]))
+        self.assertEqual(decoded["Tmax/Wales/win"], ([], []))
+
+    def test_labels_are_padded_to_four_bytes(self):
+        body = PackedSeriesRenderer().render(
+            {"series": [{"parameter": "Rainfall", "region": "UK", "column": "jan", "years": [2000], "values": [1.5]}]}
+        )
+        label = b"Rainfall/UK/jan"
+        self.assertEqual(body[8:12], struct.pack("<I", len(label)))
+        self.assertEqual(body[12:28], label + b"\0")
+        self.assertEqual(len(body) % 4, 0)
+        self.assertEqual(decode(body), {"Rainfall/UK/jan": ([2000], [1.5])})
+
+    def test_errors_are_sent_as_json(self):
+        response = self.client.get(SERIES, {"series": "Tmax:Wales", "format": "f32"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("parameter:region:column", response.json()["detail"])
@@ -0,0 +1,96 @@
+"""Checks that `DataRollup` statistics agree with aggregates over `DataRecord`.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+from typing import Dict
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Max, Min, StdDev
+from django.test import TestCase, override_settings
+
+from metdata.models import Column, DataRecord, Dataset
+from metdata.rollups import rebuild_rollups
+from metdata.series import rebuild_series
+
+STATS = "/api/stats/"
+AGGREGATES = {
+    "avg": Avg("value"),
+    "min": Min("value"),
+    "max": Max("value"),
+    "count": Count("value"),
+    "stddev": StdDev("value"),
+}
+
+
+# Keep test responses out of the shared file cache the settings default to.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+)
+class RollupStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = Dataset.objects.create(parameter="Tmax", region="UK")
+        other = Dataset.objects.create(parameter="Tmax", region="Wales")
+        columns = [Column.objects.create(name=name) for name in ("jan", "jul", "ann")]
+        records = [
+            DataRecord(dataset=dataset, column=column, year=year, value=round((year * 37 + n * 11) % 29 / 3 - 2, 1))
+            for dataset in (cls.dataset, other)
+            for n, column in enumerate(columns)
+            for year in range(1884 + n, 2024)
+            # Gaps inside decades, as withdrawn cells leave them.
+            if year % 13 != n
+        ]
+        DataRecord.objects.bulk_create(records)
+        for dataset in (cls.dataset, other):
+            rebuild_rollups(dataset.pk, rebuild_series(dataset.pk))
+
+    def setUp(self):
+        # Other test classes cache responses for the same URLs in the shared locmem cache.
+        cache.clear()
+
+    def direct(self, **filters) -> Dict[str, float]:
+        return DataRecord.objects.filter(dataset=self.dataset, **filters).aggregate(**AGGREGATES)
+
+    def assertStatsEqual(self, stats, expected, msg=None):
+        self.assertEqual(stats["count"], expected["count"], msg)
+        self.assertEqual(stats["min"], expected["min"], msg)
+        self.assertEqual(stats["max"], expected["max"], msg)
+        self.assertAlmostEqual(stats["avg"], expected["avg"], places=9, msg=msg)
+        self.assertAlmostEqual(stats["stddev"], expected["stddev"], places=9, msg=msg)
+
+    def test_dataset_stats_match_record_aggregates(self):
+        stats = self.client.get(STATS, {"parameter": "Tmax", "region": "UK"}).json()
+        self.assertStatsEqual(stats, self.direct())
+
+    def test_column_stats_match_record_aggregates(self):
+        stats = self.client.get(STATS, {"parameter": "Tmax", "region": "UK", "by": "column"}).json()
+        self.assertEqual([entry["column"] for entry in stats["columns"]], ["jan", "jul", "ann"])
+        for entry in stats["columns"]:
+            self.assertStatsEqual(entry, self.direct(column__name=entry["column"]), entry["column"])
+        ann = self.client.get(STATS, {"parameter": "Tmax", "region": "UK", "column": "ann"}).json()
+        self.assertStatsEqual(ann, self.direct(column__name="ann"))
+
+    def test_decade_stats_match_record_aggregates(self):
+        decades = (
+            DataRecord.objects.filter(dataset=self.dataset)
+            .annotate(decade=F("year") / 10 * 10)
+            .values("decade")
+            .annotate(**AGGREGATES)
+            .order_by("decade")
+        )
+        expected = {row["decade"]: row for row in decades}
+        stats = self.client.get(STATS, {"parameter": "Tmax", "region": "UK", "by": "decade"}).json()
+        self.assertEqual([entry["decade"] for entry in stats["decades"]], list(expected))
+        for entry in stats["decades"]:
+            self.assertStatsEqual(entry, expected[entry["decade"]], entry["decade"])
+
+    def test_column_decade_stats_match_record_aggregates(self):
+        stats = self.client.get(STATS, {"parameter": "Tmax", "region": "UK", "column": "jul", "by": "decade"}).json()
+        self.assertEqual([entry["decade"] for entry in stats["decades"]], list(range(1880, 2030, 10)))
+        for entry in stats["decades"]:
+            decade = entry["decade"]
+            expected = self.direct(column__name="jul", year__gte=decade, year__lt=decade + 10)
+            self.assertStatsEqual(entry, expected, decade)
@@ -0,0 +1,63 @@
+"""Checks that the fast record path renders exactly like `DataRecordSerializer`.
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from metdata.models import Column, DataRecord, Dataset
+from metdata.serializers import DataRecordSerializer, record_rows_to_dicts
+
+FIELDS = DataRecordSerializer.Meta.fields
+
+
+# Compare freshly rendered responses, never cached ones.
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}, API_CACHE_TIMEOUT=0)
+class FastRecordRowsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        uk = Dataset.objects.create(parameter="Tmax", region="UK", source_url="https://example.com/UK.txt")
+        wales = Dataset.objects.create(parameter="Rainfall", region="Wales")
+        columns = [Column.objects.create(name=name) for name in ("jan", "ann")]
+        stamps = [
+            datetime(2024, 3, 1, 12, 0, 0, tzinfo=timezone.utc),
+            datetime(2024, 3, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+            datetime(1999, 12, 31, 23, 59, 59, 5, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        ]
+        DataRecord.objects.bulk_create(
+            DataRecord(dataset=dataset, column=column, year=year, value=value, imported_at=stamp)
+            for dataset in (uk, wales)
+            for column in columns
+            for year, value, stamp in zip((1884, 1990, 2023), (0.0, -3.25, 1e-7), stamps)
+        )
+
+    def assertSameJson(self, fast, serialized):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(serialized))
+
+    def test_rows_render_like_the_serializer(self):
+        queryset = DataRecord.objects.with_dimensions().order_by("id")
+        self.assertSameJson(
+            record_rows_to_dicts(queryset.values_list(*FIELDS)),
+            DataRecordSerializer(queryset, many=True).data,
+        )
+
+    def test_none_values_render_like_the_serializer(self):
+        record = DataRecord(id=7, year=2000, value=None, imported_at=None)
+        record.parameter, record.region, record.column_name, record.source_url = "Tmax", "UK", "jan", None
+        row = tuple(getattr(record, name) for name in FIELDS)
+        self.assertSameJson(record_rows_to_dicts([row]), [DataRecordSerializer(record).data])
+
+    def test_fast_list_responses_match(self):
+        for url, params in (("/api/records/", {}), ("/api/records/filter/", {"region": "UK,Wales"})):
+            with self.subTest(url=url):
+                with self.settings(API_FAST_RECORDS=False):
+                    slow = self.client.get(url, params).content
+                with self.settings(API_FAST_RECORDS=True):
+                    fast = self.client.get(url, params).content
+                self.assertEqual(fast, slow)
+                self.assertIn(b'"imported_at":"2024-03-01T12:00:00.123456Z"', fast)
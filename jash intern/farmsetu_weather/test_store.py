@@ -0,0 +1,140 @@
+"""Checks for dataset snapshots (`metdata.store`, `dump_snapshot`, `load_snapshot`).
+
+Run with `python manage.py test`.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from metdata import store
+from metdata.models import Column, DataRecord, DataRollup, Dataset, DataSeries
+from metdata.rollups import rebuild_rollups
+from metdata.series import rebuild_series
+from metdata.store import DATASET_FIELDS, get_store, write_snapshot
+
+FIRST_IMPORT = datetime(2024, 1, 1, 6, 0, tzinfo=timezone.utc)
+SECOND_IMPORT = datetime(2024, 6, 1, 6, 30, 15, 250000, tzinfo=timezone.utc)
+
+
+def record_rows():
+    return sorted(
+        DataRecord.objects.values_list("dataset__parameter", "dataset__region", "column__name", "year", "value", "imported_at")
+    )
+
+
+def series_rows():
+    return sorted(
+        (parameter, region, column, start, bytes(values))
+        for parameter, region, column, start, values in DataSeries.objects.values_list(
+            "dataset__parameter", "dataset__region", "column__name", "start_year", "values"
+        )
+    )
+
+
+def dataset_rows():
+    return sorted(Dataset.objects.values_list(*DATASET_FIELDS))
+
+
+# Keep invalidations out of the shared file cache the settings default to.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    DATASET_STORE_PATH="",
+)
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        columns = [Column.objects.create(name=name) for name in ("jan", "feb", "ann")]
+        for region, version in (("UK", 3), ("Wales", 1)):
+            dataset = Dataset.objects.create(
+                parameter="Tmax",
+                region=region,
+                source_url=f"https://example.com/{region}.txt",
+                etag='"abc"',
+                content_hash="0" * 64,
+                row_hashes={"1990": "x"},
+                checked_at=SECOND_IMPORT,
+                imported_at=SECOND_IMPORT,
+                data_version=version,
+            )
+            DataRecord.objects.bulk_create(
+                DataRecord(
+                    dataset=dataset,
+                    column=column,
+                    year=year,
+                    value=year / 100 + n,
+                    imported_at=SECOND_IMPORT if year >= 2000 else FIRST_IMPORT,
+                )
+                for n, column in enumerate(columns)
+                for year in range(1990 + n, 2010)
+                # A gap inside the feb series.
+                if (column.name, year) != ("feb", 1995)
+            )
+            rebuild_rollups(dataset.pk, rebuild_series(dataset.pk))
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "datasets.mds")
+        # get_store keeps the mapped file in a module global; start and end without one.
+        patcher = mock.patch.object(store, "_store", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dump_and_load_round_trip_into_an_empty_database(self):
+        records, series, datasets = record_rows(), series_rows(), dataset_rows()
+        rollups = DataRollup.objects.count()
+        call_command("dump_snapshot", self.path, stdout=StringIO())
+
+        DataRecord.objects.all().delete()
+        DataSeries.objects.all().delete()
+        DataRollup.objects.all().delete()
+        Dataset.objects.all().delete()
+        Column.objects.all().delete()
+
+        out = StringIO()
+        call_command("load_snapshot", self.path, stdout=out)
+        self.assertIn(f"Restored 2 datasets ({len(records)} records)", out.getvalue())
+        self.assertEqual(record_rows(), records)
+        self.assertEqual(series_rows(), series)
+        self.assertEqual(dataset_rows(), datasets)
+        self.assertEqual(DataRollup.objects.count(), rollups)
+
+    def test_load_over_existing_datasets_moves_their_version_on(self):
+        write_snapshot(self.path)
+        DataRecord.objects.filter(year=2009).update(value=-1.0)
+        call_command("load_snapshot", self.path, stdout=StringIO())
+        self.assertFalse(DataRecord.objects.filter(value=-1.0).exists())
+        self.assertEqual(Dataset.objects.get(region="UK").data_version, 4)
+
+    def test_get_store_remaps_after_the_file_is_replaced(self):
+        with self.settings(DATASET_STORE_PATH=self.path):
+            first = get_store()
+            self.assertTrue(os.path.exists(self.path))
+            self.assertIs(get_store(), first)
+            self.assertEqual(first.series_rows("Tmax", "UK", ["ann"])[0][1], 1992)
+
+            dataset = Dataset.objects.get(region="UK")
+            DataRecord.objects.create(
+                dataset=dataset, column=Column.objects.get(name="ann"), year=1980, value=0.5, imported_at=SECOND_IMPORT
+            )
+            write_snapshot(self.path)
+            second = get_store()
+            self.assertIsNot(second, first)
+            self.assertEqual(second.series_rows("Tmax", "UK", ["ann"])[0][1], 1980)
+            self.assertIs(get_store(), second)
+            # The old map stays readable for requests still holding it.
+            self.assertEqual(first.series_rows("Tmax", "UK", ["ann"])[0][1], 1992)
+
+    def test_store_serves_the_same_series_as_the_database(self):
+        params = {"parameter": "Tmax", "region": "UK", "column": "jan,feb,ann"}
+        expected = self.client.get("/api/series/", params).json()
+        with self.settings(DATASET_STORE_PATH=self.path, API_CACHE_TIMEOUT=0):
+            self.assertEqual(self.client.get("/api/series/", params).json(), expected)
+            self.assertIsNotNone(store._store)